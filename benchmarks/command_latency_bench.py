@@ -0,0 +1,163 @@
+"""Latencia de los comandos por REST frente a WebSocket.
+
+Arranca ``orbital_standin.py`` y ``companion_standin.py`` en procesos aparte,
+une N robots a un ``KoboldWebSocketClient`` y envía la misma secuencia de
+comandos con ``CommandService`` por cada transporte. Muestra para cada uno los
+comandos enviados, fallidos, repetidos por REST y los percentiles de latencia
+que acumula el propio servicio.
+
+La latencia de Orbital se simula con ``--latency-ms``/``--jitter-ms``; el
+servidor Companion local responde sin retardo, así que la diferencia medida es
+la del salto extra y el coste de una petición HTTP frente a un frame por un
+socket ya abierto.
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/command_latency_bench.py --robots 5 --commands 50 --latency-ms 60
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from companion_standin import STATS_PATH, WS_PATH, robot_id_for  # noqa: E402
+from ws_replay_bench import StubEntity, StubHass  # noqa: E402
+
+from custom_components.kobold_vr7.api.profile_api_client import ProfileApiClient  # noqa: E402
+from custom_components.kobold_vr7.api.robots_api_client import RobotsApiClient  # noqa: E402
+from custom_components.kobold_vr7.api.websocket_client import KoboldWebSocketClient  # noqa: E402
+from custom_components.kobold_vr7.const import (  # noqa: E402
+    COMMAND_TRANSPORT_REST,
+    COMMAND_TRANSPORT_WEBSOCKET,
+)
+from custom_components.kobold_vr7.service.command_service import CommandService  # noqa: E402
+from custom_components.kobold_vr7.service.profile_service import ProfileService  # noqa: E402
+from custom_components.kobold_vr7.service.robot_service import RobotsService  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def _wait_ready(session, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}{STATS_PATH}") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{base_url} no respondió a tiempo")
+
+
+async def _spawn(script, *args):
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        os.path.join(HERE, script),
+        *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+
+
+async def _send_commands(service, robots, commands):
+    # find_me no cambia el estado del robot simulado: la secuencia es igual en ambos transportes
+    for index in range(commands):
+        await service.find_me("standin-token", robots[index % len(robots)])
+
+
+async def _run(args):
+    orbital_url = f"http://127.0.0.1:{args.orbital_port}"
+    companion_url = f"http://127.0.0.1:{args.companion_port}"
+    servers = [
+        await _spawn(
+            "orbital_standin.py",
+            "--port", str(args.orbital_port),
+            "--robots", str(args.robots),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms),
+        ),
+        await _spawn(
+            "companion_standin.py",
+            "--port", str(args.companion_port),
+            "--robots", str(args.robots),
+            "--rate", "0.2",
+        ),
+    ]
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            await _wait_ready(session, orbital_url)
+            await _wait_ready(session, companion_url)
+
+            hass = StubHass(asyncio.get_running_loop())
+            profile_service = ProfileService(ProfileApiClient(session, host=companion_url))
+            client = KoboldWebSocketClient(
+                hass,
+                session,
+                "standin-id-token",
+                profile_service.login,
+                url=f"ws://127.0.0.1:{args.companion_port}{WS_PATH}",
+            )
+            robots = []
+            for index in range(args.robots):
+                robot = SimpleNamespace(id=robot_id_for(index), serial=f"standin-{index}")
+                StubEntity(client.states, robot.id, robot.serial)
+                client.add_robot(robot.id, robot.serial)
+                robots.append(robot)
+            await client.connect()
+
+            robots_service = RobotsService(
+                RobotsApiClient(session, "standin-token", orbital_url)
+            )
+            websocket_service = SimpleNamespace(client=client)
+            results = {}
+            for transport in (COMMAND_TRANSPORT_REST, COMMAND_TRANSPORT_WEBSOCKET):
+                service = CommandService(robots_service, websocket_service, transport)
+                started = time.perf_counter()
+                await _send_commands(service, robots, args.commands)
+                results[transport] = (time.perf_counter() - started, service.stats)
+
+            await client.disconnect()
+            profile_service.close()
+    finally:
+        for server in servers:
+            server.terminate()
+            await server.wait()
+
+    print(f"robots: {args.robots}, comandos por transporte: {args.commands}")
+    for transport, (wall, stats) in results.items():
+        measured = stats[transport]
+        print(
+            f"{transport:<10} total {wall:6.2f} s | enviados {measured['sent']:>4} "
+            f"fallidos {measured['failed']:>3} repetidos por REST {stats['fallbacks']:>3} | "
+            f"p50 {measured.get('p50_ms', '-')} ms p95 {measured.get('p95_ms', '-')} ms "
+            f"máx {measured.get('max_ms', '-')} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=3)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50, help="latencia simulada de Orbital")
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--orbital-port", type=int, default=8766)
+    parser.add_argument("--companion-port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Prueba de carga de ``KoboldWebSocketClient`` contra el servidor Companion local.
+
+Arranca ``companion_standin.py`` en un proceso aparte (para que su CPU no se
+mezcle con la del cliente), registra N robots en una única conexión y, tras la
+duración indicada, muestra frames recibidos, CPU del cliente por frame,
+escrituras de estado y reconexiones.
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/companion_load_bench.py --robots 300 --rate 2 --duration 30
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from companion_standin import STATS_PATH, WS_PATH, robot_id_for  # noqa: E402
+from ws_replay_bench import StubEntity, StubHass  # noqa: E402
+
+from custom_components.kobold_vr7.api.profile_api_client import ProfileApiClient  # noqa: E402
+from custom_components.kobold_vr7.api.websocket_client import KoboldWebSocketClient  # noqa: E402
+from custom_components.kobold_vr7.service.profile_service import ProfileService  # noqa: E402
+
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "companion_standin.py")
+
+
+async def _wait_ready(session, base_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}{STATS_PATH}") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("El servidor local no respondió a tiempo")
+
+
+async def _stats(session, base_url):
+    async with session.get(f"{base_url}{STATS_PATH}") as response:
+        return await response.json()
+
+
+async def _run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = None
+    if not args.external:
+        server = await asyncio.create_subprocess_exec(
+            sys.executable,
+            STANDIN,
+            "--port", str(args.port),
+            "--robots", str(args.robots),
+            "--rate", str(args.rate),
+            "--format", args.format,
+            "--drop-every", str(args.drop_every),
+            "--stall-every", str(args.stall_every),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            await _wait_ready(session, base_url)
+
+            hass = StubHass(asyncio.get_running_loop())
+            profile_service = ProfileService(ProfileApiClient(session, host=base_url))
+            client = KoboldWebSocketClient(
+                hass,
+                session,
+                "standin-id-token",
+                profile_service.login,
+                coalesce_window=args.coalesce_window,
+                url=f"ws://127.0.0.1:{args.port}{WS_PATH}",
+            )
+
+            # Contar frames recibidos sin tocar el cliente: _listen llama al atributo
+            received = 0
+            handle = client._handle_message
+
+            async def counting_handle(message):
+                nonlocal received
+                received += 1
+                await handle(message)
+
+            client._handle_message = counting_handle
+
+            entities = []
+            for index in range(args.robots):
+                entity = StubEntity(client.states, robot_id_for(index), None)
+                client.add_robot(entity._robot.id)
+                entities.append(entity)
+
+            connect_started = time.perf_counter()
+            await client.connect()
+            connect_time = time.perf_counter() - connect_started
+
+            cpu_started = time.process_time()
+            wall_started = time.perf_counter()
+            received_started = received
+            await asyncio.sleep(args.duration)
+            cpu = time.process_time() - cpu_started
+            wall = time.perf_counter() - wall_started
+            frames = received - received_started
+
+            stats = await _stats(session, base_url)
+            await client.disconnect()
+            profile_service.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            await server.wait()
+
+    writes = sum(entity.writes for entity in entities)
+    skipped = sum(s["writes_skipped"] for s in client.write_stats.values())
+    print(f"robots:              {args.robots}")
+    print(f"conexión + uniones:  {connect_time * 1000:.0f} ms")
+    print(f"frames recibidos:    {frames} en {wall:.1f} s ({frames / wall:,.0f}/s)")
+    print(f"CPU del cliente:     {cpu:.2f} s ({cpu / wall:.0%} de un núcleo)")
+    if frames:
+        print(f"CPU por frame:       {cpu / frames * 1e6:.1f} µs")
+    print(f"escrituras:          {writes} (omitidas {skipped})")
+    print(
+        f"servidor:            {stats['connections']} conexiones, "
+        f"{stats['dropped_connections']} cortes, {stats['logins']} logins, "
+        f"{stats['joins']} uniones, {stats['stalled_connections']} bloqueos"
+    )
+    print(f"enlace:              {client.link_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--format", choices=("plain", "phoenix", "both"), default="both")
+    parser.add_argument("--drop-every", type=float, default=0)
+    parser.add_argument("--stall-every", type=float, default=0)
+    parser.add_argument("--coalesce-window", type=float, default=0)
+    parser.add_argument(
+        "--external", action="store_true", help="usar un servidor ya arrancado en --port"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
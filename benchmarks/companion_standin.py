@@ -0,0 +1,554 @@
+"""Servidor Companion local para pruebas de carga del cliente WebSocket.
+
+Implementa lo que usa la integración del servicio Companion:
+
+* ``POST /api/v1/profile/login``: devuelve un bearer JWT (sin firma válida) en
+  la cabecera ``Authorization`` con la expiración configurada.
+* ``GET /api/ws``: WebSocket Phoenix con respuestas a ``phx_join``,
+  ``phx_leave``, ``last_state``, ``heartbeat`` y comandos (``message`` con
+  ``{"ability": ...}``, que se aplican al robot simulado).
+* ``GET /stats``: contadores del servidor en JSON.
+
+Cada robot simulado recorre ciclos de limpieza realistas (salida de la base,
+limpieza por zonas con área creciente, pausas, errores ocasionales, regreso y
+carga) y emite ``state_changed`` y ``cleaning_state`` a los sockets unidos a su
+canal. ``--drop-every`` cierra las conexiones y ``--stall-every`` las deja
+medio abiertas (sin respuestas ni eventos) para probar la detección de cortes.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/companion_standin.py --robots 200 --rate 2 --port 8765
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+_LOGGER = logging.getLogger(__name__)
+
+LOGIN_PATH = "/api/v1/profile/login"
+WS_PATH = "/api/ws"
+STATS_PATH = "/stats"
+
+_ZONES = ("Cocina", "Salón", "Dormitorio", "Baño", "Pasillo", "Despacho")
+_AUTONOMY_KEYS = (
+    "active_cleaning_after_suspended",
+    "active_cleaning_session",
+    "cleaning_start",
+    "docking",
+    "docking_for_suspended",
+    "docking_successful",
+    "docking_successful_suspended",
+    "docking_verify_base",
+    "suspended_charging_start",
+    "undocking",
+    "undocking_after_suspended",
+)
+_ERROR_CODES = ("brush_stuck", "wheel_stuck", "bin_full", "lifted")
+
+
+def robot_id_for(index: int) -> str:
+    """Identificador determinista del robot simulado ``index``."""
+
+    return f"a1b2c3d4-0000-4000-8000-{index + 1:012d}"
+
+
+def make_bearer(ttl: float, sequence: int) -> str:
+    """Genera un JWT con ``exp`` decodificable por la integración."""
+
+    def _segment(data: dict) -> str:
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    header = _segment({"alg": "none", "typ": "JWT"})
+    claims = _segment({"exp": int(time.time() + ttl), "jti": sequence})
+    return f"Bearer {header}.{claims}.standin"
+
+
+class SimulatedRobot:
+    """Máquina de estados de un robot que produce cuerpos de estado y limpieza."""
+
+    def __init__(self, robot_id: str, rng: random.Random, error_probability: float):
+        self.robot_id = robot_id
+        self.topic = f"robots:{robot_id}"
+        self._rng = rng
+        self._error_probability = error_probability
+        self.state = "idle"
+        self.action: Optional[str] = None
+        self.charge = rng.randint(60, 100)
+        self.is_docked = True
+        self.is_charging = False
+        self.errors: List[dict] = []
+        self.runs: List[dict] = []
+        self._run_index = 0
+        self._started_at = ""
+        self._ended_at = ""
+        self._paused_seconds = 0
+        self._steps_in_phase = 0
+
+    # -- cuerpos de los mensajes -------------------------------------------------
+
+    def state_body(self) -> dict:
+        cleaning = self.state == "busy"
+        paused = self.state == "paused"
+        autonomy = dict.fromkeys(_AUTONOMY_KEYS, 0)
+        autonomy["active_cleaning_session"] = int(cleaning or paused)
+        autonomy["undocking"] = int(self.action == "undocking")
+        autonomy["docking"] = int(self.action == "docking")
+        autonomy["docking_successful"] = int(self.is_docked)
+        autonomy["started_on_base"] = True
+        return {
+            "action": self.action,
+            "autonomy_states": autonomy,
+            "available_commands": {
+                "cancel": cleaning or paused,
+                "extract": False,
+                "pause": cleaning,
+                "resume": paused,
+                "return_to_base": cleaning or paused,
+                "start": self.state in ("idle", "charging"),
+            },
+            "cleaning_center": {"bag_status": "ok", "base_error": None, "state": "idle"},
+            "details": {
+                "base_type": "auto_empty",
+                "charge": self.charge,
+                "is_charging": self.is_charging,
+                "is_docked": self.is_docked,
+                "is_quickboost": False,
+                "quickboost_estimate": 0,
+            },
+            "errors": self.errors,
+            "state": self.state,
+        }
+
+    def cleaning_body(self) -> dict:
+        timing = {
+            "charging": 0,
+            "end": self._ended_at,
+            "error": 0,
+            "paused": self._paused_seconds,
+            "start": self._started_at,
+        }
+        return {
+            "ability": "cleaning.start",
+            "cleaning_type": "zones",
+            "floorplan_uuid": "fp-1",
+            "runs": self.runs,
+            "started_by": "app",
+            "timing": timing,
+        }
+
+    # -- ciclo de vida -----------------------------------------------------------
+
+    def step(self) -> List[str]:
+        """Avanza la simulación y devuelve los tipos de evento a emitir."""
+
+        rng = self._rng
+        self._steps_in_phase += 1
+
+        if self.state in ("idle", "charging"):
+            if self.is_charging:
+                self.charge = min(100, self.charge + 2)
+                if self.charge == 100:
+                    self.is_charging = False
+                    self.state = "idle"
+                    return ["state"]
+            if self._steps_in_phase > 3 and rng.random() < 0.2:
+                self._start_cleaning()
+                return ["state", "cleaning"]
+            return ["state"] if self.is_charging else []
+
+        if self.state == "error":
+            if self._steps_in_phase > 4:
+                self.errors = []
+                self.state = "busy"
+                self.action = "cleaning"
+                self._steps_in_phase = 0
+                return ["state"]
+            return []
+
+        if self.state == "paused":
+            self._paused_seconds += 1
+            if self._steps_in_phase > 3:
+                self.state = "busy"
+                self.action = "cleaning"
+                self._steps_in_phase = 0
+                return ["state", "cleaning"]
+            return []
+
+        # Robot ocupado: saliendo, limpiando o volviendo
+        if self.action == "undocking":
+            self.action = "cleaning"
+            self._steps_in_phase = 0
+            return ["state"]
+
+        if self.action == "docking":
+            if self._steps_in_phase > 2:
+                self.state = "charging"
+                self.action = None
+                self.is_docked = True
+                self.is_charging = True
+                self._steps_in_phase = 0
+                self._ended_at = self._now()
+                for run in self.runs:
+                    run["timing"]["end"] = run["timing"]["end"] or self._ended_at
+                return ["state", "cleaning"]
+            return []
+
+        self.charge = max(5, self.charge - 1)
+        run = self.runs[self._run_index]
+        run["stats"]["area"] = round(run["stats"]["area"] + rng.uniform(0.3, 1.5), 2)
+
+        if rng.random() < self._error_probability:
+            self.state = "error"
+            self.action = None
+            self.errors = [{"code": rng.choice(_ERROR_CODES), "severity": "error"}]
+            self._steps_in_phase = 0
+            return ["state"]
+
+        if rng.random() < 0.03:
+            self.state = "paused"
+            self.action = None
+            self._steps_in_phase = 0
+            return ["state", "cleaning"]
+
+        if self._steps_in_phase > rng.randint(8, 20):
+            run["state"] = "finished"
+            run["timing"]["end"] = self._now()
+            self._run_index += 1
+            self._steps_in_phase = 0
+            if self._run_index >= len(self.runs):
+                self.action = "docking"
+                return ["state", "cleaning"]
+            self.runs[self._run_index]["state"] = "running"
+        return ["cleaning"]
+
+    def apply_command(self, ability: Optional[str]) -> bool:
+        """Aplica una habilidad recibida por el WebSocket; devuelve si el robot la acepta."""
+
+        if ability == "cleaning.start" and self.state in ("idle", "charging"):
+            self._start_cleaning()
+        elif ability == "cleaning.pause" and self.state == "busy" and self.action == "cleaning":
+            self.state = "paused"
+            self.action = None
+        elif ability == "cleaning.resume" and self.state == "paused":
+            self.state = "busy"
+            self.action = "cleaning"
+        elif ability == "navigation.return_to_base" and self.state in ("busy", "paused"):
+            self.state = "busy"
+            self.action = "docking"
+        elif ability != "utilities.find_me":
+            return False
+        self._steps_in_phase = 0
+        return True
+
+    def _start_cleaning(self) -> None:
+        self.state = "busy"
+        self.action = "undocking"
+        self.is_docked = False
+        self.is_charging = False
+        self._started_at = self._now()
+        self._ended_at = ""
+        self._paused_seconds = 0
+        self._run_index = 0
+        self._steps_in_phase = 0
+        zones = self._rng.sample(_ZONES, self._rng.randint(1, 3))
+        self.runs = [
+            {
+                "settings": {"mode": "auto", "navigation_mode": "normal"},
+                "state": "running" if index == 0 else "pending",
+                "stats": {"area": 0.0, "pickup_count": index},
+                "timing": {
+                    "charging": 0,
+                    "end": "",
+                    "error": 0,
+                    "paused": 0,
+                    "start": self._started_at,
+                },
+                "track_name": name,
+                "track_uuid": f"track-{index}",
+            }
+            for index, name in enumerate(zones)
+        ]
+
+    @staticmethod
+    def _now() -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class CompanionStandin:
+    """Servidor aiohttp con los robots simulados y sus suscriptores."""
+
+    def __init__(
+        self,
+        robots: int,
+        rate: float,
+        event_format: str = "both",
+        bearer_ttl: float = 3600,
+        error_probability: float = 0.01,
+        drop_every: float = 0,
+        stall_every: float = 0,
+        seed: int = 1,
+    ) -> None:
+        rng = random.Random(seed)
+        self.robots: Dict[str, SimulatedRobot] = {}
+        for index in range(robots):
+            robot_id = robot_id_for(index)
+            self.robots[robot_id] = SimulatedRobot(
+                robot_id, random.Random(rng.random()), error_probability
+            )
+        self._rate = rate
+        self._event_format = event_format
+        self._bearer_ttl = bearer_ttl
+        self._drop_every = drop_every
+        self._stall_every = stall_every
+        self._stalled: Set[web.WebSocketResponse] = set()
+        self._bearers: Set[str] = set()
+        self._subscribers: Dict[str, Set[web.WebSocketResponse]] = {}
+        self._sockets: Set[web.WebSocketResponse] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {
+            "logins": 0,
+            "connections": 0,
+            "rejected_connections": 0,
+            "dropped_connections": 0,
+            "stalled_connections": 0,
+            "joins": 0,
+            "heartbeats": 0,
+            "commands": 0,
+            "commands_rejected": 0,
+            "frames_sent": 0,
+            "events_generated": 0,
+        }
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(LOGIN_PATH, self._handle_login)
+        app.router.add_get(WS_PATH, self._handle_ws)
+        app.router.add_get(STATS_PATH, self._handle_stats)
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        return app
+
+    # -- HTTP --------------------------------------------------------------------
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return web.json_response({"error": "unauthorized"}, status=401)
+        self.stats["logins"] += 1
+        bearer = make_bearer(self._bearer_ttl, self.stats["logins"])
+        self._bearers.add(bearer)
+        return web.json_response({"status": "ok"}, headers={"Authorization": bearer})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {**self.stats, "open_sockets": len(self._sockets), "robots": len(self.robots)}
+        )
+
+    async def _handle_ws(self, request: web.Request) -> web.StreamResponse:
+        if request.headers.get("Authorization") not in self._bearers:
+            self.stats["rejected_connections"] += 1
+            return web.Response(status=401)
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.stats["connections"] += 1
+        self._sockets.add(ws)
+        topics: Set[str] = set()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                await self._handle_frame(ws, message.data, topics)
+        finally:
+            self._sockets.discard(ws)
+            self._stalled.discard(ws)
+            for topic in topics:
+                self._subscribers.get(topic, set()).discard(ws)
+        return ws
+
+    async def _handle_frame(self, ws, raw: str, topics: Set[str]) -> None:
+        if ws in self._stalled:
+            return
+        try:
+            join_ref, ref, topic, event, payload = json.loads(raw)
+        except ValueError:
+            _LOGGER.warning("Frame no válido: %s", raw)
+            return
+
+        if topic == "phoenix" and event == "heartbeat":
+            self.stats["heartbeats"] += 1
+            await self._send(ws, [None, ref, "phoenix", "phx_reply", _ok({})])
+            return
+
+        robot = self.robots.get(topic.removeprefix("robots:"))
+        if robot is None:
+            await self._send(
+                ws, [join_ref, ref, topic, "phx_reply", _error("unmatched topic")]
+            )
+            return
+
+        if event == "phx_join":
+            self.stats["joins"] += 1
+            topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(ws)
+            await self._send(ws, [join_ref, ref, topic, "phx_reply", _ok({})])
+        elif event == "phx_leave":
+            topics.discard(topic)
+            self._subscribers.get(topic, set()).discard(ws)
+            await self._send(ws, [join_ref, ref, topic, "phx_reply", _ok({})])
+        elif event == "last_state":
+            body = robot.state_body()
+            await self._send(ws, [join_ref, ref, topic, "phx_reply", _ok({"body": body})])
+            await self._send(ws, [join_ref, None, topic, "last_state", {"code": 200, "body": body}])
+        elif event == "message":
+            ability = payload.get("ability")
+            if not robot.apply_command(ability):
+                self.stats["commands_rejected"] += 1
+                await self._send(ws, [join_ref, ref, topic, "phx_reply", _error("not available")])
+                return
+            self.stats["commands"] += 1
+            await self._send(ws, [join_ref, ref, topic, "phx_reply", _ok({"ability": ability})])
+            await self._publish(robot, "state")
+        else:
+            await self._send(ws, [join_ref, ref, topic, "phx_reply", _ok({})])
+
+    # -- simulación --------------------------------------------------------------
+
+    async def _on_startup(self, app: web.Application) -> None:
+        loop = asyncio.get_running_loop()
+        for robot in self.robots.values():
+            self._tasks.append(loop.create_task(self._simulate(robot)))
+        if self._drop_every > 0:
+            self._tasks.append(loop.create_task(self._drop_connections()))
+        if self._stall_every > 0:
+            self._tasks.append(loop.create_task(self._stall_connections()))
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def _simulate(self, robot: SimulatedRobot) -> None:
+        interval = 1 / self._rate
+        # Desfase inicial para no emitir todos los robots a la vez
+        await asyncio.sleep(robot._rng.uniform(0, interval))
+        while True:
+            for kind in robot.step():
+                self.stats["events_generated"] += 1
+                await self._publish(robot, kind)
+            await asyncio.sleep(interval * robot._rng.uniform(0.5, 1.5))
+
+    async def _publish(self, robot: SimulatedRobot, kind: str) -> None:
+        subscribers = self._subscribers.get(robot.topic)
+        if not subscribers:
+            return
+
+        frames = []
+        if kind == "state":
+            body = robot.state_body()
+            if self._event_format in ("plain", "both"):
+                frames.append(
+                    {
+                        "event_type": "state_changed",
+                        "robot_id": robot.robot_id,
+                        "payload": {"state": body},
+                    }
+                )
+            if self._event_format in ("phoenix", "both"):
+                frames.append(["1", None, robot.topic, "last_state", {"code": 200, "body": body}])
+        else:
+            body = robot.cleaning_body()
+            if self._event_format in ("plain", "both"):
+                frames.append(
+                    {
+                        "event_type": "cleaning_state",
+                        "robot_id": robot.robot_id,
+                        "payload": {"state": body},
+                    }
+                )
+            if self._event_format in ("phoenix", "both"):
+                frames.append(["1", None, robot.topic, "cleaning_state", {"code": 200, "body": body}])
+
+        encoded = [json.dumps(frame, separators=(",", ":")) for frame in frames]
+        for ws in list(subscribers):
+            for payload in encoded:
+                await self._send_raw(ws, payload)
+
+    async def _drop_connections(self) -> None:
+        """Cierra periódicamente todos los sockets para probar la reconexión."""
+
+        while True:
+            await asyncio.sleep(self._drop_every)
+            for ws in list(self._sockets):
+                self.stats["dropped_connections"] += 1
+                await ws.close()
+
+    async def _stall_connections(self) -> None:
+        """Deja de responder en los sockets abiertos sin cerrarlos (conexión medio abierta)."""
+
+        while True:
+            await asyncio.sleep(self._stall_every)
+            for ws in self._sockets - self._stalled:
+                self.stats["stalled_connections"] += 1
+                self._stalled.add(ws)
+
+    async def _send(self, ws, frame) -> None:
+        await self._send_raw(ws, json.dumps(frame, separators=(",", ":")))
+
+    async def _send_raw(self, ws, payload: str) -> None:
+        if ws.closed or ws in self._stalled:
+            return
+        try:
+            await ws.send_str(payload)
+        except ConnectionError:
+            return
+        self.stats["frames_sent"] += 1
+
+
+def _ok(response: dict) -> dict:
+    return {"status": "ok", "response": response}
+
+
+def _error(reason: str) -> dict:
+    return {"status": "error", "response": {"reason": reason}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--robots", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1.0, help="pasos de simulación por robot y segundo")
+    parser.add_argument("--format", choices=("plain", "phoenix", "both"), default="both")
+    parser.add_argument("--bearer-ttl", type=float, default=3600)
+    parser.add_argument("--error-probability", type=float, default=0.01)
+    parser.add_argument("--drop-every", type=float, default=0, help="segundos entre cortes forzados (0 = nunca)")
+    parser.add_argument("--stall-every", type=float, default=0, help="segundos entre bloqueos silenciosos (0 = nunca)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    standin = CompanionStandin(
+        robots=args.robots,
+        rate=args.rate,
+        event_format=args.format,
+        bearer_ttl=args.bearer_ttl,
+        error_probability=args.error_probability,
+        drop_every=args.drop_every,
+        stall_every=args.stall_every,
+        seed=args.seed,
+    )
+    web.run_app(standin.build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
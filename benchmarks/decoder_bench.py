@@ -0,0 +1,173 @@
+"""Compara el decodificador por tablas con el parser anterior sobre frames grabados.
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/decoder_bench.py [--iterations 200] [--corpus fichero.jsonl]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.kobold_vr7.api import decoder  # noqa: E402
+from custom_components.kobold_vr7.api.model.robot_wss_cleaning_state_response import (  # noqa: E402
+    CleaningStateBody,
+    CleaningStateResponse,
+    Run,
+    RunSettings,
+    RunStats,
+    RunTiming,
+)
+from custom_components.kobold_vr7.api.model.robot_wss_last_state_or_phx_reply_response import (  # noqa: E402
+    AutonomyStates,
+    AvailableCommands,
+    CleaningCenter,
+    Details,
+    Error,
+    ResponseBody,
+)
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "companion_frames.jsonl")
+
+_RUN_TIMING_DEFAULTS = {"charging": 0, "end": "", "error": 0, "paused": 0, "start": ""}
+
+
+# --- Parser anterior, copiado tal cual como referencia -------------------------
+
+def legacy_parse_response_body(body):
+    autonomy_states_data = body.get("autonomy_states")
+    autonomy_states = None
+    if autonomy_states_data:
+        autonomy_states = AutonomyStates(**autonomy_states_data)
+    available_commands_default = {
+        "cancel": False, "extract": False, "pause": False,
+        "resume": False, "return_to_base": False, "start": False,
+    }
+    available_commands = AvailableCommands(
+        **{**available_commands_default, **body.get("available_commands", {})}
+    )
+    cleaning_center_default = {"bag_status": None, "base_error": None, "state": None}
+    cleaning_center = CleaningCenter(
+        **{**cleaning_center_default, **body.get("cleaning_center", {})}
+    )
+    details = Details(**body.get("details", {}))
+    errors = None
+    if body.get("errors"):
+        errors = [Error(**error) for error in body["errors"]]
+    return ResponseBody(
+        action=body.get("action"),
+        autonomy_states=autonomy_states,
+        available_commands=available_commands,
+        cleaning_center=cleaning_center,
+        details=details,
+        errors=errors,
+        state=body.get("state"),
+    )
+
+
+def legacy_parse_cleaning_state_body(payload):
+    body_source = payload.get("body") or payload.get("state") or {}
+    runs = []
+    for run_data in body_source.get("runs", []) or []:
+        settings_data = run_data.get("settings", {})
+        stats_data = run_data.get("stats", {})
+        runs.append(Run(
+            settings=RunSettings(
+                mode=settings_data.get("mode", ""),
+                navigation_mode=settings_data.get("navigation_mode", ""),
+            ),
+            state=run_data.get("state", ""),
+            stats=RunStats(
+                area=stats_data.get("area", 0.0),
+                pickup_count=stats_data.get("pickup_count", 0),
+            ),
+            timing=RunTiming(**{**_RUN_TIMING_DEFAULTS, **(run_data.get("timing") or {})}),
+            track_name=run_data.get("track_name"),
+            track_uuid=run_data.get("track_uuid"),
+        ))
+    return CleaningStateResponse(
+        code=payload.get("code", 200),
+        body=CleaningStateBody(
+            ability=body_source.get("ability", ""),
+            cleaning_type=body_source.get("cleaning_type", ""),
+            floorplan_uuid=body_source.get("floorplan_uuid"),
+            runs=runs,
+            started_by=body_source.get("started_by", ""),
+            timing=RunTiming(**{**_RUN_TIMING_DEFAULTS, **(body_source.get("timing") or {})}),
+        ),
+    )
+
+
+def legacy_decode(frame):
+    data = json.loads(frame)
+    if isinstance(data, list):
+        event, payload = data[3], data[4]
+        if event == "phx_reply":
+            response = payload.get("response", {})
+            if "body" in response:
+                return legacy_parse_response_body(response["body"])
+        elif event == "last_state" and "body" in payload:
+            return legacy_parse_response_body(payload["body"])
+        elif event == "cleaning_state" and "body" in payload:
+            return legacy_parse_cleaning_state_body(payload)
+        return None
+    event, payload = data.get("event_type"), data.get("payload")
+    if event == "state_changed" and payload and "state" in payload:
+        return legacy_parse_response_body(payload["state"])
+    if event == "cleaning_state" and payload:
+        return legacy_parse_cleaning_state_body(payload)
+    return None
+
+
+# --- Decodificador actual -------------------------------------------------------
+
+def compiled_decode(frame):
+    data = decoder.loads(frame)
+    if isinstance(data, list):
+        entry = decoder.PHOENIX_EVENT_DECODERS.get(data[3])
+        return entry[0](data[4]) if entry else None
+    entry = decoder.PLAIN_EVENT_DECODERS.get(data.get("event_type"))
+    return entry[0](data.get("payload")) if entry else None
+
+
+def _run(name, decode, frames, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for frame in frames:
+            decode(frame)
+    elapsed = time.perf_counter() - start
+    total = iterations * len(frames)
+    print(f"{name:<10} {total / elapsed:>12,.0f} frames/s  {elapsed / total * 1e6:>8.2f} µs/frame")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as corpus:
+        frames = [line.strip() for line in corpus if line.strip()]
+
+    # Ambos decodificadores deben producir el mismo resultado
+    for frame in frames:
+        legacy, compiled = legacy_decode(frame), compiled_decode(frame)
+        if legacy != compiled and not (
+            isinstance(legacy, ResponseBody) and legacy.errors is None and compiled.errors == []
+        ):
+            print(f"Resultado distinto para el frame: {frame[:120]}...")
+
+    print(f"{len(frames)} frames, backend JSON: {decoder.JSON_BACKEND}")
+    legacy_time = _run("anterior", legacy_decode, frames, args.iterations)
+    compiled_time = _run("tablas", compiled_decode, frames, args.iterations)
+    print(f"mejora: x{legacy_time / compiled_time:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Reproduce un volcado de frames del WebSocket a través de ``_handle_message``.
+
+Lee un fichero generado por el servicio ``kobold_vr7.dump_frames`` (o un corpus
+de frames crudos, uno por línea) y lo pasa por ``KoboldWebSocketClient`` con un
+``hass`` simulado, respetando la separación original entre frames o
+acelerándola. Sirve para reproducir fallos de estado sin esperar a que vuelvan
+a ocurrir: ``--verbose`` muestra cada cambio de estado publicado y al terminar
+se imprime el último estado de cada robot.
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/frame_replayer.py kobold_vr7_frames_<entry>_<fecha>.jsonl.gz \\
+        [--speed 10] [--coalesce-window 0] [--verbose]
+
+``--speed 1`` reproduce a la velocidad original, ``--speed 10`` diez veces más
+rápido y ``--speed 0`` sin esperas.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.kobold_vr7.api.websocket_client import KoboldWebSocketClient  # noqa: E402
+from custom_components.kobold_vr7.service.frame_recorder import read_dump  # noqa: E402
+
+
+class StubHass:
+    """Lo mínimo de ``HomeAssistant`` que usa el cliente: el bucle y ``data``."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.data = {}
+
+
+def _robots(header, records):
+    """Robots del volcado; en un corpus sin cabecera se extraen de los topics Phoenix."""
+
+    if header.get("robots"):
+        return [(robot["id"], robot.get("serial")) for robot in header["robots"]]
+    ids = set()
+    for _offset, _robot_id, frame in records:
+        marker = frame.find('"robots:')
+        if marker != -1:
+            ids.add(frame[marker + 8:frame.index('"', marker + 8)])
+    return [(robot_id, None) for robot_id in sorted(ids)]
+
+
+def _describe(state, kind):
+    if kind == "vacuum" and state.vacuum is not None:
+        return f"{state.vacuum.activity} / {state.vacuum.status}"
+    if kind == "battery":
+        return f"{state.battery_level}% charging={state.is_charging}"
+    if kind == "cleaning" and state.cleaning is not None:
+        return (
+            f"zone={state.cleaning.current_zone} area={state.cleaning.cleaned_area} "
+            f"runs={state.cleaning.run_count}"
+        )
+    return ""
+
+
+async def _replay(path, speed, coalesce_window, verbose):
+    header, records = read_dump(path)
+    loop = asyncio.get_running_loop()
+    client = KoboldWebSocketClient(
+        StubHass(loop), None, "token", None, "es-ES", coalesce_window=coalesce_window
+    )
+    changes = {}
+    for robot_id, serial in _robots(header, records):
+        client.states.add_robot(SimpleNamespace(id=robot_id, serial=serial, name=robot_id))
+        client.add_robot(robot_id, serial)
+        changes[robot_id] = 0
+
+        def _listener(kind, robot_id=robot_id):
+            changes[robot_id] += 1
+            if verbose:
+                state = client.states.get(robot_id)
+                print(
+                    f"{loop.time() - started:9.3f}s {robot_id} {kind:<9} {_describe(state, kind)}"
+                )
+
+        client.states.subscribe(robot_id, _listener)
+
+    started = loop.time()
+    wall_start = time.perf_counter()
+    for offset, _robot_id, frame in records:
+        if speed > 0:
+            delay = started + offset / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await client._handle_message(frame)
+    if coalesce_window > 0:
+        # Deja que se vacíen las ventanas de agrupación pendientes
+        await asyncio.sleep(coalesce_window * 2)
+    elapsed = time.perf_counter() - wall_start
+
+    original = records[-1][0] if records else 0
+    print(f"frames:            {len(records)}")
+    print(f"duración original: {original:.1f} s")
+    print(f"reproducción:      {elapsed:.2f} s")
+    for state in client.states:
+        robot_id = state.robot.id
+        vacuum = state.vacuum
+        print(f"\n{robot_id}: {changes[robot_id]} cambios publicados")
+        print(f"  actividad: {vacuum.activity if vacuum else None}")
+        print(f"  estado:    {vacuum.status if vacuum else None}")
+        print(f"  errores:   {list(vacuum.errors) if vacuum else []}")
+        print(f"  batería:   {state.battery_level}% (cargando: {state.is_charging})")
+        print(f"  escrituras: {client.write_stats.get(robot_id)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dump", help="volcado .jsonl.gz de dump_frames o corpus .jsonl")
+    parser.add_argument(
+        "--speed", type=float, default=1, help="factor de aceleración (0 = sin esperas)"
+    )
+    parser.add_argument(
+        "--coalesce-window", type=float, default=0, help="ventana de agrupación en segundos"
+    )
+    parser.add_argument("--verbose", action="store_true", help="muestra cada cambio de estado")
+    parser.add_argument(
+        "--debug", action="store_true", help="activa el log DEBUG de la integración"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.debug:
+        logging.getLogger("custom_components.kobold_vr7").setLevel(logging.DEBUG)
+
+    asyncio.run(_replay(args.dump, args.speed, args.coalesce_window, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
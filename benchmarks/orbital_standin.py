@@ -0,0 +1,321 @@
+"""Servidor Orbital REST local para medir el arranque de la integración.
+
+Sirve los endpoints que usa ``RobotsApiClient`` para M robots con K floorplans
+y Z zonas cada uno, con latencia configurable, inyección de errores 429/5xx y
+binarios base64 de tamaño realista (ráster real, ráster de rango, miniatura y
+binario de cada zona). Las respuestas se serializan una vez al arrancar para
+que el coste del servidor no enmascare el del cliente.
+
+* ``GET /stats``: peticiones por ruta, errores inyectados y bytes enviados.
+* ``POST /stats/reset``: pone los contadores a cero.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/orbital_standin.py --robots 5 --maps 3 --zones 8 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+from collections import Counter
+from typing import Dict
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+STATS_PATH = "/stats"
+
+
+def robot_id_for(index: int) -> str:
+    return f"b2c3d4e5-0000-4000-8000-{index + 1:012d}"
+
+
+def _raster(width: int, height: int, rng: random.Random) -> bytes:
+    """Ráster L sin cabecera: borde de pared, suelo y algo de ruido incierto."""
+
+    rows = []
+    wall = bytes([40])
+    for y in range(height):
+        if y in (0, height - 1):
+            rows.append(wall * width)
+            continue
+        row = bytearray([235]) * width
+        row[0] = row[-1] = 40
+        for _ in range(width // 32):
+            row[rng.randrange(width)] = 128
+        rows.append(bytes(row))
+    return b"".join(rows)
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+class OrbitalStandin:
+    """Catálogo sintético de robots, mapas y zonas con fallos configurables."""
+
+    def __init__(
+        self,
+        robots: int,
+        maps: int,
+        zones: int,
+        map_size: int = 512,
+        latency_ms: float = 50,
+        jitter_ms: float = 20,
+        error_rate_429: float = 0.0,
+        error_rate_5xx: float = 0.0,
+        retry_after: float = 1,
+        seed: int = 1,
+    ) -> None:
+        self._rng = random.Random(seed)
+        self._latency = latency_ms / 1000
+        self._jitter = jitter_ms / 1000
+        self._error_rate_429 = error_rate_429
+        self._error_rate_5xx = error_rate_5xx
+        self._retry_after = retry_after
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes_sent = 0
+
+        rng = random.Random(seed)
+        # Los binarios se comparten entre mapas: solo importa el tamaño del payload
+        real = _b64(_raster(map_size, map_size, rng))
+        rank = _b64(_raster(map_size, map_size, rng))
+        thumbnail = _b64(_raster(map_size // 4, map_size // 4, rng))
+        zone_binary = _b64(_raster(map_size // 2, map_size // 2, rng))
+
+        self._robots_body = self._encode(
+            [
+                {
+                    "id": robot_id_for(index),
+                    "name": f"Robot {index + 1}",
+                    "serial": f"VR7SIM{index + 1:06d}",
+                    "user_id": "standin-user",
+                    "timezone": "Europe/Madrid",
+                    "vendor": "vorwerk",
+                    "firmware": "5.12.0",
+                    "model_name": "VR7",
+                    "birth_date": "2024-01-01T00:00:00Z",
+                    "mac_address": None,
+                }
+                for index in range(robots)
+            ]
+        )
+        self._features_body = self._encode(
+            {
+                "max_floorplans": 3,
+                "max_cleaning_zones": 20,
+                "max_cleanable_zones": 20,
+                "max_no_go_zones": 20,
+                "extra_care_navigation": True,
+                "vacuuming_modes": ["auto", "eco", "turbo"],
+                "reminders_enabled": True,
+                "object_avoidance": True,
+                "backup_and_restore": True,
+                "area_configuration": True,
+                "overhang_detection": True,
+            }
+        )
+        self._maps_bodies: Dict[str, bytes] = {}
+        self._tracks_bodies: Dict[str, bytes] = {}
+        for index in range(robots):
+            robot_id = robot_id_for(index)
+            floorplans = []
+            for map_index in range(maps):
+                floorplan_uuid = f"fp-{index + 1}-{map_index + 1}"
+                floorplans.append(
+                    self._floorplan(floorplan_uuid, map_index, map_size, real, rank, thumbnail)
+                )
+                self._tracks_bodies[floorplan_uuid] = self._encode(
+                    [
+                        self._track(floorplan_uuid, zone_index, map_size, zone_binary)
+                        for zone_index in range(zones)
+                    ]
+                )
+            self._maps_bodies[robot_id] = self._encode(floorplans)
+
+    @staticmethod
+    def _encode(data) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def _floorplan(self, floorplan_uuid, map_index, size, real, rank, thumbnail) -> dict:
+        center = size // 2
+        return {
+            "floorplan_uuid": floorplan_uuid,
+            "name": f"Planta {map_index + 1}",
+            "default": map_index == 0,
+            "original": {"height": size, "width": size, "resolution": 20},
+            "robot": {
+                "base": {"dir": 0.0, "x": center, "y": size - 20},
+                "pos": {"dir": 90.0, "x": center, "y": center},
+            },
+            "real_crop": {"bottom": 0, "left": 0, "right": 0, "top": 0, "scale": 1.0},
+            "rank_crop": {"bottom": 0, "left": 0, "right": 0, "top": 0, "scale": 1.0},
+            "map_colors": {
+                "coverage": "78b4f0",
+                "uncertain": "c8c8c8",
+                "floor": "f5f5f5",
+                "walls": "3c3c3c",
+                "tof": "ffa000",
+            },
+            "processed_real_binary": real,
+            "processed_rank_binary": rank,
+            "thumbnail": thumbnail,
+            "updated_at": "2026-10-01T10:00:00Z",
+            "last_modified_at": "2026-10-01T10:00:00Z",
+            "map_versions_count": 3,
+            "promoted_at": "2026-10-01T10:00:00Z",
+        }
+
+    def _track(self, floorplan_uuid, zone_index, size, zone_binary) -> dict:
+        x = (zone_index * 37) % (size - 60) + 10
+        y = (zone_index * 53) % (size - 60) + 10
+        return {
+            "track_uuid": f"{floorplan_uuid}-track-{zone_index + 1}",
+            "name": f"Zona {zone_index + 1}",
+            "type": "cleaning",
+            "shapes": [{"coordinates": [[x, y], [x + 40, y], [x + 40, y + 40], [x, y + 40]]}],
+            "cleaning_mode": "auto",
+            "binary": zone_binary,
+            "updated_at": "2026-10-01T10:00:00Z",
+        }
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/users/me/robots", self._robots)
+        app.router.add_get("/robots/{robot_id}/features", self._features)
+        app.router.add_get("/robots/{robot_id}/floorplans", self._floorplans)
+        app.router.add_get("/robots/{robot_id}/cleaningmaps", self._cleaning_maps)
+        app.router.add_get("/maps/floorplans/{floorplan_uuid}/tracks", self._tracks)
+        app.router.add_post("/robots/{robot_id}/cleaning/v2", self._accepted)
+        app.router.add_post("/vendors/3/robots/{serial}/messages", self._message)
+        app.router.add_post("/mobile_devices", self._register_device)
+        app.router.add_get(STATS_PATH, self._stats)
+        app.router.add_post(f"{STATS_PATH}/reset", self._reset_stats)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path.startswith(STATS_PATH):
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        self.requests[resource.canonical if resource is not None else request.path] += 1
+
+        if not request.headers.get("Authorization", "").startswith("Auth0Bearer "):
+            self.errors["401"] += 1
+            return web.json_response({"message": "unauthorized"}, status=401)
+
+        delay = self._latency + self._rng.uniform(-self._jitter, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self._error_rate_429:
+            self.errors["429"] += 1
+            return web.json_response(
+                {"message": "too many requests"},
+                status=429,
+                headers={"Retry-After": str(self._retry_after)},
+            )
+        if roll < self._error_rate_429 + self._error_rate_5xx:
+            status = self._rng.choice((500, 502, 503))
+            self.errors[str(status)] += 1
+            return web.json_response({"message": "upstream error"}, status=status)
+
+        response = await handler(request)
+        self.bytes_sent += response.content_length or 0
+        return response
+
+    @staticmethod
+    def _raw(body: bytes) -> web.Response:
+        return web.Response(body=body, content_type="application/json")
+
+    async def _robots(self, request):
+        return self._raw(self._robots_body)
+
+    async def _features(self, request):
+        return self._raw(self._features_body)
+
+    async def _floorplans(self, request):
+        body = self._maps_bodies.get(request.match_info["robot_id"])
+        if body is None:
+            return web.json_response({"message": "not found"}, status=404)
+        return self._raw(body)
+
+    async def _cleaning_maps(self, request):
+        return web.json_response([])
+
+    async def _tracks(self, request):
+        body = self._tracks_bodies.get(request.match_info["floorplan_uuid"])
+        if body is None:
+            return web.json_response({"message": "not found"}, status=404)
+        return self._raw(body)
+
+    async def _accepted(self, request):
+        return web.json_response({"status": "ok"})
+
+    async def _message(self, request):
+        payload = await request.json()
+        return web.json_response(
+            {"ability": payload.get("ability"), "status": "ok", "request_id": "standin"}
+        )
+
+    async def _register_device(self, request):
+        return web.json_response({"id": "standin-device", "platform": "android"})
+
+    async def _stats(self, request):
+        return web.json_response(
+            {
+                "requests": dict(self.requests),
+                "total_requests": sum(self.requests.values()),
+                "errors": dict(self.errors),
+                "bytes_sent": self.bytes_sent,
+            }
+        )
+
+    async def _reset_stats(self, request):
+        self.requests.clear()
+        self.errors.clear()
+        self.bytes_sent = 0
+        return web.json_response({"status": "ok"})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--robots", type=int, default=3)
+    parser.add_argument("--maps", type=int, default=2)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--map-size", type=int, default=512, help="lado del ráster en celdas")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-429", type=float, default=0.0, help="probabilidad de 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="probabilidad de 5xx")
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    standin = OrbitalStandin(
+        robots=args.robots,
+        maps=args.maps,
+        zones=args.zones,
+        map_size=args.map_size,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate_429=args.error_429,
+        error_rate_5xx=args.error_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    web.run_app(standin.build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Escala del arranque: descubrimiento de M robots × K mapas × Z zonas.
+
+Arranca ``orbital_standin.py`` en un proceso aparte y ejecuta el mismo camino
+que ``vacuum.async_setup_entry`` recorre contra Orbital:
+
+* en frío: ``RobotsService.get_discovery`` sin caché persistente (robots,
+  floorplans y zonas con el semáforo de ``discovery_concurrency``);
+* en caliente: ``get_discovery`` desde la caché guardada seguido de
+  ``revalidate``, como hace la tarea en segundo plano tras arrancar.
+
+Para cada escenario muestra tiempo total, número de peticiones (contadas por el
+servidor), errores inyectados y memoria máxima asignada (tracemalloc, en una
+pasada aparte para no falsear los tiempos).
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/setup_bench.py --robots 5 --maps 3 --zones 10 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from orbital_standin import STATS_PATH  # noqa: E402
+
+from custom_components.kobold_vr7.api.robots_api_client import RobotsApiClient  # noqa: E402
+from custom_components.kobold_vr7.const import DEFAULT_DISCOVERY_CONCURRENCY  # noqa: E402
+from custom_components.kobold_vr7.service.robot_service import RobotsService  # noqa: E402
+
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "orbital_standin.py")
+
+
+class MemoryCacheStore:
+    """Sustituto en memoria de ``RobotsCacheStore`` con la misma interfaz."""
+
+    def __init__(self):
+        self.snapshot = None
+
+    async def async_load(self):
+        return self.snapshot
+
+    async def async_save(self, snapshot):
+        self.snapshot = snapshot
+
+    async def async_remove(self):
+        self.snapshot = None
+
+
+async def _server_stats(session, base_url, reset=False):
+    if reset:
+        async with session.post(f"{base_url}{STATS_PATH}/reset"):
+            return None
+    async with session.get(f"{base_url}{STATS_PATH}") as response:
+        return await response.json()
+
+
+async def _wait_ready(session, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await _server_stats(session, base_url)
+            return
+        except aiohttp.ClientError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("El servidor local no respondió a tiempo")
+
+
+async def _cold(session, base_url, concurrency, store):
+    client = RobotsApiClient(session, "standin-token", base_url)
+    service = RobotsService(client, store)
+    robots, maps_by_robot, _ = await service.get_discovery("standin-token", concurrency)
+    return robots, maps_by_robot, client.request_stats
+
+
+async def _warm(session, base_url, concurrency, store):
+    client = RobotsApiClient(session, "standin-token", base_url)
+    service = RobotsService(client, store)
+    robots, maps_by_robot, from_cache = await service.get_discovery("standin-token", concurrency)
+    if from_cache:
+        robots, maps_by_robot, _ = await service.revalidate(
+            "standin-token", concurrency, maps_by_robot
+        )
+    return robots, maps_by_robot, client.request_stats
+
+
+async def _measure(name, scenario, session, base_url, args, make_store):
+    timings = []
+    stats = None
+    client_stats = None
+    failure = None
+    for _ in range(args.repeat):
+        store = make_store()
+        await _server_stats(session, base_url, reset=True)
+        started = time.perf_counter()
+        try:
+            robots, maps_by_robot, client_stats = await scenario(
+                session, base_url, args.concurrency, store
+            )
+        except Exception as error:  # El objetivo es medir, no abortar la serie
+            failure = error
+            robots, maps_by_robot = [], {}
+        timings.append(time.perf_counter() - started)
+        stats = await _server_stats(session, base_url)
+
+    # Pasada con tracemalloc para la memoria máxima
+    store = make_store()
+    tracemalloc.start()
+    try:
+        await scenario(session, base_url, args.concurrency, store)
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    maps = sum(len(items) for items in maps_by_robot.values())
+    zones = sum(
+        len(mwz.zones or []) for items in maps_by_robot.values() for mwz in items
+    )
+    print(f"[{name}]")
+    print(f"  resultado:   {len(robots)} robots, {maps} mapas, {zones} zonas")
+    print(
+        f"  tiempo:      mediana {statistics.median(timings) * 1000:.0f} ms, "
+        f"máx {max(timings) * 1000:.0f} ms ({args.repeat} repeticiones)"
+    )
+    print(f"  peticiones:  {stats['total_requests']} ({stats['bytes_sent'] / 1e6:.1f} MB)")
+    for route, count in sorted(stats["requests"].items()):
+        print(f"    {count:5d}  {route}")
+    if stats["errors"]:
+        print(f"  errores:     {stats['errors']}")
+    if client_stats is not None:
+        print(
+            f"  cliente:     {client_stats['retries']} reintentos, "
+            f"{client_stats['timeouts']} plazos agotados"
+        )
+    print(f"  memoria pico: {peak / 1e6:.1f} MB")
+    if failure is not None:
+        print(f"  FALLO:       {failure!r}")
+
+
+async def _run(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = await asyncio.create_subprocess_exec(
+        sys.executable,
+        STANDIN,
+        "--port", str(args.port),
+        "--robots", str(args.robots),
+        "--maps", str(args.maps),
+        "--zones", str(args.zones),
+        "--map-size", str(args.map_size),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-429", str(args.error_429),
+        "--error-5xx", str(args.error_5xx),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        async with aiohttp.ClientSession() as session:
+            await _wait_ready(session, base_url)
+            print(
+                f"{args.robots} robots × {args.maps} mapas × {args.zones} zonas, "
+                f"latencia {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+                f"concurrencia {args.concurrency}"
+            )
+            await _measure("frío", _cold, session, base_url, args, MemoryCacheStore)
+
+            # La caché en caliente se rellena una vez con un descubrimiento completo
+            seeded = MemoryCacheStore()
+            await _cold(session, base_url, args.concurrency, seeded)
+
+            def _seeded_store():
+                store = MemoryCacheStore()
+                store.snapshot = seeded.snapshot
+                return store
+
+            await _measure("caliente + revalidación", _warm, session, base_url, args, _seeded_store)
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=3)
+    parser.add_argument("--maps", type=int, default=2)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--map-size", type=int, default=512)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_DISCOVERY_CONCURRENCY)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
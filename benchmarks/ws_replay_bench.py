@@ -0,0 +1,148 @@
+"""Reproduce frames grabados a través de ``KoboldWebSocketClient._handle_message``.
+
+Recorre el camino completo (decodificación, despacho por topic/evento y
+``update_robot_state``) contra el almacén de estado y un ``hass`` simulado y muestra
+mensajes/s, latencia p50/p99 por mensaje y bytes asignados por mensaje.
+
+Uso (desde la raíz del repositorio, con Home Assistant instalado):
+
+    python benchmarks/ws_replay_bench.py [--iterations 200] [--corpus fichero.jsonl]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from custom_components.kobold_vr7.api.websocket_client import KoboldWebSocketClient  # noqa: E402
+from custom_components.kobold_vr7.service.robot_state import UPDATE_VACUUM  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "companion_frames.jsonl")
+
+
+class StubHass:
+    """Lo mínimo de ``HomeAssistant`` que usa el cliente: el bucle y ``data``."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        # Sin dispatcher registrado, async_dispatcher_send no hace nada
+        self.data = {}
+
+
+class StubEntity:
+    """Entidad de aspiradora suscrita al almacén de estado que solo cuenta sus escrituras."""
+
+    def __init__(self, states, robot_id, serial):
+        self._robot = SimpleNamespace(id=robot_id, serial=serial)
+        self.writes = 0
+        states.add_robot(self._robot)
+        states.subscribe(robot_id, self._robot_updated)
+
+    def _robot_updated(self, kind):
+        if kind == UPDATE_VACUUM:
+            self.writes += 1
+
+
+def _robot_ids(frames):
+    """Extrae los robots del corpus a partir de los topics Phoenix."""
+
+    ids = set()
+    for frame in frames:
+        marker = frame.find('"robots:')
+        if marker != -1:
+            ids.add(frame[marker + 8:frame.index('"', marker + 8)])
+    return sorted(ids)
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def _replay(frames, iterations, coalesce_window):
+    loop = asyncio.get_running_loop()
+    hass = StubHass(loop)
+    client = KoboldWebSocketClient(
+        hass, None, "token", None, "es-ES", coalesce_window=coalesce_window
+    )
+    entities = []
+    for robot_id in _robot_ids(frames):
+        entity = StubEntity(client.states, robot_id, None)
+        client.add_robot(robot_id)
+        entities.append(entity)
+
+    handle = client._handle_message
+
+    # Calentamiento (compilación de decodificadores, cachés de atributos)
+    for frame in frames:
+        await handle(frame)
+
+    # Pasada de tiempos
+    latencies = []
+    perf_counter_ns = time.perf_counter_ns
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for frame in frames:
+            before = perf_counter_ns()
+            await handle(frame)
+            latencies.append(perf_counter_ns() - before)
+    elapsed = time.perf_counter() - start
+
+    # Pasada de memoria, separada porque tracemalloc ralentiza la ejecución
+    allocations = []
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await handle(frame)
+        allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return latencies, elapsed, allocations, entities, client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument(
+        "--coalesce-window", type=float, default=0, help="ventana de agrupación en segundos"
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="activa el log DEBUG de la integración"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, stream=open(os.devnull, "w"))
+    if args.debug:
+        logging.getLogger("custom_components.kobold_vr7").setLevel(logging.DEBUG)
+
+    with open(args.corpus, encoding="utf-8") as corpus:
+        frames = [line.strip() for line in corpus if line.strip()]
+
+    latencies, elapsed, allocations, entities, client = asyncio.run(
+        _replay(frames, args.iterations, args.coalesce_window)
+    )
+
+    total = len(latencies)
+    print(f"{len(frames)} frames x {args.iterations} iteraciones = {total} mensajes")
+    print(f"mensajes/s:        {total / elapsed:,.0f}")
+    print(f"latencia p50:      {_percentile(latencies, 50) / 1000:.1f} µs")
+    print(f"latencia p99:      {_percentile(latencies, 99) / 1000:.1f} µs")
+    print(f"bytes/mensaje:     media {statistics.mean(allocations):,.0f}, "
+          f"p99 {_percentile(allocations, 99):,}")
+    print(f"escrituras:        {sum(entity.writes for entity in entities)}")
+    for robot_id, stats in client.write_stats.items():
+        print(f"  {robot_id}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
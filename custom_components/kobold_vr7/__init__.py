@@ -7,20 +7,41 @@ Proporciona métodos para configurar y desinstalar la integración.
 import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
 from .const import DOMAIN
+from .hub import KoboldHub
+from .service.robots_cache_store import RobotsCacheStore
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["vacuum", "sensor"]
+PLATFORMS = ["vacuum", "sensor", "image"]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: dict):
+    """Registra los servicios comunes a todas las entradas."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Configura la integración desde una entrada de configuración."""
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {"config": entry.data}
+
+    # El hub descubre los robots aquí para distinguir fallos pasajeros (se reintenta
+    # la carga más tarde) de los permanentes; las plataformas reutilizan el resultado
+    hub = KoboldHub(hass, entry)
+    await hub.async_setup()
+
+    hass.data[DOMAIN][entry.entry_id] = hub
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     # Usar async_forward_entry_setups en lugar de async_forward_entry_setup
     try:
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        await hub.async_start()
         _LOGGER.debug(f"Successfully loaded {DOMAIN} integration")
         return True
     except Exception as e:
@@ -28,13 +49,31 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         return False
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """Recarga la integración cuando cambian las opciones."""
+    hub = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    # El listener también salta al actualizar entry.data; solo recargamos por opciones
+    if hub is not None and hub.options == dict(entry.options):
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Desinstala una entrada de configuración."""
     try:
         unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
         if unloaded:
-            hass.data[DOMAIN].pop(entry.entry_id)
+            hub: KoboldHub = hass.data[DOMAIN].pop(entry.entry_id)
+            await hub.async_shutdown()
         return unloaded
     except Exception as e:
         _LOGGER.error(f"Error unloading {DOMAIN} integration: {e}")
         return False
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Elimina la caché persistente al borrar la entrada de configuración."""
+    try:
+        await RobotsCacheStore(hass, entry.entry_id).async_remove()
+    except Exception as e:
+        _LOGGER.debug(f"Error removing {DOMAIN} cache: {e}")
@@ -0,0 +1,259 @@
+"""Capa de decodificación compartida por el WebSocket y el cliente REST.
+
+Cada modelo se prepara una sola vez en un ``_StructDecoder`` que conoce sus
+campos, valores por defecto y submodelos, de modo que decodificar un mensaje
+no reconstruye diccionarios de valores por defecto ni falla ante claves
+nuevas: los campos desconocidos se ignoran.
+"""
+
+import json
+import logging
+import typing
+from dataclasses import MISSING, fields, is_dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .model.robot_wss_cleaning_state_response import (
+    CleaningStateBody,
+    CleaningStateResponse,
+    Run,
+    RunSettings,
+    RunStats,
+    RunTiming,
+)
+from .model.robot_wss_last_state_or_phx_reply_response import (
+    AvailableCommands,
+    ResponseBody,
+)
+
+try:  # orjson viene incluido con Home Assistant; json estándar como alternativa
+    import orjson
+
+    def loads(data):
+        """Decodifica JSON con orjson."""
+        return orjson.loads(data)
+
+    JSON_BACKEND = "orjson"
+except ImportError:  # pragma: no cover - depende del entorno
+    def loads(data):
+        """Decodifica JSON con la librería estándar."""
+        return json.loads(data)
+
+    JSON_BACKEND = "json"
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tipos de resultado para que el cliente elija el manejador adecuado
+KIND_STATE = "state"
+KIND_CLEANING = "cleaning"
+
+
+class _StructDecoder:
+    """Decodificador precalculado de un dataclass que ignora campos desconocidos.
+
+    Al crearlo se resuelve una sola vez la tabla de campos del modelo (nombre,
+    valor por defecto y decodificador del submodelo) y se construye un cierre
+    que lee cada campo con ``dict.get`` y llama al constructor con argumentos
+    posicionales, sin copiar diccionarios ni recorrer las claves del mensaje.
+    """
+
+    __slots__ = ("_cls", "decode")
+
+    def __init__(
+        self,
+        cls,
+        defaults: Optional[Dict[str, Any]] = None,
+        fill_missing: Tuple[str, ...] = (),
+    ) -> None:
+        self._cls = cls
+        defaults = defaults or {}
+        hints = typing.get_type_hints(cls)
+        # (nombre, valor por defecto, decodificador del submodelo, es lista, rellenar si falta)
+        table = []
+        for f in fields(cls):
+            if f.name in defaults:
+                default = defaults[f.name]
+            else:
+                default = None if f.default is MISSING else f.default
+            # Submodelos (o listas de submodelos) según las anotaciones de tipo
+            inner, is_list = _unwrap(hints[f.name])
+            nested = None
+            if inner is not None and is_dataclass(inner):
+                nested = struct_decoder(inner).decode
+            table.append((f.name, default, nested, is_list, f.name in fill_missing))
+        # Se expone el cierre directamente para evitar una llamada extra
+        self.decode = _build_decode(cls, tuple(table))
+
+    def __call__(self, data: Optional[Dict[str, Any]]):
+        return self.decode(data)
+
+
+def _build_decode(cls, table) -> Callable[[Optional[Dict[str, Any]]], Any]:
+    """Crea la función que construye ``cls`` a partir de un diccionario según su tabla."""
+
+    names = tuple(name for name, _default, _nested, _is_list, _fill in table)
+    defaults = tuple(default for _name, default, _nested, _is_list, _fill in table)
+    # Solo los submodelos necesitan un segundo paso; el resto es una lectura con valor por defecto
+    nested_fields = tuple(
+        (index, nested, is_list, fill)
+        for index, (_name, _default, nested, is_list, fill) in enumerate(table)
+        if nested is not None
+    )
+
+    if not nested_fields:
+
+        def _decode_flat(data):
+            if data.__class__ is not dict:
+                data = {}
+            return cls(*map(data.get, names, defaults))
+
+        return _decode_flat
+
+    def _decode(data):
+        if data.__class__ is not dict:
+            data = {}
+        # map() hace cada dict.get(nombre, defecto) sin pasar por el intérprete
+        values = list(map(data.get, names, defaults))
+        for index, nested, is_list, fill in nested_fields:
+            value = values[index]
+            if value is not None:
+                values[index] = [nested(item) for item in value] if is_list else nested(value)
+            elif fill:
+                # Submodelo que se construye vacío (con sus valores por defecto) si falta
+                values[index] = nested({})
+        return cls(*values)
+
+    return _decode
+
+
+def _unwrap(hint) -> Tuple[Any, bool]:
+    """Devuelve el tipo interno de Optional[...] / List[...] y si es una lista."""
+
+    origin = typing.get_origin(hint)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        return _unwrap(args[0]) if len(args) == 1 else (None, False)
+    if origin in (list, typing.List):
+        args = typing.get_args(hint)
+        return (args[0] if args else None), True
+    return hint, False
+
+
+_DECODERS: Dict[type, _StructDecoder] = {}
+
+
+def struct_decoder(cls) -> _StructDecoder:
+    """Devuelve (y prepara la primera vez) el decodificador de un modelo."""
+
+    decoder = _DECODERS.get(cls)
+    if decoder is None:
+        decoder = _DECODERS[cls] = _StructDecoder(cls)
+    return decoder
+
+
+def decode_struct(cls, data: Optional[Dict[str, Any]]):
+    """Construye un modelo a partir de un diccionario ignorando claves desconocidas."""
+
+    return struct_decoder(cls)(data)
+
+
+# Valores por defecto equivalentes a los del parser anterior
+_DECODERS[AvailableCommands] = _StructDecoder(
+    AvailableCommands,
+    defaults={
+        "cancel": False,
+        "extract": False,
+        "pause": False,
+        "resume": False,
+        "return_to_base": False,
+        "start": False,
+    },
+)
+_DECODERS[RunTiming] = _StructDecoder(
+    RunTiming, defaults={"charging": 0, "end": "", "error": 0, "paused": 0, "start": ""}
+)
+_DECODERS[RunStats] = _StructDecoder(RunStats, defaults={"area": 0.0, "pickup_count": 0})
+_DECODERS[RunSettings] = _StructDecoder(
+    RunSettings, defaults={"mode": "", "navigation_mode": ""}
+)
+_DECODERS[Run] = _StructDecoder(
+    Run, defaults={"state": ""}, fill_missing=("settings", "stats", "timing")
+)
+_DECODERS[CleaningStateBody] = _StructDecoder(
+    CleaningStateBody,
+    defaults={"ability": "", "cleaning_type": "", "started_by": ""},
+    fill_missing=("timing",),
+)
+_DECODERS[ResponseBody] = _StructDecoder(
+    ResponseBody, fill_missing=("available_commands", "cleaning_center", "details")
+)
+
+_decode_response_body = _DECODERS[ResponseBody].decode
+_decode_cleaning_state_body = _DECODERS[CleaningStateBody].decode
+
+
+def decode_response_body(body: Dict[str, Any]) -> ResponseBody:
+    """Decodifica el cuerpo de last_state / phx_reply / state_changed."""
+
+    response_body = _decode_response_body(body)
+    # Un autonomy_states vacío se trata como ausente, igual que antes
+    if not body.get("autonomy_states"):
+        response_body.autonomy_states = None
+    return response_body
+
+
+def decode_cleaning_state(payload: Dict[str, Any]) -> CleaningStateResponse:
+    """Normaliza la estructura de los mensajes cleaning_state."""
+
+    # Los eventos JSON planos incluyen la información en "state"
+    # mientras que los mensajes Phoenix la envían en "body" junto al código.
+    body_source = payload.get("body") or payload.get("state") or {}
+    body = _decode_cleaning_state_body(body_source)
+    if body.runs is None:
+        body.runs = []
+    return CleaningStateResponse(code=payload.get("code", 200), body=body)
+
+
+def _decode_phx_reply(payload: Dict[str, Any]) -> Optional[ResponseBody]:
+    response = payload.get("response")
+    if isinstance(response, dict) and "body" in response:
+        return decode_response_body(response["body"])
+    return None
+
+
+def _decode_last_state(payload: Dict[str, Any]) -> Optional[ResponseBody]:
+    if "body" in payload:
+        return decode_response_body(payload["body"])
+    return None
+
+
+def _decode_phoenix_cleaning_state(payload: Dict[str, Any]) -> Optional[CleaningStateResponse]:
+    if "body" in payload:
+        return decode_cleaning_state(payload)
+    return None
+
+
+def _decode_state_changed(payload: Optional[Dict[str, Any]]) -> Optional[ResponseBody]:
+    if payload and "state" in payload:
+        return decode_response_body(payload["state"])
+    return None
+
+
+def _decode_plain_cleaning_state(
+    payload: Optional[Dict[str, Any]],
+) -> Optional[CleaningStateResponse]:
+    if payload:
+        return decode_cleaning_state(payload)
+    return None
+
+
+# Tablas de despacho por nombre de evento: (decodificador, tipo de resultado)
+PHOENIX_EVENT_DECODERS: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], str]] = {
+    "phx_reply": (_decode_phx_reply, KIND_STATE),
+    "last_state": (_decode_last_state, KIND_STATE),
+    "cleaning_state": (_decode_phoenix_cleaning_state, KIND_CLEANING),
+}
+
+PLAIN_EVENT_DECODERS: Dict[str, Tuple[Callable[[Optional[Dict[str, Any]]], Any], str]] = {
+    "state_changed": (_decode_state_changed, KIND_STATE),
+    "cleaning_state": (_decode_plain_cleaning_state, KIND_CLEANING),
+}
@@ -1,28 +1,73 @@
-from dataclasses import dataclass, field
-from typing import Optional
+import base64
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional
 
 
-@dataclass
+def _project(cls, data: Optional[Dict[str, Any]]):
+    """Construye un dataclass ignorando las claves que no forman parte del modelo."""
+    if data is None:
+        return None
+    if isinstance(data, cls):
+        return data
+    names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in names})
+
+
+class MapBlob:
+    """Binario de un mapa guardado como bytes y decodificado solo bajo demanda.
+
+    El payload base64 de la API se convierte una vez a bytes (un 25 % menos
+    que la cadena original) y se comparte sin copias mediante memoryview.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+
+    @classmethod
+    def from_base64(cls, value: Optional[str]) -> Optional["MapBlob"]:
+        if not value:
+            return None
+        return cls(base64.b64decode(value))
+
+    def view(self) -> memoryview:
+        """Acceso de solo lectura a los bytes sin copiarlos."""
+        return memoryview(self._data)
+
+    def to_base64(self) -> str:
+        """Serializa el binario para guardarlo en la caché persistente."""
+        return base64.b64encode(self._data).decode("ascii")
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        # Nunca volcar el contenido en los logs
+        return f"MapBlob({len(self._data)} bytes)"
+
+
+@dataclass(slots=True)
 class MapDimensions:
     height: int
     width: int
     resolution: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     dir: float
     x: int
     y: int
 
 
-@dataclass
+@dataclass(slots=True)
 class RobotPosition:
     base: Position
     pos: Position
 
 
-@dataclass
+@dataclass(slots=True)
 class CropDimensions:
     bottom: int
     left: int
@@ -31,7 +76,7 @@ class CropDimensions:
     scale: float
 
 
-@dataclass
+@dataclass(slots=True)
 class MapColors:
     coverage: str
     uncertain: str
@@ -40,24 +85,60 @@ class MapColors:
     tof: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RobotMapResponse:
-    default: bool
-    name: str
-    original: MapDimensions
-    inserted_at: str
-    updated_at: str
+    """Proyección ligera de un floorplan de Orbital con los campos que usa la integración."""
+
     floorplan_uuid: str
-    promotable: bool
-    promoted_at: Optional[str]
-    rank_uuid: str
-    started_by: str
-    robot: RobotPosition
-    real_crop: CropDimensions
-    rank_crop: CropDimensions    
-    processed_real_binary: str
-    processed_rank_binary: str
-    map_colors: MapColors
-    processed_thumb_rank_binary: str = field(default=None, repr=False)  # No aparecerá en logs
+    name: str
+    default: bool = False
+    original: Optional[MapDimensions] = None
+    robot: Optional[RobotPosition] = None
+    real_crop: Optional[CropDimensions] = None
+    rank_crop: Optional[CropDimensions] = None
+    map_colors: Optional[MapColors] = None
+    # Binarios decodificados bajo demanda; la miniatura no se conserva
+    processed_real_binary: Optional[MapBlob] = None
+    processed_rank_binary: Optional[MapBlob] = None
+    updated_at: Optional[str] = None
     last_modified_at: Optional[str] = None
     map_versions_count: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RobotMapResponse":
+        """Proyecta la respuesta REST (o la caché) descartando lo que no se usa."""
+        robot = data.get("robot")
+        return cls(
+            floorplan_uuid=data["floorplan_uuid"],
+            name=data.get("name"),
+            default=data.get("default", False),
+            original=_project(MapDimensions, data.get("original")),
+            robot=(
+                RobotPosition(
+                    base=_project(Position, robot.get("base")),
+                    pos=_project(Position, robot.get("pos")),
+                )
+                if robot
+                else None
+            ),
+            real_crop=_project(CropDimensions, data.get("real_crop")),
+            rank_crop=_project(CropDimensions, data.get("rank_crop")),
+            map_colors=_project(MapColors, data.get("map_colors")),
+            processed_real_binary=MapBlob.from_base64(data.get("processed_real_binary")),
+            processed_rank_binary=MapBlob.from_base64(data.get("processed_rank_binary")),
+            updated_at=data.get("updated_at"),
+            last_modified_at=data.get("last_modified_at"),
+            map_versions_count=data.get("map_versions_count"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el mapa con los mismos nombres de campo que la API."""
+        result = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, MapBlob):
+                value = value.to_base64()
+            elif value is not None and hasattr(value, "__dataclass_fields__"):
+                value = asdict(value)
+            result[f.name] = value
+        return result
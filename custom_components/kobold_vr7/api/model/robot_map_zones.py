@@ -1,20 +1,45 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Shape:
     coordinates: List[List[int]]  # Una lista de puntos [x, y]
 
 
-@dataclass
+@dataclass(slots=True)
 class CleaningTracksResponse:
+    """Proyección ligera de una zona; el binario base64 de la zona no se conserva."""
+
     track_uuid: str
-    name: str
-    icon_id: str
-    type: str  # Por ejemplo, "cleaning"
-    shapes: List[Shape]  # Lista de formas que representa las áreas de limpieza
-    binary: str  # Datos binarios del mapa codificados en base64
-    cleaning_mode: str  # Por ejemplo, "auto"
-    inserted_at: str  # Fecha en formato ISO 8601
-    updated_at: str  # Fecha en formato ISO 8601
+    name: Optional[str]
+    type: Optional[str] = None  # Por ejemplo, "cleaning"
+    shapes: List[Shape] = None  # Lista de formas que representa las áreas de limpieza
+    cleaning_mode: Optional[str] = None  # Por ejemplo, "auto"
+    updated_at: Optional[str] = None  # Fecha en formato ISO 8601
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CleaningTracksResponse":
+        """Proyecta la respuesta REST (o la caché) descartando lo que no se usa."""
+        return cls(
+            track_uuid=data["track_uuid"],
+            name=data.get("name"),
+            type=data.get("type"),
+            shapes=[
+                Shape(coordinates=shape.get("coordinates") or [])
+                for shape in data.get("shapes") or []
+            ],
+            cleaning_mode=data.get("cleaning_mode"),
+            updated_at=data.get("updated_at"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa la zona con los mismos nombres de campo que la API."""
+        return {
+            "track_uuid": self.track_uuid,
+            "name": self.name,
+            "type": self.type,
+            "shapes": [{"coordinates": shape.coordinates} for shape in self.shapes or []],
+            "cleaning_mode": self.cleaning_mode,
+            "updated_at": self.updated_at,
+        }
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -8,3 +9,11 @@ class ValidateOtpResponse:
     id_token: str
     scope: str
     token_type: str
+    # Solo se devuelve si se pide el scope offline_access
+    refresh_token: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ValidateOtpResponse":
+        """Crea la respuesta ignorando campos que Auth0 pueda añadir."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
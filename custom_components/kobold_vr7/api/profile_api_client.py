@@ -17,6 +17,10 @@ from ..const import (
 class ProfileApiClientError(Exception):
     """Error personalizado para el cliente del perfil."""
 
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
 
 class ProfileApiClient:
     """Cliente responsable de autenticar al usuario en el servicio Companion."""
@@ -38,22 +42,25 @@ class ProfileApiClient:
 
         url = f"{self._host}{self._path_login}"
         headers = self._build_headers(id_token)
-
-        self._logger.debug(
-            "Solicitando token de WebSocket en %s con cabeceras %s",
-            url,
-            self._sanitize_request_headers(headers),
-        )
+        # Las cabeceras saneadas solo se construyen si el log DEBUG está activo
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+
+        if debug:
+            self._logger.debug(
+                "Solicitando token de WebSocket en %s con cabeceras %s",
+                url,
+                self._sanitize_request_headers(headers),
+            )
 
         try:
             async with self._session.post(url, headers=headers) as response:
                 response_text = await response.text()
 
-                response_headers = dict(response.headers)
-                self._logger.debug(
-                    "Cabeceras de respuesta de Companion: %s",
-                    self._sanitize_response_headers(response_headers),
-                )
+                if debug:
+                    self._logger.debug(
+                        "Cabeceras de respuesta de Companion: %s",
+                        self._sanitize_response_headers(dict(response.headers)),
+                    )
 
                 if response.status != 200:
                     self._logger.error(
@@ -62,7 +69,8 @@ class ProfileApiClient:
                         response_text,
                     )
                     raise ProfileApiClientError(
-                        f"Error al autenticar en Companion: {response.status}"
+                        f"Error al autenticar en Companion: {response.status}",
+                        response.status,
                     )
 
                 authorization = response.headers.get("Authorization")
@@ -74,14 +82,15 @@ class ProfileApiClient:
                         "No se recibió cabecera Authorization del servicio Companion"
                     )
 
-                self._logger.debug(
-                    "Respuesta de Companion recibida correctamente: %s",
-                    response_text,
-                )
-                self._logger.debug(
-                    "Cabecera Authorization recibida: %s",
-                    self._sanitize_authorization(authorization),
-                )
+                if debug:
+                    self._logger.debug(
+                        "Respuesta de Companion recibida correctamente: %s",
+                        response_text,
+                    )
+                    self._logger.debug(
+                        "Cabecera Authorization recibida: %s",
+                        self._sanitize_authorization(authorization),
+                    )
                 return authorization
         except aiohttp.ClientError as error:
             self._logger.error("Error de red al llamar a Companion: %s", error)
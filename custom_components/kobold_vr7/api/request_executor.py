@@ -0,0 +1,259 @@
+"""Ejecución de peticiones REST con plazos, reintentos y errores tipados.
+
+Cada petición lleva su propia política (plazo total y número de reintentos).
+Solo se reintentan las peticiones idempotentes (GET) ante errores
+transitorios (red, plazo agotado, 5xx); un 429 se reintenta siempre, porque el
+servidor no ha procesado la petición, respetando ``Retry-After``. Un 401 llama
+una sola vez al gancho de renovación de credenciales y, si este las renueva,
+repite la petición con las cabeceras nuevas.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from ..service.metrics import MetricsRegistry
+from .decoder import loads
+
+_LOGGER = logging.getLogger(__name__)
+
+# Espera base y máxima entre reintentos (segundos); la espera real es aleatoria ("full jitter")
+_BACKOFF_BASE = 0.5
+_BACKOFF_MAX = 8
+# Un Retry-After mayor que esto no se espera: se devuelve el error al llamante
+_RETRY_AFTER_MAX = 60
+
+
+class KoboldApiError(Exception):
+    """Error de una petición REST a la nube de Kobold."""
+
+    # Un error transitorio puede resolverse repitiendo la petición más tarde
+    transient = False
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class KoboldApiConnectionError(KoboldApiError):
+    """No se pudo contactar con el servidor."""
+
+    transient = True
+
+
+class KoboldApiTimeoutError(KoboldApiConnectionError):
+    """El servidor no respondió dentro del plazo de la petición."""
+
+
+class KoboldApiServerError(KoboldApiError):
+    """El servidor respondió con un error 5xx."""
+
+    transient = True
+
+
+class KoboldApiRateLimitError(KoboldApiError):
+    """El servidor limitó la frecuencia de peticiones (429)."""
+
+    transient = True
+
+    def __init__(self, message: str, retry_after: Optional[float]) -> None:
+        super().__init__(message, 429)
+        self.retry_after = retry_after
+
+
+class KoboldApiAuthError(KoboldApiError):
+    """Las credenciales han caducado o han sido revocadas (401/403)."""
+
+
+class KoboldApiResponseError(KoboldApiError):
+    """El servidor rechazó la petición (4xx distinto de 401/403/429)."""
+
+
+@dataclass(frozen=True, slots=True)
+class RequestPolicy:
+    """Plazo total y reintentos de un tipo de petición."""
+
+    timeout: float = 15
+    retries: int = 2
+
+
+class RequestExecutor:
+    """Envía peticiones con una política por endpoint y un gancho de renovación ante 401."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        on_unauthorized: Optional[Callable[[], Awaitable[bool]]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self._session = session
+        # Latencia y códigos de estado por endpoint (opcional)
+        self._metrics = metrics
+        # Devuelve True si ha renovado las credenciales y la petición debe repetirse
+        self.on_unauthorized = on_unauthorized
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "credential_refreshes": 0,
+        }
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers_factory: Callable[[], Dict[str, str]],
+        policy: RequestPolicy,
+        json: Optional[Dict[str, Any]] = None,
+        endpoint: Optional[str] = None,
+    ) -> Any:
+        """Ejecuta la petición y devuelve el cuerpo JSON decodificado (o None si está vacío).
+
+        ``endpoint`` es el nombre con el que se agrupan las métricas de la petición.
+        """
+
+        idempotent = method.upper() == "GET"
+        refreshed = False
+        attempt = 0
+        while True:
+            try:
+                return await self._send(
+                    method, url, headers_factory(), policy, json, endpoint or method
+                )
+            except KoboldApiAuthError:
+                if refreshed or self.on_unauthorized is None or not await self.on_unauthorized():
+                    raise
+                # Las cabeceras se regeneran con las credenciales renovadas
+                refreshed = True
+                self._stats["credential_refreshes"] += 1
+                _LOGGER.debug("Credenciales renovadas, repitiendo %s %s", method, url)
+                continue
+            except KoboldApiError as error:
+                delay = self._retry_delay(error, attempt, policy, idempotent)
+                if delay is None:
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                _LOGGER.debug(
+                    "%s %s falló (%s), reintento %s/%s en %.1f s",
+                    method,
+                    url,
+                    error,
+                    attempt,
+                    policy.retries,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        policy: RequestPolicy,
+        json: Optional[Dict[str, Any]],
+        endpoint: str,
+    ) -> Any:
+        self._stats["requests"] += 1
+        # Los cuerpos pueden ser grandes: solo se registran con el log en debug
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            _LOGGER.debug("Making %s request to %s with body: %s", method, url, json)
+        started = time.perf_counter()
+        status: Any = "connection_error"
+        try:
+            async with self._session.request(
+                method,
+                url,
+                json=json,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=policy.timeout),
+            ) as response:
+                status = response.status
+                if 200 <= response.status < 300:
+                    # Decodifica con el mismo backend JSON que el WebSocket
+                    raw_body = await response.read()
+                    response_json = loads(raw_body) if raw_body else None
+                    if debug:
+                        _LOGGER.debug(
+                            "Received response %s from %s %s: %s",
+                            response.status,
+                            method,
+                            url,
+                            response_json,
+                        )
+                    return response_json
+
+                error_text = await response.text()
+                raise self._error_for_status(response, error_text)
+        except asyncio.TimeoutError as error:
+            self._stats["timeouts"] += 1
+            status = "timeout"
+            raise KoboldApiTimeoutError(
+                f"{method} {url} sin respuesta tras {policy.timeout} s"
+            ) from error
+        except aiohttp.ClientError as error:
+            raise KoboldApiConnectionError(f"{method} {url}: {error}") from error
+        finally:
+            if self._metrics is not None:
+                self._metrics.record_request(
+                    endpoint, (time.perf_counter() - started) * 1000, status
+                )
+
+    def _error_for_status(self, response: aiohttp.ClientResponse, text: str) -> KoboldApiError:
+        status = response.status
+        message = f"Request failed: {status} {text}"
+        if status in (401, 403):
+            return KoboldApiAuthError(message, status)
+        if status == 429:
+            self._stats["rate_limited"] += 1
+            return KoboldApiRateLimitError(
+                message, _parse_retry_after(response.headers.get("Retry-After"))
+            )
+        if status >= 500:
+            self._stats["server_errors"] += 1
+            return KoboldApiServerError(message, status)
+        return KoboldApiResponseError(message, status)
+
+    @staticmethod
+    def _retry_delay(
+        error: KoboldApiError, attempt: int, policy: RequestPolicy, idempotent: bool
+    ) -> Optional[float]:
+        """Espera antes del siguiente intento, o None si no debe reintentarse."""
+
+        if not error.transient or attempt >= policy.retries:
+            return None
+        if isinstance(error, KoboldApiRateLimitError):
+            if error.retry_after is not None:
+                return error.retry_after if error.retry_after <= _RETRY_AFTER_MAX else None
+        elif not idempotent:
+            # Un POST pudo llegar al robot aunque la respuesta se perdiera
+            return None
+        return random.uniform(0, min(_BACKOFF_MAX, _BACKOFF_BASE * 2**attempt))
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta ``Retry-After`` en segundos o como fecha HTTP."""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -1,7 +1,7 @@
-import logging
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 import aiohttp
 
+from .decoder import decode_struct
 from .model.register_device_request import RegisterDeviceRequest
 from .model.register_device_response import RegisterDeviceResponse
 from .model.robot_map_zones import CleaningTracksResponse
@@ -10,45 +10,76 @@ from .model.cleaning_modes_response import CleaningModesResponse
 from .model.robot_map_response import RobotMapResponse
 from .model.cleaning_show_response import CleaningShowResponse
 from .model.cleaning_start_request import CleaningStartRequest
+from ..service.metrics import MetricsRegistry
+from .request_executor import RequestExecutor, RequestPolicy
+
+# Listados pequeños; se reintentan ante errores transitorios
+_READ_POLICY = RequestPolicy(timeout=15, retries=3)
+# Las zonas incluyen rásteres en base64 y tardan más en descargarse
+_TRACKS_POLICY = RequestPolicy(timeout=30, retries=3)
+# Órdenes (POST): solo se repiten tras un 429, que el servidor no ha procesado
+_COMMAND_POLICY = RequestPolicy(timeout=10, retries=1)
 
 
 class RobotsApiClient:
-    def __init__(self, session: aiohttp.ClientSession, token: str, host: str):
-        self._session = session
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        token: str,
+        host: str,
+        on_unauthorized: Optional[Callable[[], Awaitable[bool]]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
         self._token = token
         self._host = host
-        self._logger = logging.getLogger(__name__)
+        self._executor = RequestExecutor(session, on_unauthorized, metrics)
+
+    @property
+    def token(self) -> str:
+        return self._token
+
+    @property
+    def request_stats(self) -> Dict[str, int]:
+        return self._executor.stats
+
+    def set_token(self, token: str) -> None:
+        """Sustituye el id_token usado en las peticiones siguientes."""
+        self._token = token
 
     async def register_device(self) -> RegisterDeviceResponse:
         url = f"{self._host}/mobile_devices"
         payload = RegisterDeviceRequest().to_dict()
-        response = await self._make_request("POST", url, json=payload)
-        return RegisterDeviceResponse(**response)
+        response = await self._make_request(
+            "POST", url, json=payload, policy=_COMMAND_POLICY, endpoint="mobile_devices"
+        )
+        return decode_struct(RegisterDeviceResponse, response)
 
     async def get_user_robots(self) -> List[RobotResponse]:
         url = f"{self._host}/users/me/robots"
-        response = await self._make_request("GET", url)
-        return [RobotResponse(**robot) for robot in response]
+        response = await self._make_request("GET", url, endpoint="robots")
+        return [decode_struct(RobotResponse, robot) for robot in response]
 
     async def get_cleaning_modes(self, robot_id: str) -> CleaningModesResponse:
         url = f"{self._host}/robots/{robot_id}/features"
-        response = await self._make_request("GET", url)
-        return CleaningModesResponse(**response)
+        response = await self._make_request("GET", url, endpoint="features")
+        return decode_struct(CleaningModesResponse, response)
 
     async def get_robot_maps(self, robot_id: str) -> List[RobotMapResponse]:
         url = f"{self._host}/robots/{robot_id}/floorplans?sort_by=promoted_at&sort_order=asc"
-        response = await self._make_request("GET", url)
-        return [RobotMapResponse(**map_data) for map_data in response]
+        response = await self._make_request("GET", url, endpoint="floorplans")
+        return [RobotMapResponse.from_dict(map_data) for map_data in response]
 
     async def get_recent_cleaning_maps(self, robot_id: str) -> List[Dict[str, Any]]:
         url = f"{self._host}/robots/{robot_id}/cleaningmaps?cleaning_types[]=persistent"
-        response = await self._make_request("GET", url)
+        response = await self._make_request("GET", url, endpoint="cleaningmaps")
         return response
 
     async def get_zones_by_floor_plan(self, floorplan_uuid: str) -> List[CleaningTracksResponse]:
         url = f"{self._host}/maps/floorplans/{floorplan_uuid}/tracks"
-        response = await self._make_request("GET", url)
-        return [CleaningTracksResponse(**zone) for zone in response]
+        response = await self._make_request(
+            "GET", url, policy=_TRACKS_POLICY, endpoint="tracks"
+        )
+        return [CleaningTracksResponse.from_dict(zone) for zone in response]
 
     async def start_cleaning(self, robot_id, cleaning_request):
         """Inicia la limpieza con la configuración especificada."""
@@ -68,7 +99,14 @@ class RobotsApiClient:
             'mobile-app-os-version': '11'
         }
         
-        response = await self._make_request("POST", url, json=payload, additional_headers=headers)
+        response = await self._make_request(
+            "POST",
+            url,
+            json=payload,
+            additional_headers=headers,
+            policy=_COMMAND_POLICY,
+            endpoint="cleaning_start",
+        )
         return response
 
     async def send_to_base(self, serial_robot_id: str) -> str:
@@ -79,7 +117,7 @@ class RobotsApiClient:
 
     async def show_cleaning(self, serial_robot_id: str) -> CleaningShowResponse:
         response = await self._send_message_to_robot(serial_robot_id, "cleaning.show")
-        return CleaningShowResponse(**response)
+        return decode_struct(CleaningShowResponse, response)
 
     async def resume_clean(self, serial_robot_id: str) -> str:
         return await self._send_message_to_robot(serial_robot_id, "cleaning.resume")
@@ -90,7 +128,9 @@ class RobotsApiClient:
     async def _send_message_to_robot(self, robot_id: str, ability: str) -> Any:
         url = f"{self._host}/vendors/3/robots/{robot_id}/messages"
         payload = {"ability": ability}
-        response = await self._make_request("POST", url, json=payload)
+        response = await self._make_request(
+            "POST", url, json=payload, policy=_COMMAND_POLICY, endpoint="messages"
+        )
         return response
 
     async def _make_request(
@@ -99,27 +139,19 @@ class RobotsApiClient:
         url: str,
         json: Optional[Dict[str, Any]] = None,
         additional_headers: Optional[Dict[str, str]] = None,
+        policy: RequestPolicy = _READ_POLICY,
+        endpoint: Optional[str] = None,
     ) -> Any:
-        headers = self._create_headers()
-        if additional_headers:
-            headers.update(additional_headers)
-
-        # Log del body enviado
-        self._logger.debug(
-            "Making %s request to %s with body: %s and headers %s", method, url, json, headers)
-
-        async with self._session.request(method, url, json=json, headers=headers) as response:
-            if response.status == 200:
-                response_json = await response.json()  # Resuelve el JSON de la respuesta
-                self._logger.debug(
-                    "Received response: %s. Response: %s",  response, response_json)
-                return response_json
-
-            error_text = await response.text()
-            self._logger.error("Request failed: %s %s",
-                               response.status, error_text)
-            raise Exception(
-                f"Request failed: {response.status} {error_text}")
+        def _headers() -> Dict[str, str]:
+            # Se construyen en cada intento para usar el token vigente tras una renovación
+            headers = self._create_headers()
+            if additional_headers:
+                headers.update(additional_headers)
+            return headers
+
+        return await self._executor.request(
+            method, url, _headers, policy, json=json, endpoint=endpoint
+        )
 
     def _create_headers(self) -> Dict[str, str]:
         return {
@@ -3,8 +3,12 @@ from typing import Any, Dict, Optional
 
 import aiohttp
 
+from ..service.token_utils import mask_token
 from .model.validate_otp_response import ValidateOtpResponse
 
+# Campos del cuerpo que son credenciales y no pueden aparecer en los logs
+_SECRET_FIELDS = ("otp", "refresh_token")
+
 
 class UserApiClient:
     def __init__(
@@ -42,7 +46,8 @@ class UserApiClient:
             source = "vorwerk_auth0"
         payload = {
             "client_id": self.client_id,
-            "scope": "openid profile email",
+            # offline_access hace que Auth0 devuelva un refresh_token para renovar el id_token
+            "scope": "openid profile email offline_access",
             "username": email,
             "grant_type": "http://auth0.com/oauth/grant-type/passwordless/otp",
             "otp": otp,
@@ -52,15 +57,27 @@ class UserApiClient:
             "source": source,
         }
         response = await self._make_request("POST", url, json=payload)
-        return ValidateOtpResponse(**response)
+        return ValidateOtpResponse.from_dict(response)
+
+    async def refresh_id_token(self, refresh_token: str) -> ValidateOtpResponse:
+        """Obtiene un id_token nuevo a partir del refresh_token."""
+        url = self.host + self.path_validate_otp
+        payload = {
+            "client_id": self.client_id,
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+        }
+        response = await self._make_request("POST", url, json=payload)
+        return ValidateOtpResponse.from_dict(response)
 
     async def _make_request(
         self, method: str, url: str, json: Optional[Dict[str, Any]] = None
     ) -> Any:
         headers = self._create_headers()
-        self._logger.debug(
-            "Making %s request to %s with payload %s", method, url, json
-        )
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                "Making %s request to %s with payload %s", method, url, self._mask_payload(json)
+            )
         async with self._session.request(method, url, json=json, headers=headers) as response:
             if response.status == 200:
                 self._logger.debug("Received response: %s", response)
@@ -72,6 +89,16 @@ class UserApiClient:
             )
             response.raise_for_status()
 
+    @staticmethod
+    def _mask_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Copia del cuerpo con el código OTP y el refresh_token ocultos."""
+        if not payload:
+            return payload
+        return {
+            key: mask_token(value) if key in _SECRET_FIELDS else value
+            for key, value in payload.items()
+        }
+
     def _create_headers(self) -> Dict[str, str]:
         # Usamos el formato correcto para Accept-Language basado en el idioma configurado
         language_code = self.language
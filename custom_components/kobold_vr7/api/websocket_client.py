@@ -3,20 +3,33 @@ import logging
 import json
 import uuid
 import ssl
-from typing import Any, Awaitable, Callable, Dict, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
 
 import aiohttp
-from .model.robot_wss_cleaning_state_response import CleaningStateResponse, \
-    RunSettings, RunStats, RunTiming, Run, CleaningStateBody
-from .model.robot_wss_last_state_or_phx_reply_response import AutonomyStates, AvailableCommands, \
-    CleaningCenter, Details, Error, ResponseBody
+from .decoder import (
+    KIND_CLEANING,
+    KIND_STATE,
+    PHOENIX_EVENT_DECODERS,
+    PLAIN_EVENT_DECODERS,
+    decode_response_body,
+    loads,
+)
+from .model.robot_wss_cleaning_state_response import CleaningStateResponse
+from .model.robot_wss_last_state_or_phx_reply_response import Details, Error, ResponseBody
 
 from homeassistant.components.vacuum import VacuumActivity
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 
+from ..service.cleaning_telemetry import CleaningTelemetry, CleaningTelemetryTracker
+from ..service.frame_recorder import FrameRecorder
+from ..service.metrics import MetricsRegistry
+from ..service.profile_service import ProfileServiceError
+from ..service.robot_state import RobotStateStore, VacuumState
+from ..service.token_utils import mask_token
 from ..const import (
-    DOMAIN,
-    SIGNAL_ROBOT_BATTERY,
+    SIGNAL_CLEANING_SESSION_FINISHED,
     COMPANION_WS_URL,
     MOBILE_APP_ACCEPT_ENCODING,
     MOBILE_APP_BUILD,
@@ -30,117 +43,26 @@ from ..const import (
 _LOGGER = logging.getLogger(__name__)
 
 
-def _parse_response_body(body: Dict) -> ResponseBody:
-    """Parsea el cuerpo de la respuesta en un objeto ResponseBody."""
-    autonomy_states_data = body.get("autonomy_states")
-    autonomy_states = None
-    if autonomy_states_data:  # Solo inicializa si autonomy_states no está vacío
-        autonomy_states = AutonomyStates(**autonomy_states_data)
-
-    # Valores por defecto para available_commands en caso de que falten
-    available_commands_default = {
-        "cancel": False,
-        "extract": False,
-        "pause": False,
-        "resume": False,
-        "return_to_base": False,
-        "start": False
-    }
-    
-    # Combinar valores por defecto con los recibidos (los recibidos tienen prioridad)
-    available_commands_data = {**available_commands_default, **body.get("available_commands", {})}
-    
-    available_commands = AvailableCommands(**available_commands_data)
-
-    # Añadir valores por defecto para cleaning_center para evitar el error de falta de parámetros
-    cleaning_center_default = {
-        "bag_status": None,
-        "base_error": None,
-        "state": None
-    }
-    
-    # Combinar valores por defecto con los recibidos
-    cleaning_center_data = {**cleaning_center_default, **body.get("cleaning_center", {})}
-    
-    cleaning_center = CleaningCenter(**cleaning_center_data)
-
-    details = Details(
-        **body.get("details", {})
-    )
-
-    errors = None
-    if body.get("errors"):
-        errors = [Error(**error) for error in body["errors"]]
-
-    response_body = ResponseBody(
-        action=body.get("action"),
-        autonomy_states=autonomy_states,
-        available_commands=available_commands,
-        cleaning_center=cleaning_center,
-        details=details,
-        errors=errors,
-        state=body.get("state")
-    )
-    return response_body
-
-
-_RUN_TIMING_DEFAULTS = {
-    "charging": 0,
-    "end": "",
-    "error": 0,
-    "paused": 0,
-    "start": "",
-}
+# Crear un contexto SSL una sola vez para toda la aplicación
+# Esta operación bloqueante se realiza al importar el módulo, no dentro del bucle de eventos
+_SSL_CONTEXT = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
 
 
-def _parse_cleaning_state_body(payload: Dict) -> CleaningStateResponse:
-    """Normaliza la estructura de los mensajes cleaning_state."""
+class KoboldWebSocketError(Exception):
+    """Error en una petición Phoenix enviada por el WebSocket."""
 
-    # Los eventos JSON planos incluyen la información en "state"
-    # mientras que los mensajes Phoenix la envían en "body" junto al código.
-    body_source = payload.get("body") or payload.get("state") or {}
-    code = payload.get("code", 200)
 
-    runs = []
-    for run_data in body_source.get("runs", []) or []:
-        settings_data = run_data.get("settings", {})
-        settings = RunSettings(
-            mode=settings_data.get("mode", ""),
-            navigation_mode=settings_data.get("navigation_mode", ""),
-        )
-        stats_data = run_data.get("stats", {})
-        stats = RunStats(
-            area=stats_data.get("area", 0.0),
-            pickup_count=stats_data.get("pickup_count", 0),
-        )
-        timing = RunTiming(**{**_RUN_TIMING_DEFAULTS, **(run_data.get("timing") or {})})
-        run = Run(
-            settings=settings,
-            state=run_data.get("state", ""),
-            stats=stats,
-            timing=timing,
-            track_name=run_data.get("track_name"),
-            track_uuid=run_data.get("track_uuid"),
-        )
-        runs.append(run)
+class KoboldWebSocketTimeout(KoboldWebSocketError):
+    """El servidor no respondió a tiempo a una petición Phoenix."""
 
-    timing = RunTiming(**{**_RUN_TIMING_DEFAULTS, **(body_source.get("timing") or {})})
 
-    cleaning_state_body = CleaningStateBody(
-        ability=body_source.get("ability", ""),
-        cleaning_type=body_source.get("cleaning_type", ""),
-        floorplan_uuid=body_source.get("floorplan_uuid"),
-        runs=runs,
-        started_by=body_source.get("started_by", ""),
-        timing=timing,
-    )
+class KoboldWebSocketChannelError(KoboldWebSocketError):
+    """El canal del robot se cayó o el servidor ya no lo reconoce como unido."""
 
-    return CleaningStateResponse(code=code, body=cleaning_state_body)
 
+# Motivos de un phx_reply de error que indican que el canal no existe en el servidor
+_CHANNEL_ERROR_REASONS = {"unmatched topic", "join crashed"}
 
-# Crear un contexto SSL una sola vez para toda la aplicación
-# Esta operación bloqueante se realiza al importar el módulo, no dentro del bucle de eventos
-_SSL_CONTEXT = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
 
 # Conjuntos y traducciones para mapear acciones a actividades y estados legibles
 _CLEANING_ACTIONS = {
@@ -168,6 +90,28 @@ _ACTION_STATUS_TRANSLATIONS = {
     "going_home": "Regresando a la base",
 }
 
+# Tiempo máximo que se espera la transición que confirma un comando enviado
+_COMMAND_ACK_TIMEOUT = 30
+
+# Tiempo máximo que se espera el phx_reply de una petición (join, last_state...)
+_REPLY_TIMEOUT = 10
+
+# Espera antes de cada reintento de unión tras un phx_error/phx_close del servidor,
+# como el cliente Phoenix de referencia; el último valor se repite
+_REJOIN_DELAYS = (1, 2, 5, 10)
+
+# Los comandos por WebSocket esperan menos: si no hay respuesta se repiten por REST
+_COMMAND_REPLY_TIMEOUT = 3
+
+# Evento Phoenix con el mismo cuerpo que ``POST /vendors/3/robots/{serial}/messages``.
+# El nombre no está confirmado con la app oficial: por eso el transporte por defecto
+# de los comandos sigue siendo REST y cualquier fallo aquí se repite por REST.
+_COMMAND_EVENT = "message"
+
+# Intervalo mínimo entre publicaciones de telemetría de limpieza por robot, en segundos.
+# Los cambios de zona, de número de ejecuciones o de fin de sesión se publican al momento.
+_CLEANING_PUBLISH_INTERVAL = 30
+
 _STATE_STATUS_TRANSLATIONS = {
     "busy": "Ocupado",
     "idle": "Inactivo",
@@ -176,55 +120,187 @@ _STATE_STATUS_TRANSLATIONS = {
     "charging": "Cargando",
 }
 
+@dataclass
+class _RobotChannel:
+    """Estado de un canal Phoenix ``robots:{id}`` dentro de la conexión compartida."""
+
+    robot_id: str
+    topic: str
+    serial: Optional[str] = None
+    join_ref: Optional[str] = None
+    # Confirmado por el phx_reply del phx_join
+    joined: bool = False
+    # Reunión en curso tras perder el canal en el servidor
+    rejoin_task: Optional[asyncio.Task] = None
+    # Ya se ha aplicado algún estado del robot; contadores de escrituras emitidas/omitidas
+    has_state: bool = False
+    writes_emitted: int = 0
+    writes_skipped: int = 0
+    battery_emitted: int = 0
+    battery_skipped: int = 0
+    # Ventana de agrupación: último mensaje pendiente por tipo y temporizador de vaciado
+    pending: Dict[str, Any] = field(default_factory=dict)
+    flush_handle: Optional[asyncio.TimerHandle] = None
+    last_state_key: Optional[tuple] = None
+    command_ack_deadline: Optional[float] = None
+    # Telemetría de limpieza: agregador, último valor publicado y temporizador pendiente
+    telemetry: CleaningTelemetryTracker = field(default_factory=CleaningTelemetryTracker)
+    cleaning_published: Optional[CleaningTelemetry] = None
+    cleaning_published_at: float = 0
+    cleaning_handle: Optional[asyncio.TimerHandle] = None
+    cleaning_emitted: int = 0
+    cleaning_throttled: int = 0
+
+
 class KoboldWebSocketClient:
+    """Conexión WebSocket única por cuenta que multiplexa los canales de todos los robots."""
+
     def __init__(
         self,
         hass,
         session: aiohttp.ClientSession,
         id_token: str,
-        robot_id: str,
-        entity,
-        profile_login: Callable[[str], Awaitable[str]],
+        profile_login: Callable[..., Awaitable[str]],
         language: Optional[str] = None,
+        coalesce_window: float = 0,
+        url: str = COMPANION_WS_URL,
+        on_auth_failed: Optional[Callable[[], Awaitable[bool]]] = None,
+        states: Optional[RobotStateStore] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        trace_sample_rate: int = 1,
+        trace_events: Optional[Iterable[str]] = None,
+        frame_buffer_size: int = 0,
     ):
         self.hass = hass
+        # Estado de los robots donde se publica cada mensaje; las entidades se suscriben a él
+        self._states = states if states is not None else RobotStateStore()
+        self._metrics = metrics if metrics is not None else MetricsRegistry()
         self._session = session
         self._id_token = id_token
-        self.robot_id = robot_id
-        self.entity = entity  # Agrega la entidad aquí
         self.websocket = None
         self.connected = False
-        self._url = COMPANION_WS_URL
+        # Configurable para poder apuntar a un servidor Companion local
+        self._url = url
         self._listen_task = None
         self._reconnect_task = None  # Tarea para los intentos de reconexión
         self._heartbeat_task: Optional[asyncio.Task] = None
         self._should_reconnect = True
         self._profile_login = profile_login
+        # Se llama cuando Companion rechaza el id_token; devuelve False si ya no
+        # tiene sentido reintentar (hay que volver a autenticarse)
+        self._on_auth_failed = on_auth_failed
         self._language_header = self._format_language(language)
         self._authorization_header: Optional[str] = None
         self._ref_counter = 0
-        self._join_ref: Optional[str] = None
         self._heartbeat_interval = 30  # Intervalo en segundos entre heartbeats
+        # Segundos que se espera la respuesta a un heartbeat antes de dar la conexión por muerta
+        self._heartbeat_timeout = 10
+        # Sin ningún mensaje en este tiempo (los heartbeats también responden) se reconecta
+        self._inactivity_timeout = self._heartbeat_interval * 2 + self._heartbeat_timeout
+        # Peticiones en vuelo esperando su phx_reply, indexadas por ref
+        self._pending_replies: Dict[str, asyncio.Future] = {}
+        # Topic de cada petición en vuelo, para fallar solo las de un canal perdido
+        self._pending_topics: Dict[str, str] = {}
+        self._rejoin_delays = _REJOIN_DELAYS
+        self._heartbeat_rtt: Optional[float] = None
+        # Cuando la conexión se fuerza a cerrar se reconecta sin la espera habitual
+        self._reconnect_immediately = False
+        # Motivo del último cierre de la escucha, para las métricas de reconexión
+        self._disconnect_cause: Optional[str] = None
+        self._link_stats = {
+            "heartbeat_timeouts": 0,
+            "inactivity_timeouts": 0,
+            "forced_reconnects": 0,
+            "replies_matched": 0,
+            "replies_timed_out": 0,
+            "joins_confirmed": 0,
+            "joins_failed": 0,
+            "channels_lost": 0,
+        }
+        # Traza de frames recibidos con el log en debug: uno de cada N que pasen el filtro
+        # de tipos de evento (vacío = todos). Solo los frames muestreados registran
+        # también su procesamiento, así el coste no crece con el tráfico.
+        self._trace_sample_rate = max(1, trace_sample_rate)
+        self._trace_events = frozenset(trace_events or ())
+        self._trace_matched = 0
+        self._tracing = False
+        # Últimos frames crudos por robot para reproducir fallos (0 = sin grabar)
+        self._recorder: Optional[FrameRecorder] = (
+            FrameRecorder(frame_buffer_size) if frame_buffer_size > 0 else None
+        )
+        # Segundos durante los que se agrupan ráfagas de mensajes por robot (0 = desactivado)
+        self._coalesce_window = coalesce_window
+        # Canales indexados por topic Phoenix y por número de serie
+        self._channels: Dict[str, _RobotChannel] = {}
+        self._channels_by_serial: Dict[str, _RobotChannel] = {}
+
+    @property
+    def robot_ids(self) -> list[str]:
+        """Devuelve los identificadores de los robots registrados."""
+
+        return [channel.robot_id for channel in self._channels.values()]
+
+    @property
+    def states(self) -> RobotStateStore:
+        return self._states
+
+    def add_robot(self, robot_id: str, serial: Optional[str] = None) -> None:
+        """Registra un robot y se une a su canal si la conexión ya está abierta."""
+
+        topic = f"robots:{robot_id}"
+        channel = _RobotChannel(robot_id=robot_id, topic=topic, serial=serial)
+        self._channels[topic] = channel
+        if channel.serial:
+            self._channels_by_serial[channel.serial] = channel
+
+        if self.connected and self.websocket and not self.websocket.closed:
+            self.hass.loop.create_task(self._join_channel(channel))
+
+    async def remove_robot(self, robot_id: str) -> None:
+        """Elimina un robot y abandona su canal si seguimos conectados."""
+
+        channel = self._channels.pop(f"robots:{robot_id}", None)
+        if channel is None:
+            return
+        self._discard_pending(channel)
+        if channel.rejoin_task is not None:
+            channel.rejoin_task.cancel()
+        if self._recorder is not None:
+            self._recorder.discard(robot_id)
+        if channel.serial:
+            self._channels_by_serial.pop(channel.serial, None)
+
+        if channel.join_ref and self.connected and self.websocket and not self.websocket.closed:
+            leave_msg = [channel.join_ref, self._next_ref(), channel.topic, "phx_leave", {}]
+            try:
+                await self.websocket.send_str(json.dumps(leave_msg))
+            except Exception as error:
+                _LOGGER.debug("No se pudo abandonar el canal %s: %s", channel.topic, error)
+
+    def set_id_token(self, id_token: str) -> None:
+        """Usa el id_token renovado en los próximos logins de Companion."""
+
+        self._id_token = id_token
 
     async def connect(self):
         retry_delay = 1  # Comenzar con 1 segundo de retraso
         max_delay = 300  # Retraso máximo de 5 minutos
+        force_login = False  # Solo se pide un bearer nuevo si Companion rechaza el actual
         while self._should_reconnect:
             try:
                 self._authorization_header = None
-                self._authorization_header = await self._profile_login(self._id_token)
-                _LOGGER.debug(
-                    "Bearer recuperado para el WebSocket: %s",
-                    self._sanitize_headers({"Authorization": self._authorization_header})
-                    .get("Authorization"),
+                self._authorization_header = await self._profile_login(
+                    self._id_token, force_refresh=force_login
                 )
+                force_login = False
                 headers = self._build_connection_headers()
-
-                _LOGGER.debug(
-                    "Intentando conectar al WebSocket %s con cabeceras %s",
-                    self._url,
-                    self._sanitize_headers(headers),
-                )
+                # Ocultar el token copia las cabeceras: solo se hace si se van a registrar
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug(
+                        "Intentando conectar al WebSocket %s con cabeceras %s",
+                        self._url,
+                        self._sanitize_headers(headers),
+                    )
 
                 # Usar el contexto SSL global pre-creado
                 self.websocket = await self._session.ws_connect(
@@ -234,21 +310,35 @@ class KoboldWebSocketClient:
                     autoping=True,
                 )
                 self.connected = True
-                response_headers = {}
-                websocket_headers = getattr(self.websocket, "headers", None)
-                if websocket_headers is not None:
-                    response_headers = dict(websocket_headers)
-                _LOGGER.debug(
-                    "Conectado al WebSocket. Cabeceras de respuesta: %s",
-                    self._sanitize_headers(response_headers),
-                )
-                await self._join_robot_channel()
-                self._start_heartbeat()
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug(
+                        "Conectado al WebSocket. Cabeceras de respuesta: %s",
+                        self._sanitize_headers(dict(getattr(self.websocket, "headers", {}))),
+                    )
+                # La escucha arranca antes de las uniones para recibir sus respuestas
                 self._listen_task = self.hass.loop.create_task(self._listen())
+                self._start_heartbeat()
+                await self._join_all_channels()
                 break  # Salir del bucle al conectar exitosamente
             except Exception as e:
                 _LOGGER.error("Error al conectar al WebSocket: %s", e)
                 self.connected = False
+                self._metrics.record_reconnect("connect_failed")
+                if isinstance(e, aiohttp.WSServerHandshakeError) and e.status in (401, 403):
+                    force_login = True
+                if (
+                    isinstance(e, ProfileServiceError)
+                    and e.auth_failed
+                    and self._on_auth_failed is not None
+                    and not await self._on_auth_failed()
+                ):
+                    # Sin credenciales válidas reintentar es inútil hasta reautenticarse
+                    _LOGGER.error(
+                        "Companion rechaza las credenciales; el WebSocket no se reconectará "
+                        "hasta volver a autenticarse"
+                    )
+                    self._should_reconnect = False
+                    break
                 # Esperar antes de reintentar
                 _LOGGER.info("Reconectando en %s segundos...", retry_delay)
                 await asyncio.sleep(retry_delay)
@@ -288,33 +378,202 @@ class KoboldWebSocketClient:
 
         return language
 
-    async def _join_robot_channel(self):
-        # Enviar mensaje para unirse al canal del robot
+    async def _join_all_channels(self) -> None:
+        """Se une a los canales de todos los robots registrados en la conexión actual."""
+
         self._ref_counter = 0
-        self._join_ref = self._next_ref()
-        join_msg = [
-            self._join_ref,
-            self._next_ref(),
-            f"robots:{self.robot_id}",
-            "phx_join",
-            {}
-        ]
-        payload = json.dumps(join_msg)
-        _LOGGER.debug("Enviando mensaje de unión al canal: %s", payload)
-        await self.websocket.send_str(payload)
-
-        unique_request_id = str(uuid.uuid4())
-        # Enviar mensaje para solicitar el último estado
-        last_state_msg = [
-            self._join_ref,
-            self._next_ref(),
-            f"robots:{self.robot_id}",
+        for channel in self._channels.values():
+            channel.join_ref = None
+            channel.joined = False
+
+        # Las uniones se envían a la vez y se esperan juntas: un solo viaje de ida y vuelta
+        await asyncio.gather(
+            *(self._join_channel(channel) for channel in list(self._channels.values())),
+            return_exceptions=True,
+        )
+
+    async def _join_channel(self, channel: _RobotChannel) -> bool:
+        """Se une al canal del robot, espera la confirmación y pide su último estado."""
+
+        if channel.join_ref is not None:
+            return channel.joined
+
+        # En Phoenix el ref del phx_join es también el join_ref del canal
+        channel.join_ref = self._next_ref()
+        _LOGGER.debug("Uniéndose al canal %s", channel.topic)
+        try:
+            await self._push(
+                channel.topic, "phx_join", {}, join_ref=channel.join_ref, ref=channel.join_ref
+            )
+        except KoboldWebSocketError as error:
+            self._link_stats["joins_failed"] += 1
+            channel.join_ref = None
+            _LOGGER.warning("No se pudo unir al canal %s: %s", channel.topic, error)
+            return False
+
+        channel.joined = True
+        self._link_stats["joins_confirmed"] += 1
+        try:
+            # El phx_reply actualiza el estado por la vía habitual; aquí no se decodifica de nuevo
+            await self._push_last_state(channel)
+        except KoboldWebSocketError as error:
+            _LOGGER.warning("No se pudo obtener el último estado de %s: %s", channel.robot_id, error)
+        return True
+
+    async def request_last_state(self, robot_id: str) -> Optional[ResponseBody]:
+        """Pide el último estado del robot y lo devuelve en un solo viaje de ida y vuelta.
+
+        La respuesta también se procesa como cualquier otro phx_reply, así que
+        el estado del robot queda actualizado al volver.
+        """
+
+        channel = self._channels.get(f"robots:{robot_id}")
+        if channel is None or not channel.joined:
+            raise KoboldWebSocketError(f"El robot {robot_id} no está unido al WebSocket")
+
+        body = (await self._push_last_state(channel)).get("body")
+        return decode_response_body(body) if isinstance(body, dict) else None
+
+    def is_joined(self, robot_id: str) -> bool:
+        """Indica si el canal del robot está confirmado en la conexión actual."""
+
+        channel = self._channels.get(f"robots:{robot_id}")
+        return self.connected and channel is not None and channel.joined
+
+    async def send_command(
+        self, robot_id: str, command: Dict[str, Any], timeout: float = _COMMAND_REPLY_TIMEOUT
+    ) -> Dict[str, Any]:
+        """Envía una habilidad (``{"ability": ...}``) por el canal del robot y espera su confirmación."""
+
+        channel = self._channels.get(f"robots:{robot_id}")
+        if channel is None or not channel.joined:
+            raise KoboldWebSocketError(f"El robot {robot_id} no está unido al WebSocket")
+
+        try:
+            return await self._push(
+                channel.topic, _COMMAND_EVENT, command, join_ref=channel.join_ref, timeout=timeout
+            )
+        except KoboldWebSocketChannelError:
+            # Si el comando tumbó el canal, además de repetirlo por REST hay que volver a
+            # unirse para seguir recibiendo el estado del robot
+            if channel.joined:
+                self._channel_lost(channel, f"{_COMMAND_EVENT} rechazado")
+            raise
+
+    async def _push_last_state(self, channel: _RobotChannel) -> Dict[str, Any]:
+        return await self._push(
+            channel.topic,
             "last_state",
-            {"request_id": unique_request_id}
-        ]
-        last_state_payload = json.dumps(last_state_msg)
-        _LOGGER.debug("Solicitando último estado del robot: %s", last_state_payload)
-        await self.websocket.send_str(last_state_payload)
+            {"request_id": str(uuid.uuid4())},
+            join_ref=channel.join_ref,
+        )
+
+    async def _push(
+        self,
+        topic: str,
+        event: str,
+        payload: Dict[str, Any],
+        join_ref: Optional[str] = None,
+        ref: Optional[str] = None,
+        timeout: float = _REPLY_TIMEOUT,
+    ) -> Dict[str, Any]:
+        """Envía un mensaje Phoenix y espera el ``phx_reply`` con su mismo ref.
+
+        Devuelve el ``response`` de la respuesta si su estado es ``ok``.
+        """
+
+        if not self.websocket or self.websocket.closed:
+            raise KoboldWebSocketError("El WebSocket no está conectado")
+
+        ref = ref or self._next_ref()
+        future = self.hass.loop.create_future()
+        self._pending_replies[ref] = future
+        self._pending_topics[ref] = topic
+        message = json.dumps([join_ref, ref, topic, event, payload])
+        _LOGGER.debug("Enviando %s: %s", event, message)
+        try:
+            await self.websocket.send_str(message)
+            reply = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError as error:
+            self._link_stats["replies_timed_out"] += 1
+            raise KoboldWebSocketTimeout(
+                f"Sin respuesta a {event} en {topic} tras {timeout} s"
+            ) from error
+        except (aiohttp.ClientError, ConnectionError, RuntimeError) as error:
+            raise KoboldWebSocketError(f"No se pudo enviar {event}: {error}") from error
+        finally:
+            self._pending_replies.pop(ref, None)
+            self._pending_topics.pop(ref, None)
+
+        if not isinstance(reply, dict) or reply.get("status") != "ok":
+            response = reply.get("response") if isinstance(reply, dict) else reply
+            reason = response.get("reason") if isinstance(response, dict) else None
+            if reason in _CHANNEL_ERROR_REASONS:
+                raise KoboldWebSocketChannelError(f"{event} rechazado en {topic}: {reason}")
+            raise KoboldWebSocketError(f"{event} rechazado en {topic}: {response}")
+        return reply.get("response") or {}
+
+    def _resolve_reply(self, ref: Optional[str], payload: Any) -> None:
+        """Entrega un phx_reply a la petición en vuelo con el mismo ref."""
+
+        if ref is None:
+            return
+        future = self._pending_replies.pop(ref, None)
+        self._pending_topics.pop(ref, None)
+        if future is not None and not future.done():
+            self._link_stats["replies_matched"] += 1
+            future.set_result(payload)
+
+    def _fail_pending_replies(self, topic: Optional[str] = None) -> None:
+        """Despierta con error a las peticiones en vuelo al perder la conexión o un canal."""
+
+        if topic is None:
+            pending, self._pending_replies = self._pending_replies, {}
+            self._pending_topics = {}
+            error = "Conexión WebSocket cerrada"
+        else:
+            refs = [ref for ref, owner in self._pending_topics.items() if owner == topic]
+            pending = {}
+            for ref in refs:
+                self._pending_topics.pop(ref, None)
+                future = self._pending_replies.pop(ref, None)
+                if future is not None:
+                    pending[ref] = future
+            error = f"Canal {topic} cerrado por el servidor"
+        error_type = KoboldWebSocketError if topic is None else KoboldWebSocketChannelError
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error_type(error))
+
+    def _channel_lost(self, channel: _RobotChannel, reason: str) -> None:
+        """Marca el canal como no unido, falla sus peticiones y programa la reunión."""
+
+        _LOGGER.warning("Canal %s perdido (%s), volviendo a unirse", channel.topic, reason)
+        self._link_stats["channels_lost"] += 1
+        channel.joined = False
+        channel.join_ref = None
+        self._fail_pending_replies(channel.topic)
+        if channel.rejoin_task is None or channel.rejoin_task.done():
+            channel.rejoin_task = self.hass.loop.create_task(self._rejoin_channel(channel))
+
+    async def _rejoin_channel(self, channel: _RobotChannel) -> None:
+        """Reintenta la unión al canal mientras la conexión siga abierta."""
+
+        attempt = 0
+        while (
+            self._should_reconnect
+            and self.connected
+            and self._channels.get(channel.topic) is channel
+            and not channel.joined
+        ):
+            delay = self._rejoin_delays[min(attempt, len(self._rejoin_delays) - 1)]
+            attempt += 1
+            await asyncio.sleep(delay)
+            # Una reconexión completa también une los canales; no se envía un join duplicado
+            if channel.joined or channel.join_ref is not None or not self.connected:
+                return
+            if await self._join_channel(channel):
+                return
 
     def _start_heartbeat(self) -> None:
         """Inicia el envío periódico de heartbeats Phoenix."""
@@ -326,7 +585,8 @@ class KoboldWebSocketClient:
             try:
                 while self.connected and self.websocket and not self.websocket.closed:
                     await asyncio.sleep(self._heartbeat_interval)
-                    await self._send_heartbeat()
+                    if not await self._send_heartbeat():
+                        return
             except asyncio.CancelledError:
                 _LOGGER.debug("Tarea de heartbeat cancelada")
                 raise
@@ -335,26 +595,87 @@ class KoboldWebSocketClient:
 
         self._heartbeat_task = self.hass.loop.create_task(_heartbeat_loop())
 
-    async def _send_heartbeat(self) -> None:
-        """Envía un heartbeat Phoenix para mantener la conexión viva."""
+    async def _send_heartbeat(self) -> bool:
+        """Envía un heartbeat Phoenix y mide su ida y vuelta.
+
+        Devuelve False si el servidor no responde a tiempo, en cuyo caso la
+        conexión se da por medio abierta y se fuerza la reconexión.
+        """
 
         if not self.websocket or self.websocket.closed:
+            return False
+
+        sent = time.monotonic()
+        try:
+            await self._push("phoenix", "heartbeat", {}, timeout=self._heartbeat_timeout)
+        except KoboldWebSocketTimeout:
+            self._link_stats["heartbeat_timeouts"] += 1
+            _LOGGER.warning(
+                "Sin respuesta al heartbeat en %s s, forzando la reconexión del WebSocket",
+                self._heartbeat_timeout,
+            )
+            self._force_reconnect()
+            return False
+
+        self._publish_rtt((time.monotonic() - sent) * 1000)
+        return True
+
+    def _publish_rtt(self, rtt_ms: float) -> None:
+        """Publica el tiempo de ida y vuelta del heartbeat en los sensores de cada robot."""
+
+        self._heartbeat_rtt = rtt_ms
+        rtt = round(rtt_ms, 1)
+        _LOGGER.debug("Heartbeat respondido en %s ms", rtt)
+        for channel in self._channels.values():
+            self._states.set_heartbeat_rtt(channel.robot_id, rtt)
+
+    def _force_reconnect(self, cause: str = "heartbeat_timeout") -> None:
+        """Abandona la conexión actual y reconecta sin esperar."""
+
+        if not self._should_reconnect:
             return
+        self._link_stats["forced_reconnects"] += 1
+        self._disconnect_cause = cause
+        self._reconnect_immediately = True
+        if self._listen_task is not None and not self._listen_task.done():
+            # Al cancelar la escucha, su bloque finally programa la reconexión
+            self._listen_task.cancel()
+        else:
+            self.connected = False
+            self._metrics.record_reconnect(cause)
+            self._schedule_reconnect()
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        return self._metrics
 
-        heartbeat_msg = [
-            None,
-            self._next_ref(),
-            "phoenix",
-            "heartbeat",
-            {},
-        ]
-        payload = json.dumps(heartbeat_msg)
-        _LOGGER.debug("Enviando heartbeat: %s", payload)
-        await self.websocket.send_str(payload)
+    @property
+    def frame_recorder(self) -> Optional[FrameRecorder]:
+        return self._recorder
+
+    @property
+    def link_stats(self) -> Dict[str, Any]:
+        """Calidad del enlace: último RTT del heartbeat y reconexiones forzadas."""
+
+        return {"heartbeat_rtt_ms": self._heartbeat_rtt, **self._link_stats}
 
     async def _listen(self):
+        self._disconnect_cause = None
         try:
-            async for message in self.websocket:
+            while True:
+                try:
+                    message = await self.websocket.receive(timeout=self._inactivity_timeout)
+                except asyncio.TimeoutError:
+                    self._link_stats["inactivity_timeouts"] += 1
+                    _LOGGER.warning(
+                        "Sin mensajes del WebSocket en %s s, forzando la reconexión",
+                        self._inactivity_timeout,
+                    )
+                    self._link_stats["forced_reconnects"] += 1
+                    self._reconnect_immediately = True
+                    self._disconnect_cause = "inactivity"
+                    break
+
                 if message.type == aiohttp.WSMsgType.TEXT:
                     await self._handle_message(message.data)
                 elif message.type == aiohttp.WSMsgType.BINARY:
@@ -365,40 +686,50 @@ class KoboldWebSocketClient:
                     _LOGGER.error(
                         "Error en el WebSocket: %s", self.websocket.exception()
                     )
+                    self._disconnect_cause = "error"
                     break
                 elif message.type in (
+                    aiohttp.WSMsgType.CLOSE,
                     aiohttp.WSMsgType.CLOSED,
                     aiohttp.WSMsgType.CLOSING,
                 ):
                     _LOGGER.info("El servidor cerró la conexión WebSocket")
+                    self._disconnect_cause = "server_closed"
                     break
                 else:
                     _LOGGER.debug("Mensaje WebSocket no manejado: %s", message.type)
         except aiohttp.ClientError as e:
             _LOGGER.warning("Conexión WebSocket cerrada con error de cliente: %s", e)
+            self._disconnect_cause = "client_error"
         except asyncio.CancelledError:
             _LOGGER.debug("Escucha del WebSocket cancelada")
             raise
         except Exception as e:
             _LOGGER.error("Error en _listen: %s", e)
+            self._disconnect_cause = "exception"
         finally:
             self.connected = False
+            self._fail_pending_replies()
             await self._stop_heartbeat()
             if self._should_reconnect:
+                self._metrics.record_reconnect(self._disconnect_cause or "unknown")
                 self._schedule_reconnect()
 
     async def _reconnect(self):
         """Intentar reconectar el WebSocket."""
         _LOGGER.info("Intentando reconectar el WebSocket...")
-        # Cerrar el WebSocket actual si no está ya cerrado
+        # Cerrar el WebSocket actual si no está ya cerrado; con la conexión medio
+        # abierta el cierre ordenado no llega a completarse, así que se limita
         if self.websocket:
             try:
-                await self.websocket.close()
+                await asyncio.wait_for(self.websocket.close(), timeout=2)
             except Exception:
                 pass
-        # Esperar antes de reconectar
-        # Puedes ajustar este tiempo según sea necesario
-        await asyncio.sleep(5)
+        # Esperar antes de reconectar, salvo si la conexión se cerró por un fallo detectado
+        if self._reconnect_immediately:
+            self._reconnect_immediately = False
+        else:
+            await asyncio.sleep(5)
         await self.connect()
 
     def _schedule_reconnect(self) -> None:
@@ -411,38 +742,104 @@ class KoboldWebSocketClient:
             self._reconnect_task = self.hass.loop.create_task(self._reconnect())
 
     async def _handle_message(self, message):
-        _LOGGER.debug("Received message: %s", message)
-        data = json.loads(message)
-
-        if isinstance(data, list):
-            await self._handle_phoenix_message(data)
+        try:
+            data = loads(message)
+        except ValueError as error:
+            if self._recorder is not None:
+                self._recorder.record(None, message)
+            self._metrics.record_parse_failure("json")
+            _LOGGER.error("Mensaje JSON inválido: %s", error)
             return
 
-        if isinstance(data, dict):
-            await self._handle_event_message(data)
-            return
+        if self._recorder is not None:
+            self._recorder.record(self._frame_robot_id(data), message)
+
+        # Con el log en debug desactivado esta es la única comprobación por frame
+        self._tracing = _LOGGER.isEnabledFor(logging.DEBUG) and self._trace_frame(data, message)
+        try:
+            if isinstance(data, list):
+                await self._handle_phoenix_message(data)
+                return
+
+            if isinstance(data, dict):
+                await self._handle_event_message(data)
+                return
+
+            self._metrics.record_parse_failure("format")
+            _LOGGER.error("Formato de mensaje desconocido: %s", type(data))
+        finally:
+            self._tracing = False
+
+    def _frame_robot_id(self, data: Any) -> Optional[str]:
+        """Robot al que pertenece un frame ya decodificado, para la grabación."""
 
-        _LOGGER.error("Formato de mensaje desconocido: %s", type(data))
+        channel = None
+        if isinstance(data, list) and len(data) > 2:
+            channel = self._channels.get(data[2])
+        elif isinstance(data, dict):
+            channel = self._resolve_event_channel(data, data.get("payload"))
+        return channel.robot_id if channel is not None else None
+
+    def _trace_frame(self, data: Any, message: str) -> bool:
+        """Registra el frame si pasa el filtro de eventos y le toca según el muestreo."""
+
+        if isinstance(data, list):
+            event = data[3] if len(data) > 3 else None
+        elif isinstance(data, dict):
+            event = data.get("event_type")
+        else:
+            event = None
+        if self._trace_events and event not in self._trace_events:
+            return False
+        self._trace_matched += 1
+        if (self._trace_matched - 1) % self._trace_sample_rate:
+            return False
+        _LOGGER.debug("Received message #%s (%s): %s", self._trace_matched, event, message)
+        return True
 
     async def _handle_phoenix_message(self, data: list) -> None:
-        """Gestiona mensajes en formato Phoenix."""
+        """Gestiona mensajes en formato Phoenix y los enruta por topic."""
 
         if len(data) < 5:
+            self._metrics.record_parse_failure("phoenix_frame")
             _LOGGER.error("Mensaje Phoenix incompleto: %s", data)
             return
 
         topic = data[2]
         event = data[3]
         payload = data[4]
+        self._metrics.record_ws_message(event)
 
         if event == "phx_reply":
-            await self._handle_phx_reply(payload)
-        elif event == "last_state":
-            await self._handle_last_state(payload)
-        elif event == "cleaning_state":
-            await self._handle_cleaning_state(payload)
-        else:
-            _LOGGER.debug("Evento Phoenix no manejado en %s: %s", topic, event)
+            # Se entrega a quien espera la respuesta; si trae estado se procesa igualmente
+            self._resolve_reply(data[1], payload)
+        if topic == "phoenix":
+            return
+
+        channel = self._channels.get(topic)
+        if event in ("phx_error", "phx_close"):
+            # El canal se cayó en el servidor; se ignoran los avisos de uniones anteriores
+            if channel is not None and channel.join_ref is not None and data[0] in (
+                None,
+                channel.join_ref,
+            ):
+                self._channel_lost(channel, event)
+            return
+
+        if channel is None:
+            if self._tracing:
+                _LOGGER.debug(
+                    "Mensaje Phoenix para topic sin robot registrado %s: %s", topic, event
+                )
+            return
+
+        decoder = PHOENIX_EVENT_DECODERS.get(event)
+        if decoder is None:
+            if self._tracing:
+                _LOGGER.debug("Evento Phoenix no manejado en %s: %s", topic, event)
+            return
+
+        await self._dispatch_decoded(channel, event, decoder, payload)
 
     async def _handle_event_message(self, data: Dict[str, Any]) -> None:
         """Gestiona mensajes en formato JSON plano enviados por Companion."""
@@ -451,169 +848,281 @@ class KoboldWebSocketClient:
         payload = data.get("payload")
 
         if not event_type:
-            _LOGGER.debug("Mensaje sin tipo de evento: %s", data)
+            if self._tracing:
+                _LOGGER.debug("Mensaje sin tipo de evento: %s", data)
             return
+        self._metrics.record_ws_message(event_type)
 
         if event_type == "service_status":
-            _LOGGER.debug("Estado del servicio recibido: %s", payload)
+            if self._tracing:
+                _LOGGER.debug("Estado del servicio recibido: %s", payload)
             return
 
-        if event_type == "state_changed":
-            await self._handle_state_changed_event(payload)
+        decoder = PLAIN_EVENT_DECODERS.get(event_type)
+        if decoder is None:
+            if self._tracing:
+                _LOGGER.debug("Evento no manejado: %s", event_type)
             return
 
-        if event_type == "cleaning_state":
-            await self._handle_cleaning_state_event(payload)
+        channel = self._resolve_event_channel(data, payload)
+        if channel is None:
+            if self._tracing:
+                _LOGGER.debug("No se pudo asociar el evento %s a ningún robot", event_type)
             return
 
-        _LOGGER.debug("Evento no manejado: %s", event_type)
+        await self._dispatch_decoded(channel, event_type, decoder, payload)
 
-    async def _handle_state_changed_event(self, payload: Optional[Dict[str, Any]]) -> None:
-        """Convierte los eventos de cambio de estado en actualizaciones de entidad."""
-
-        if not payload or "state" not in payload:
-            _LOGGER.debug("Evento state_changed sin cuerpo válido: %s", payload)
-            return
+    async def _dispatch_decoded(self, channel: _RobotChannel, event: str, decoder, payload) -> None:
+        """Decodifica el payload con la tabla de eventos y actualiza el estado del robot."""
 
+        decode, kind = decoder
         try:
-            response_body = _parse_response_body(payload["state"])
-            await self.update_entity_state(response_body)
+            decoded = decode(payload)
         except Exception as error:
-            _LOGGER.error("Error procesando state_changed: %s", error)
+            self._metrics.record_parse_failure(event)
+            _LOGGER.error("Error decodificando %s: %s", event, error)
+            return
+
+        if decoded is None:
+            if self._tracing:
+                _LOGGER.debug("%s sin cuerpo", event)
+            return
 
-    async def _handle_cleaning_state_event(self, payload: Optional[Dict[str, Any]]) -> None:
-        """Procesa eventos cleaning_state enviados como JSON plano."""
+        if self._coalesce_window <= 0 or self._requires_immediate_flush(channel, kind, decoded):
+            # Lo que hubiera pendiente del mismo tipo queda sustituido por este mensaje
+            channel.pending.pop(kind, None)
+            await self._flush_channel(channel)
+            await self._apply_update(channel, kind, decoded)
+            return
 
-        if not payload:
-            _LOGGER.debug("Evento cleaning_state sin contenido: %s", payload)
+        # Ventana de agrupación: gana el último mensaje de cada tipo
+        channel.pending[kind] = decoded
+        if channel.flush_handle is None:
+            channel.flush_handle = self.hass.loop.call_later(
+                self._coalesce_window,
+                lambda: self.hass.loop.create_task(self._flush_channel(channel)),
+            )
+
+    def _requires_immediate_flush(self, channel: _RobotChannel, kind: str, decoded) -> bool:
+        """Errores, primer estado y transiciones que confirman un comando no esperan."""
+
+        if kind != KIND_STATE:
+            return False
+        if not channel.has_state or decoded.errors:
+            return True
+        if (
+            channel.command_ack_deadline is not None
+            and (decoded.state, decoded.action) != channel.last_state_key
+        ):
+            channel.command_ack_deadline = None
+            return True
+        if channel.command_ack_deadline is not None and time.monotonic() > channel.command_ack_deadline:
+            channel.command_ack_deadline = None
+        return False
+
+    async def _flush_channel(self, channel: _RobotChannel) -> None:
+        """Aplica las actualizaciones pendientes de la ventana de agrupación."""
+
+        if channel.flush_handle is not None:
+            channel.flush_handle.cancel()
+            channel.flush_handle = None
+        if not channel.pending:
             return
 
+        pending = channel.pending
+        channel.pending = {}
+        for kind in (KIND_STATE, KIND_CLEANING):
+            if kind in pending:
+                await self._apply_update(channel, kind, pending[kind])
+
+    async def _apply_update(self, channel: _RobotChannel, kind: str, decoded) -> None:
+        """Entrega el mensaje decodificado al manejador correspondiente."""
+
         try:
-            cleaning_state_response = _parse_cleaning_state_body(payload)
-            await self.update_cleaning_state(cleaning_state_response)
+            if kind == KIND_STATE:
+                channel.last_state_key = (decoded.state, decoded.action)
+                await self.update_robot_state(channel, decoded)
+            elif kind == KIND_CLEANING:
+                await self.update_cleaning_state(channel, decoded)
         except Exception as error:
-            _LOGGER.error("Error procesando cleaning_state: %s", error)
+            _LOGGER.error("Error procesando %s: %s", kind, error)
+
+    def expect_command_ack(self, robot_id: str) -> None:
+        """Marca que se ha enviado un comando: la siguiente transición se aplica sin esperar."""
+
+        channel = self._channels.get(f"robots:{robot_id}")
+        if channel is not None:
+            channel.command_ack_deadline = time.monotonic() + _COMMAND_ACK_TIMEOUT
+
+    def _resolve_event_channel(
+        self, data: Dict[str, Any], payload: Optional[Dict[str, Any]]
+    ) -> Optional[_RobotChannel]:
+        """Determina a qué robot pertenece un evento JSON plano."""
+
+        channel = self._channels.get(data.get("topic"))
+        if channel is not None:
+            return channel
+
+        sources = (data, payload) if isinstance(payload, dict) else (data,)
+        for source in sources:
+            robot_id = source.get("robot_id")
+            if robot_id:
+                channel = self._channels.get(f"robots:{robot_id}")
+                if channel is not None:
+                    return channel
+            serial = source.get("serial") or source.get("robot_serial")
+            if serial:
+                channel = self._channels_by_serial.get(serial)
+                if channel is not None:
+                    return channel
+
+        # Con un solo robot en la cuenta no hay ambigüedad posible
+        if len(self._channels) == 1:
+            return next(iter(self._channels.values()))
+
+        return None
+
+    async def update_cleaning_state(
+        self, channel: _RobotChannel, cleaning_state_response: CleaningStateResponse
+    ):
+        """Agrega las ejecuciones de limpieza y publica la telemetría con frecuencia limitada."""
 
-    async def _handle_phx_reply(self, payload):
-        if "response" in payload and "body" in payload["response"]:
-            response = payload["response"]
-            body = response["body"]
-            try:
-                response_body = _parse_response_body(body)
-                await self.update_entity_state(response_body)
-            except Exception as e:
-                _LOGGER.error("Error parsing phx_reply response body: %s", e)
-        else:
-            _LOGGER.debug("phx_reply without body")
+        body = cleaning_state_response.body
+        if body is None:
+            return
+        changed = channel.telemetry.update(body)
 
-    async def _handle_last_state(self, payload):
-        if "body" in payload:
-            body = payload["body"]
-            try:
-                response_body = _parse_response_body(body)
-                await self.update_entity_state(response_body)
-            except Exception as e:
-                _LOGGER.error("Error parsing last_state body: %s", e)
-        else:
-            _LOGGER.debug("last_state without body")
+        completed = channel.telemetry.pop_completed()
+        if completed is not None:
+            # Sesión terminada: se guarda en el histórico
+            async_dispatcher_send(
+                self.hass, SIGNAL_CLEANING_SESSION_FINISHED, channel.robot_id, completed
+            )
 
-    async def _handle_cleaning_state(self, payload):
-        if "body" in payload:
-            body = payload["body"]
-            try:
-                cleaning_state_response = _parse_cleaning_state_body(payload)
-                await self.update_cleaning_state(cleaning_state_response)
-            except Exception as e:
-                _LOGGER.error("Error parsing cleaning_state body: %s", e)
-        else:
-            _LOGGER.debug("cleaning_state without body")
+        if not changed:
+            return
 
-    async def update_cleaning_state(self, cleaning_state_response: CleaningStateResponse):
-        """Actualiza la entidad con información detallada de la limpieza."""
-        # Por ejemplo, puedes actualizar atributos personalizados
-        # cleaning_body = cleaning_state_response.body
-        # Supongamos que quieres actualizar el área limpiada
-        # total_area = sum(run.stats.area for run in cleaning_body.runs)
-        # self.entity._attr_cleaned_area = total_area
+        previous = channel.cleaning_published
+        if previous is None or (
+            channel.telemetry.snapshot().transition_key != previous.transition_key
+        ):
+            self._publish_cleaning(channel)
+            return
 
-        # Otros atributos pueden ser actualizados aquí
+        # Solo han avanzado los contadores: se publica como mucho una vez por intervalo
+        wait = _CLEANING_PUBLISH_INTERVAL - (time.monotonic() - channel.cleaning_published_at)
+        if wait <= 0:
+            self._publish_cleaning(channel)
+            return
+
+        channel.cleaning_throttled += 1
+        if channel.cleaning_handle is None:
+            channel.cleaning_handle = self.hass.loop.call_later(
+                wait, self._publish_cleaning, channel
+            )
+
+    def _publish_cleaning(self, channel: _RobotChannel) -> None:
+        """Publica el resumen actual de la limpieza para los sensores del robot."""
+
+        if channel.cleaning_handle is not None:
+            channel.cleaning_handle.cancel()
+            channel.cleaning_handle = None
+
+        telemetry = channel.telemetry.snapshot()
+        if telemetry == channel.cleaning_published:
+            return
 
-        # Confirmar los cambios
-        # self.entity.async_write_ha_state()
-        # _LOGGER.debug("Entity cleaning progress updated. Cleaned area: %s", total_area)
+        channel.cleaning_published = telemetry
+        channel.cleaning_published_at = time.monotonic()
+        channel.cleaning_emitted += 1
 
-    async def update_entity_state(self, response_body: ResponseBody):
-        """Actualiza el estado de la entidad basado en los datos de ResponseBody."""
+        self._states.set_cleaning(channel.robot_id, telemetry)
+        _LOGGER.debug("Telemetría de limpieza de %s: %s", channel.robot_id, telemetry)
+
+    async def update_robot_state(self, channel: _RobotChannel, response_body: ResponseBody):
+        """Traduce el ``state`` del robot y lo publica en el almacén de estado."""
         action = response_body.action
         state = response_body.state
-        available_commands = response_body.available_commands
         details = response_body.details
         errors = response_body.errors
+        robot_state = self._states.get(channel.robot_id)
+        previous = robot_state.vacuum if robot_state is not None else None
 
-        actividad_previa = getattr(self.entity, "_attr_activity", VacuumActivity.IDLE)
+        actividad_previa = previous.activity if previous is not None else VacuumActivity.IDLE
         ha_activity = self._map_activity(state, action, errors, details, actividad_previa)
-
-        # Actualizar la entidad
-        self.entity._attr_activity = ha_activity
         status_text = self._build_status_text(action, state)
 
-        # Guardar estado de la bolsa
+        # El estado de la bolsa y los comandos disponibles se conservan si el mensaje no los trae
+        bag_status = previous.bag_status if previous is not None else None
         if response_body.cleaning_center and response_body.cleaning_center.bag_status:
-            self.entity._attr_bag_status = response_body.cleaning_center.bag_status
-
-        # Guardar available_commands si no es None
+            bag_status = response_body.cleaning_center.bag_status
+        available_commands = response_body.available_commands
         if available_commands is not None:
-            self.entity._attr_available_commands = available_commands
-            _LOGGER.debug("Available commands updated: %s", available_commands)
-
+            if self._tracing:
+                _LOGGER.debug("Available commands updated: %s", available_commands)
+        elif previous is not None:
+            available_commands = previous.available_commands
+
+        channel.telemetry.note_errors(errors)
+        ultimo_error = None
+        errores_detallados: list[tuple] = []
         if errors:
-            errores_legibles: list[str] = []
-            errores_detallados: list[dict[str, str]] = []
             for error in errors:
                 descripcion = self._describe_error(error)
-                severidad_legible = self._map_severity(error.severity)
-                errores_legibles.append(descripcion)
-                detalle_error = {
-                    "codigo": error.code,
-                    "descripcion": descripcion,
-                }
-                if severidad_legible:
-                    detalle_error["severidad"] = severidad_legible
-                errores_detallados.append(detalle_error)
-            status_text = errores_legibles[0]
-            self.entity._ultimo_error = errores_legibles[0]
-            self.entity._errores_detallados = errores_detallados
-        else:
-            self.entity._ultimo_error = None
-            self.entity._errores_detallados = []
+                errores_detallados.append(
+                    (error.code, descripcion, self._map_severity(error.severity))
+                )
+            ultimo_error = errores_detallados[0][1]
+            status_text = ultimo_error
+
+        vacuum = VacuumState(
+            activity=ha_activity,
+            status=status_text,
+            last_error=ultimo_error,
+            errors=tuple(errores_detallados),
+            bag_status=bag_status,
+            available_commands=available_commands,
+        )
+        channel.has_state = True
 
-        # Determinar y almacenar el estado de la batería
-        details = response_body.details
+        # Estado de la batería; el almacén solo avisa si ha cambiado
         battery_level = getattr(details, "charge", None)
         is_charging = getattr(details, "is_charging", False)
-        self.entity._is_charging = is_charging
-
-        self.entity._attr_status = status_text
-
-        entry_data = self.entity.hass.data[DOMAIN][self.entity._entry_id]
-        runtime = entry_data.setdefault("runtime", {})
-        robots_state = runtime.setdefault("robots", {})
-        robot_state = robots_state.setdefault(self.entity._robot.id, {"robot": self.entity._robot})
-        robot_state["robot"] = self.entity._robot
-        robot_state["battery_level"] = battery_level
-        robot_state["is_charging"] = is_charging
-
-        async_dispatcher_send(
-            self.entity.hass,
-            f"{SIGNAL_ROBOT_BATTERY}_{self.entity._robot.id}",
-            battery_level,
-            is_charging,
-        )
+        if self._states.set_battery(channel.robot_id, battery_level, is_charging):
+            channel.battery_emitted += 1
+        else:
+            channel.battery_skipped += 1
+
+        # Solo se avisa a las entidades si cambió algún campo visible de la aspiradora
+        if not self._states.set_vacuum(channel.robot_id, vacuum):
+            self._metrics.record_state_write(False)
+            channel.writes_skipped += 1
+            if self._tracing:
+                _LOGGER.debug("Estado sin cambios para %s, no se escribe", channel.robot_id)
+            return
+
+        self._metrics.record_state_write(True)
+        channel.writes_emitted += 1
+        if self._tracing:
+            _LOGGER.debug(
+                "Estado de %s actualizado con actividad: %s", channel.robot_id, ha_activity
+            )
 
-        # Confirmar los cambios de estado a Home Assistant
-        self.entity.async_write_ha_state()
-        _LOGGER.debug(
-            "Entity state updated in Home Assistant with activity: %s", ha_activity)
+    @property
+    def write_stats(self) -> Dict[str, Dict[str, int]]:
+        """Escrituras de estado emitidas y omitidas por robot."""
+
+        return {
+            channel.robot_id: {
+                "writes_emitted": channel.writes_emitted,
+                "writes_skipped": channel.writes_skipped,
+                "battery_emitted": channel.battery_emitted,
+                "battery_skipped": channel.battery_skipped,
+                "cleaning_emitted": channel.cleaning_emitted,
+                "cleaning_throttled": channel.cleaning_throttled,
+            }
+            for channel in self._channels.values()
+        }
 
     async def disconnect(self):
         self._should_reconnect = False  # Detener intentos de reconexión
@@ -624,8 +1133,26 @@ class KoboldWebSocketClient:
         if self._reconnect_task:
             self._reconnect_task.cancel()
         await self._stop_heartbeat()
+        self._fail_pending_replies()
+        for channel in self._channels.values():
+            self._discard_pending(channel)
+            if channel.rejoin_task is not None:
+                channel.rejoin_task.cancel()
+            channel.joined = False
         self.connected = False
 
+    @staticmethod
+    def _discard_pending(channel: _RobotChannel) -> None:
+        """Cancela los temporizadores pendientes y descarta los mensajes agrupados."""
+
+        if channel.flush_handle is not None:
+            channel.flush_handle.cancel()
+            channel.flush_handle = None
+        channel.pending.clear()
+        if channel.cleaning_handle is not None:
+            channel.cleaning_handle.cancel()
+            channel.cleaning_handle = None
+
     async def _stop_heartbeat(self) -> None:
         """Detiene la tarea de heartbeats si está activa."""
 
@@ -678,11 +1205,7 @@ class KoboldWebSocketClient:
     def _mask_token(value: str) -> str:
         """Devuelve el token parcialmente oculto para los logs."""
 
-        token = value.replace("Bearer ", "")
-        if len(token) <= 12:
-            return value
-
-        return f"Bearer {token[:6]}...{token[-4:]}"
+        return f"Bearer {mask_token(value.replace('Bearer ', ''))}"
 
     def _next_ref(self) -> str:
         """Genera un identificador incremental para los mensajes Phoenix."""
@@ -12,10 +12,25 @@ from .const import (
     CONF_EMAIL,
     CONF_OTP,
     CONF_ID_TOKEN,
+    CONF_REFRESH_TOKEN,
     AUTH_HOST,
     CONF_MARKET,
     DEFAULT_MARKET,
     SUPPORTED_MARKETS,
+    CONF_DISCOVERY_CONCURRENCY,
+    DEFAULT_DISCOVERY_CONCURRENCY,
+    CONF_COALESCE_WINDOW_MS,
+    DEFAULT_COALESCE_WINDOW_MS,
+    CONF_COMMAND_TRANSPORT,
+    COMMAND_TRANSPORT_REST,
+    COMMAND_TRANSPORT_WEBSOCKET,
+    DEFAULT_COMMAND_TRANSPORT,
+    CONF_TRACE_SAMPLE_RATE,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    CONF_TRACE_EVENTS,
+    DEFAULT_TRACE_EVENTS,
+    CONF_FRAME_BUFFER_SIZE,
+    DEFAULT_FRAME_BUFFER_SIZE,
 )
 from .service.user_data_service import UserDataService
 from .api.user_api_client import UserApiClient
@@ -24,6 +39,11 @@ _LOGGER = logging.getLogger(__name__)
 
 MARKET_OPTIONS = {key: data["label"] for key, data in SUPPORTED_MARKETS.items()}
 
+COMMAND_TRANSPORT_OPTIONS = {
+    COMMAND_TRANSPORT_REST: "REST",
+    COMMAND_TRANSPORT_WEBSOCKET: "WebSocket",
+}
+
 
 class KoboldConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Maneja el flujo de configuración para Kobold."""
@@ -36,6 +56,12 @@ class KoboldConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self.user_data_service = None
         self.market = DEFAULT_MARKET
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Devuelve el flujo de opciones de la integración."""
+        return KoboldOptionsFlow()
+
     async def async_step_user(self, user_input=None):
         """Primer paso en el flujo de configuración: solicitar el correo electrónico."""
         errors = {}
@@ -46,30 +72,9 @@ class KoboldConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(self.email)
             self._abort_if_unique_id_configured()
 
-            # Obtener la configuración del mercado seleccionado
-            market_settings = SUPPORTED_MARKETS.get(
-                self.market, SUPPORTED_MARKETS[DEFAULT_MARKET]
-            )
-            language = market_settings["locale"]
-
-            # Crear instancia de UserDataService con el idioma del usuario
-            try:
-                session = async_get_clientsession(self.hass)
-                user_api_client = UserApiClient(
-                    session,
-                    host=AUTH_HOST,
-                    path_send_otp="/passwordless/start",
-                    path_validate_otp="/oauth/token",
-                    language=language  # Agregamos el idioma del mercado
-                )
-                self.user_data_service = UserDataService(user_api_client)
-
-                # Enviar el OTP
-                await self.user_data_service.send_otp_mail(self.email)
+            if await self._async_send_otp():
                 return await self.async_step_otp()
-            except Exception as e:
-                _LOGGER.error("Error al enviar OTP: %s", e)
-                errors["base"] = "cannot_send_otp"
+            errors["base"] = "cannot_send_otp"
 
         data_schema = vol.Schema(
             {
@@ -83,6 +88,55 @@ class KoboldConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(step_id="user", data_schema=data_schema, errors=errors)
 
+    async def async_step_reauth(self, entry_data):
+        """El id_token ha caducado y no se puede renovar: pedir un código nuevo."""
+        self.email = entry_data[CONF_EMAIL]
+        self.market = entry_data.get(CONF_MARKET, DEFAULT_MARKET)
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input=None):
+        """Confirma el envío de un nuevo código OTP al correo de la cuenta."""
+        errors = {}
+
+        if user_input is not None:
+            if await self._async_send_otp():
+                return await self.async_step_otp()
+            errors["base"] = "cannot_send_otp"
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            description_placeholders={"email": self.email},
+            errors=errors,
+        )
+
+    async def _async_send_otp(self) -> bool:
+        """Envía el código OTP al correo usando el idioma del mercado elegido."""
+
+        # Obtener la configuración del mercado seleccionado
+        market_settings = SUPPORTED_MARKETS.get(
+            self.market, SUPPORTED_MARKETS[DEFAULT_MARKET]
+        )
+        language = market_settings["locale"]
+
+        # Crear instancia de UserDataService con el idioma del usuario
+        try:
+            session = async_get_clientsession(self.hass)
+            user_api_client = UserApiClient(
+                session,
+                host=AUTH_HOST,
+                path_send_otp="/passwordless/start",
+                path_validate_otp="/oauth/token",
+                language=language  # Agregamos el idioma del mercado
+            )
+            self.user_data_service = UserDataService(user_api_client)
+
+            # Enviar el OTP
+            await self.user_data_service.send_otp_mail(self.email)
+            return True
+        except Exception as e:
+            _LOGGER.error("Error al enviar OTP: %s", e)
+            return False
+
     async def async_step_otp(self, user_input=None):
         """Segundo paso: solicitar el código OTP."""
         errors = {}
@@ -92,19 +146,80 @@ class KoboldConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             try:
                 validate_response = await self.user_data_service.validate_otp(self.email, otp)
                 self.id_token = validate_response.id_token
+            except Exception as e:
+                _LOGGER.error("Error al validar OTP: %s", e)
+                errors["base"] = "invalid_otp"
+            else:
+                # El refresh_token permite renovar el id_token sin volver a pedir un código
+                tokens = {
+                    CONF_ID_TOKEN: self.id_token,
+                    CONF_REFRESH_TOKEN: validate_response.refresh_token,
+                }
+                if self.source == config_entries.SOURCE_REAUTH:
+                    return self.async_update_reload_and_abort(
+                        self._get_reauth_entry(), data_updates=tokens
+                    )
 
                 return self.async_create_entry(
                     title=f"Kobold ({self.email})",
                     data={
                         CONF_EMAIL: self.email,
-                        CONF_ID_TOKEN: self.id_token,
                         CONF_MARKET: self.market,
+                        **tokens,
                     }
                 )
-            except Exception as e:
-                _LOGGER.error("Error al validar OTP: %s", e)
-                errors["base"] = "invalid_otp"
 
         data_schema = vol.Schema({vol.Required(CONF_OTP): str})
 
         return self.async_show_form(step_id="otp", data_schema=data_schema, errors=errors)
+
+
+class KoboldOptionsFlow(config_entries.OptionsFlow):
+    """Maneja las opciones avanzadas de la integración Kobold."""
+
+    async def async_step_init(self, user_input=None):
+        """Muestra y guarda las opciones de la integración."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        data_schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_DISCOVERY_CONCURRENCY,
+                    default=options.get(
+                        CONF_DISCOVERY_CONCURRENCY, DEFAULT_DISCOVERY_CONCURRENCY
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=16)),
+                vol.Required(
+                    CONF_COALESCE_WINDOW_MS,
+                    default=options.get(
+                        CONF_COALESCE_WINDOW_MS, DEFAULT_COALESCE_WINDOW_MS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=2000)),
+                vol.Required(
+                    CONF_COMMAND_TRANSPORT,
+                    default=options.get(
+                        CONF_COMMAND_TRANSPORT, DEFAULT_COMMAND_TRANSPORT
+                    ),
+                ): vol.In(COMMAND_TRANSPORT_OPTIONS),
+                vol.Required(
+                    CONF_TRACE_SAMPLE_RATE,
+                    default=options.get(
+                        CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10000)),
+                vol.Optional(
+                    CONF_TRACE_EVENTS,
+                    default=options.get(CONF_TRACE_EVENTS, DEFAULT_TRACE_EVENTS),
+                ): str,
+                vol.Required(
+                    CONF_FRAME_BUFFER_SIZE,
+                    default=options.get(
+                        CONF_FRAME_BUFFER_SIZE, DEFAULT_FRAME_BUFFER_SIZE
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=5000)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=data_schema)
@@ -2,6 +2,7 @@ DOMAIN = "kobold_vr7"
 CONF_EMAIL = "email"
 CONF_OTP = "otp"
 CONF_ID_TOKEN = "id_token"
+CONF_REFRESH_TOKEN = "refresh_token"
 CONF_MARKET = "market"
 ORBITAL_HOST = "https://orbital.ksecosys.com"
 AUTH_HOST = "https://mykobold.eu.auth0.com"
@@ -13,7 +14,34 @@ MOBILE_APP_OS = "android"
 MOBILE_APP_OS_VERSION = "11"
 MOBILE_APP_USER_AGENT = "okhttp/5.1.0"
 MOBILE_APP_ACCEPT_ENCODING = "gzip"
-SIGNAL_ROBOT_BATTERY = "kobold_vr7_battery"
+SIGNAL_CLEANING_SESSION_FINISHED = "kobold_vr7_cleaning_session_finished"
+
+# Histórico de limpiezas (SQLite en el directorio de configuración)
+DATA_HISTORY_STORE = "kobold_vr7_history"
+SERVICE_GET_CLEANING_HISTORY = "get_cleaning_history"
+SERVICE_PROFILE = "profile"
+SERVICE_DUMP_FRAMES = "dump_frames"
+
+# Opciones configurables desde el flujo de opciones
+CONF_DISCOVERY_CONCURRENCY = "discovery_concurrency"
+DEFAULT_DISCOVERY_CONCURRENCY = 4
+# Ventana (ms) para agrupar ráfagas de mensajes del WebSocket; 0 la desactiva
+CONF_COALESCE_WINDOW_MS = "coalesce_window_ms"
+DEFAULT_COALESCE_WINDOW_MS = 0
+# Transporte de los comandos: REST (Orbital) o el WebSocket ya abierto, con REST de respaldo
+CONF_COMMAND_TRANSPORT = "command_transport"
+COMMAND_TRANSPORT_REST = "rest"
+COMMAND_TRANSPORT_WEBSOCKET = "websocket"
+DEFAULT_COMMAND_TRANSPORT = COMMAND_TRANSPORT_REST
+# Traza de frames del WebSocket con el log en debug: uno de cada N (1 = todos)
+CONF_TRACE_SAMPLE_RATE = "trace_sample_rate"
+DEFAULT_TRACE_SAMPLE_RATE = 1
+# Tipos de evento a trazar separados por comas (vacío = todos)
+CONF_TRACE_EVENTS = "trace_events"
+DEFAULT_TRACE_EVENTS = ""
+# Frames crudos del WebSocket que se guardan por robot para volcarlos (0 = no se graban)
+CONF_FRAME_BUFFER_SIZE = "frame_buffer_size"
+DEFAULT_FRAME_BUFFER_SIZE = 0
 
 # Mercados soportados y el idioma asociado que necesitan las APIs
 DEFAULT_MARKET = "es"
@@ -53,3 +81,13 @@ ERROR_CODE_DESCRIPTIONS = {
     "bin_full": "Depósito de polvo lleno",
     "cleaning_path_blocked": "Trayectoria de limpieza bloqueada",
 }
+
+# Caché del bearer de Companion: TTL por defecto si el JWT no trae "exp"
+# y margen con el que se renueva en segundo plano antes de caducar (segundos)
+PROFILE_BEARER_DEFAULT_TTL = 3600
+PROFILE_BEARER_REFRESH_MARGIN = 300
+
+# Renovación del id_token de Auth0 con el refresh_token: margen antes de que
+# caduque y espera entre intentos si Auth0 no está disponible (segundos)
+ID_TOKEN_REFRESH_MARGIN = 600
+ID_TOKEN_RETRY_DELAY = 60
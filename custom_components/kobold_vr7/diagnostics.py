@@ -0,0 +1,69 @@
+"""Diagnósticos descargables de la integración Kobold VR7."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_EMAIL, CONF_ID_TOKEN, CONF_REFRESH_TOKEN, DOMAIN
+from .hub import KoboldHub
+from .service.token_utils import mask_token
+
+# Datos personales que no deben salir en el fichero descargado
+TO_REDACT = {CONF_EMAIL}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Devuelve el estado de la cuenta, las métricas y las estadísticas de los clientes."""
+    hub: KoboldHub = hass.data[DOMAIN][entry.entry_id]
+    client = hub.websocket_service.client
+
+    data = async_redact_data(dict(entry.data), TO_REDACT)
+    # Los tokens se recortan en lugar de ocultarse para poder distinguir si han cambiado
+    for key in (CONF_ID_TOKEN, CONF_REFRESH_TOKEN):
+        if key in data:
+            data[key] = mask_token(data[key])
+
+    robots = []
+    for state in hub.states:
+        robot = state.robot
+        robots.append(
+            {
+                "id": robot.id,
+                "name": robot.name,
+                "serial": mask_token(robot.serial),
+                "model": getattr(robot, "model_name", None),
+                "firmware": getattr(robot, "firmware", None),
+                "joined": client.is_joined(robot.id),
+                "activity": str(state.vacuum.activity) if state.vacuum else None,
+                "status": state.vacuum.status if state.vacuum else None,
+                "battery_level": state.battery_level,
+                "maps": len(state.maps),
+            }
+        )
+
+    return {
+        "entry": {"data": data, "options": dict(entry.options)},
+        "robots": robots,
+        "metrics": hub.metrics.snapshot(),
+        "websocket": {
+            "connected": client.connected,
+            "link": client.link_stats,
+            "writes": client.write_stats,
+        },
+        "rest": {
+            "requests": hub.robots_api_client.request_stats,
+            "cache": hub.robots_service.cache_stats,
+        },
+        "commands": hub.command_service.stats,
+        # Solo el número de frames grabados: los frames crudos llevan números de serie y
+        # datos de la cuenta, y únicamente se exportan con el servicio dump_frames
+        "frames": (
+            client.frame_recorder.stats if client.frame_recorder is not None else None
+        ),
+    }
@@ -0,0 +1,252 @@
+"""Objeto central de cada entrada de configuración.
+
+El hub crea y posee todo lo que comparten las plataformas de una cuenta: la
+sesión HTTP, la renovación del id_token, los servicios REST y de Companion,
+la conexión WebSocket única y el estado tipado de cada robot. Las entidades
+solo leen de ``hub.states`` y se suscriben a su robot; añadir entidades no
+abre conexiones nuevas.
+"""
+
+import logging
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryError,
+    ConfigEntryNotReady,
+)
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .api.profile_api_client import ProfileApiClient
+from .api.robots_api_client import RobotsApiClient
+from .api.user_api_client import UserApiClient
+from .api.websocket_client import KoboldWebSocketClient
+from .const import (
+    AUTH_HOST,
+    COMPANION_HOST,
+    CONF_COALESCE_WINDOW_MS,
+    CONF_COMMAND_TRANSPORT,
+    CONF_DISCOVERY_CONCURRENCY,
+    CONF_FRAME_BUFFER_SIZE,
+    CONF_ID_TOKEN,
+    CONF_MARKET,
+    CONF_TRACE_EVENTS,
+    CONF_TRACE_SAMPLE_RATE,
+    DEFAULT_COALESCE_WINDOW_MS,
+    DEFAULT_COMMAND_TRANSPORT,
+    DEFAULT_DISCOVERY_CONCURRENCY,
+    DEFAULT_FRAME_BUFFER_SIZE,
+    DEFAULT_MARKET,
+    DEFAULT_TRACE_EVENTS,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    DOMAIN,
+    ORBITAL_HOST,
+    SUPPORTED_MARKETS,
+)
+from .service.command_service import CommandService
+from .service.metrics import MetricsRegistry
+from .service.model.map_with_zones import MapWithZones
+from .service.profile_service import ProfileService
+from .service.robot_service import RobotsService, UserDataServiceException
+from .service.robot_state import RobotStateStore
+from .service.robots_cache_store import RobotsCacheStore
+from .service.token_manager import IdTokenManager
+from .service.websocket_service import WebSocketService
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KoboldHub:
+    """Clientes, servicios y estado de los robots de una entrada de configuración."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+        # Opciones con las que se cargó la entrada, para saber si hay que recargarla
+        self.options: Dict[str, Any] = dict(entry.options)
+        self.concurrency: int = entry.options.get(
+            CONF_DISCOVERY_CONCURRENCY, DEFAULT_DISCOVERY_CONCURRENCY
+        )
+        self.states = RobotStateStore()
+        # Contadores de REST, WebSocket y logins para diagnósticos y sensores
+        self.metrics = MetricsRegistry()
+
+        market_settings = SUPPORTED_MARKETS.get(
+            entry.data.get(CONF_MARKET, DEFAULT_MARKET), SUPPORTED_MARKETS[DEFAULT_MARKET]
+        )
+        self.session = async_get_clientsession(hass)
+        self.token_manager = IdTokenManager(
+            hass,
+            entry,
+            UserApiClient(
+                self.session,
+                host=AUTH_HOST,
+                path_send_otp="/passwordless/start",
+                path_validate_otp="/oauth/token",
+                language=market_settings["locale"],
+            ),
+        )
+
+        # Servicio REST compartido por todas las plataformas, con caché persistente
+        self.robots_api_client = RobotsApiClient(
+            self.session,
+            token=entry.data[CONF_ID_TOKEN],
+            host=ORBITAL_HOST,
+            on_unauthorized=self._async_on_unauthorized,
+            metrics=self.metrics,
+        )
+        self.robots_service = RobotsService(
+            self.robots_api_client, cache_store=RobotsCacheStore(hass, entry.entry_id)
+        )
+
+        self.profile_service = ProfileService(
+            ProfileApiClient(
+                self.session,
+                host=COMPANION_HOST,
+                language=market_settings["accept_language"],
+            ),
+            metrics=self.metrics,
+            id_token_provider=lambda: self.token_manager.id_token,
+        )
+        # Una única conexión WebSocket por cuenta que publica en ``states``
+        self.websocket_service = WebSocketService(
+            KoboldWebSocketClient(
+                hass,
+                self.session,
+                entry.data[CONF_ID_TOKEN],
+                self.profile_service.login,
+                market_settings["accept_language"],
+                coalesce_window=entry.options.get(
+                    CONF_COALESCE_WINDOW_MS, DEFAULT_COALESCE_WINDOW_MS
+                ) / 1000,
+                on_auth_failed=self.token_manager.async_recover,
+                states=self.states,
+                metrics=self.metrics,
+                trace_sample_rate=entry.options.get(
+                    CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE
+                ),
+                trace_events=[
+                    event.strip()
+                    for event in entry.options.get(
+                        CONF_TRACE_EVENTS, DEFAULT_TRACE_EVENTS
+                    ).split(",")
+                    if event.strip()
+                ],
+                frame_buffer_size=entry.options.get(
+                    CONF_FRAME_BUFFER_SIZE, DEFAULT_FRAME_BUFFER_SIZE
+                ),
+            )
+        )
+        self.command_service = CommandService(
+            self.robots_service,
+            self.websocket_service,
+            entry.options.get(CONF_COMMAND_TRANSPORT, DEFAULT_COMMAND_TRANSPORT),
+        )
+        self._from_cache = False
+
+    @property
+    def id_token(self) -> str:
+        return self.token_manager.id_token
+
+    async def async_setup(self) -> None:
+        """Renueva el token si hace falta y descubre los robots antes de crear entidades.
+
+        Los fallos pasajeros se notifican como ``ConfigEntryNotReady`` para que
+        Home Assistant reintente la carga; las credenciales rechazadas piden
+        reautenticarse.
+        """
+        self.entry.async_on_unload(self.token_manager.async_stop)
+        if not await self.token_manager.async_start():
+            if self.token_manager.reauth_required:
+                raise ConfigEntryAuthFailed("El id_token ha caducado y no se puede renovar")
+            raise ConfigEntryNotReady("No se pudo renovar el id_token caducado")
+        self.entry.async_on_unload(
+            self.token_manager.async_add_listener(self._async_id_token_renewed)
+        )
+
+        discovery_start = time.monotonic()
+        # Arranque en frío desde la caché persistente; la API solo se consulta si no existe.
+        # Los mapas y zonas se piden en paralelo con un límite de peticiones simultáneas.
+        try:
+            robots, maps_by_robot, self._from_cache = await self.robots_service.get_discovery(
+                self.id_token, self.concurrency
+            )
+        except UserDataServiceException as error:
+            if error.transient:
+                raise ConfigEntryNotReady(f"Kobold no disponible: {error}") from error
+            if error.auth_failed:
+                raise ConfigEntryAuthFailed(f"Credenciales rechazadas: {error}") from error
+            raise ConfigEntryError(f"No se pudieron obtener los robots: {error}") from error
+
+        for robot in robots:
+            self.states.add_robot(robot, maps_by_robot.get(robot.id, []))
+
+        _LOGGER.info(
+            "Descubrimiento de %s robots y %s mapas desde %s completado en %.2f s (concurrencia %s)",
+            len(robots),
+            sum(len(maps) for maps in maps_by_robot.values()),
+            "caché" if self._from_cache else "API",
+            time.monotonic() - discovery_start,
+            self.concurrency,
+        )
+
+    async def async_start(self) -> None:
+        """Abre el WebSocket una vez creadas las entidades y revalida la caché si hace falta."""
+        for state in self.states:
+            await self.websocket_service.register_robot(state.robot.id, state.robot.serial)
+
+        if self._from_cache:
+            self.entry.async_create_background_task(
+                self.hass, self._async_revalidate_cache(), f"{DOMAIN}_revalidate_cache"
+            )
+
+    async def async_shutdown(self) -> None:
+        """Cierra la conexión WebSocket y libera los clientes de la cuenta."""
+        await self.websocket_service.stop()
+        self.profile_service.close()
+
+    async def _async_on_unauthorized(self) -> bool:
+        # Si la entrada ya tiene otro id_token (reautenticado) se usa ese; si no, se renueva
+        token = self.entry.data[CONF_ID_TOKEN]
+        if token != self.robots_api_client.token:
+            self.robots_api_client.set_token(token)
+            return True
+        return await self.token_manager.async_refresh()
+
+    @callback
+    def _async_id_token_renewed(self, id_token: str) -> None:
+        # Los clientes en uso pasan a usar el token nuevo sin recargar la integración
+        self.robots_api_client.set_token(id_token)
+        self.websocket_service.client.set_id_token(id_token)
+
+    async def _async_revalidate_cache(self) -> None:
+        """Revalida en segundo plano la caché y actualiza solo los mapas que han cambiado."""
+        cached_robots = [state.robot for state in self.states]
+        cached_maps: Dict[str, List[MapWithZones]] = {
+            state.robot.id: state.maps for state in self.states
+        }
+        try:
+            robots, maps_by_robot, changed_robot_ids = await self.robots_service.revalidate(
+                self.id_token, self.concurrency, cached_maps
+            )
+        except Exception as e:
+            _LOGGER.warning("No se pudo revalidar la caché de robots: %s", e)
+            return
+
+        if [asdict(robot) for robot in robots] != [asdict(robot) for robot in cached_robots]:
+            # Cambió la lista de robots (altas, bajas o datos): recrear las entidades
+            _LOGGER.info("La lista de robots ha cambiado, recargando la integración")
+            self.hass.config_entries.async_schedule_reload(self.entry.entry_id)
+            return
+
+        # Las entidades de cada robot (aspiradora, mapa) reciben el aviso del almacén
+        for robot_id in changed_robot_ids:
+            self.states.set_maps(robot_id, maps_by_robot.get(robot_id, []))
+
+        _LOGGER.debug(
+            "Caché de robots revalidada; robots con mapas modificados: %s", changed_robot_ids
+        )
@@ -0,0 +1,111 @@
+"""Entidades de imagen con el mapa de cada robot Kobold."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.image import ImageEntity
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .hub import KoboldHub
+from .service.map_renderer import MapRenderer, map_version
+from .service.model.map_with_zones import MapWithZones
+from .service.robot_state import UPDATE_MAPS, RobotState
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Crea una entidad de mapa por robot."""
+    hub: KoboldHub = hass.data[DOMAIN][entry.entry_id]
+
+    async_add_entities(
+        KoboldMapImageEntity(hass, hub, robot_state) for robot_state in hub.states
+    )
+
+
+class KoboldMapImageEntity(ImageEntity):
+    """Muestra el floorplan principal del robot renderizado como PNG."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_content_type = "image/png"
+
+    def __init__(self, hass, hub: KoboldHub, robot_state: RobotState):
+        """Inicializa la entidad de mapa."""
+        super().__init__(hass)
+        self._hub = hub
+        self._state = robot_state
+        self._robot = robot_state.robot
+        self._renderer = MapRenderer()
+        self._attr_unique_id = f"{self._robot.id}_map"
+        # Nombre en inglés, igual que el resto de sensores auxiliares
+        self._attr_name = "Map"
+        self._map_with_zones: MapWithZones | None = None
+        self._set_maps(robot_state.maps)
+
+    async def async_added_to_hass(self):
+        """Se suscribe a los cambios de mapas tras revalidar la caché."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._hub.states.subscribe(self._robot.id, self._async_robot_updated)
+        )
+
+    @callback
+    def _async_robot_updated(self, kind: str) -> None:
+        """Marca la imagen como actualizada solo si cambió la versión del mapa."""
+        if kind != UPDATE_MAPS:
+            return
+        previous = self._map_with_zones
+        self._set_maps(self._state.maps)
+        if (previous is None) != (self._map_with_zones is None) or (
+            previous is not None
+            and map_version(previous) != map_version(self._map_with_zones)
+        ):
+            self._attr_image_last_updated = dt_util.utcnow()
+            self.async_write_ha_state()
+
+    def _set_maps(self, map_with_zones_list: list[MapWithZones]) -> None:
+        """Elige el mapa por defecto del robot, o el primero disponible."""
+        candidates = [mwz for mwz in map_with_zones_list if mwz.map is not None]
+        selected = next((mwz for mwz in candidates if mwz.map.default), None)
+        if selected is None and candidates:
+            selected = candidates[0]
+        self._map_with_zones = selected
+        if selected is not None and self._attr_image_last_updated is None:
+            self._attr_image_last_updated = dt_util.utcnow()
+
+    @property
+    def available(self) -> bool:
+        """La entidad solo está disponible si el robot tiene algún mapa."""
+        return self._map_with_zones is not None
+
+    @property
+    def extra_state_attributes(self):
+        """Identifica el floorplan mostrado."""
+        if self._map_with_zones is None:
+            return {}
+        robot_map = self._map_with_zones.map
+        return {"map_uuid": robot_map.floorplan_uuid, "map_name": robot_map.name}
+
+    async def async_image(self) -> bytes | None:
+        """Devuelve el PNG del mapa; solo se renderiza si la versión es nueva."""
+        if self._map_with_zones is None:
+            return None
+        return await self._renderer.async_render(self.hass, self._map_with_zones)
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Enlaza la imagen con el dispositivo principal de la aspiradora."""
+        identificador = self._robot.serial or self._robot.id
+        fabricante = getattr(self._robot, 'vendor', None) or "Kobold"
+        return DeviceInfo(
+            identifiers={(DOMAIN, identificador)},
+            manufacturer=fabricante,
+            model=getattr(self._robot, 'model_name', None),
+            name=self._robot.name,
+            sw_version=getattr(self._robot, 'firmware', None),
+        )
@@ -3,84 +3,235 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
 from typing import Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
-from homeassistant.const import PERCENTAGE
+from homeassistant.const import PERCENTAGE, UnitOfArea, UnitOfTime
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
 from homeassistant.helpers.icon import icon_for_battery_level
 
-from .api.robots_api_client import RobotsApiClient
-from .const import CONF_ID_TOKEN, DOMAIN, ORBITAL_HOST, SIGNAL_ROBOT_BATTERY
-from .service.robot_service import RobotsService
+from .const import DOMAIN
+from .hub import KoboldHub
+from .service.metrics import MetricsRegistry
+from .service.cleaning_telemetry import CleaningTelemetry
+from .service.robot_state import (
+    UPDATE_BATTERY,
+    UPDATE_CLEANING,
+    UPDATE_HEARTBEAT,
+    RobotState,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Los sensores de métricas se consultan periódicamente; el resto recibe avisos
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+@dataclass(frozen=True, kw_only=True)
+class KoboldCleaningSensorDescription(SensorEntityDescription):
+    """Describe un sensor calculado a partir de la telemetría de limpieza."""
+
+    value_fn: Callable[[CleaningTelemetry], Any]
+
+
+# Los nombres se definen en inglés, igual que el sensor de batería
+CLEANING_SENSORS: tuple[KoboldCleaningSensorDescription, ...] = (
+    KoboldCleaningSensorDescription(
+        key="cleaned_area",
+        name="Cleaned area",
+        icon="mdi:texture-box",
+        device_class=SensorDeviceClass.AREA,
+        native_unit_of_measurement=UnitOfArea.SQUARE_METERS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda telemetry: telemetry.cleaned_area,
+    ),
+    KoboldCleaningSensorDescription(
+        key="cleaning_time",
+        name="Cleaning time",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_unit_of_measurement=UnitOfTime.MINUTES,
+        value_fn=lambda telemetry: telemetry.elapsed_time,
+    ),
+    KoboldCleaningSensorDescription(
+        key="paused_time",
+        name="Paused time",
+        icon="mdi:pause-circle-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_unit_of_measurement=UnitOfTime.MINUTES,
+        value_fn=lambda telemetry: telemetry.paused_time,
+    ),
+    KoboldCleaningSensorDescription(
+        key="charging_time",
+        name="Charging time",
+        icon="mdi:battery-clock-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        suggested_unit_of_measurement=UnitOfTime.MINUTES,
+        value_fn=lambda telemetry: telemetry.charging_time,
+    ),
+    KoboldCleaningSensorDescription(
+        key="current_zone",
+        name="Current zone",
+        icon="mdi:map-marker-radius",
+        value_fn=lambda telemetry: telemetry.current_zone,
+    ),
+    KoboldCleaningSensorDescription(
+        key="cleaning_runs",
+        name="Cleaning runs",
+        icon="mdi:counter",
+        value_fn=lambda telemetry: telemetry.run_count,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class KoboldMetricSensorDescription(SensorEntityDescription):
+    """Describe un sensor de diagnóstico leído del registro de métricas de la cuenta."""
+
+    value_fn: Callable[[MetricsRegistry], Any]
+
+
+# Desactivados por defecto: solo interesan al diagnosticar problemas de conexión
+METRIC_SENSORS: tuple[KoboldMetricSensorDescription, ...] = (
+    KoboldMetricSensorDescription(
+        key="rest_requests",
+        name="REST requests",
+        icon="mdi:api",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.rest_requests,
+    ),
+    KoboldMetricSensorDescription(
+        key="rest_errors",
+        name="REST errors",
+        icon="mdi:api-off",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.rest_errors,
+    ),
+    KoboldMetricSensorDescription(
+        key="websocket_messages",
+        name="WebSocket messages",
+        icon="mdi:message-processing-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.ws_messages,
+    ),
+    KoboldMetricSensorDescription(
+        key="websocket_reconnects",
+        name="WebSocket reconnects",
+        icon="mdi:lan-disconnect",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.reconnects,
+    ),
+    KoboldMetricSensorDescription(
+        key="parse_failures",
+        name="Parse failures",
+        icon="mdi:code-braces-box",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.parse_failures,
+    ),
+)
+
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Configura los sensores asociados a una entrada de la integración."""
-    entry_data = hass.data[DOMAIN][entry.entry_id]
-    config = entry_data["config"]
-    runtime = entry_data.setdefault("runtime", {})
-
-    id_token = config[CONF_ID_TOKEN]
-
-    robots_service: RobotsService | None = runtime.get("robots_service")
-    if not robots_service:
-        session = async_get_clientsession(hass)
-        robots_api_client = RobotsApiClient(session, token=id_token, host=ORBITAL_HOST)
-        robots_service = RobotsService(robots_api_client)
-        runtime["robots_service"] = robots_service
-
-    robots_state: dict[str, dict[str, Any]] = runtime.setdefault("robots", {})
-
-    if not robots_state:
-        robots = await robots_service.get_all_robots(id_token)
-        for robot in robots:
-            estado_robot = robots_state.setdefault(robot.id, {})
-            estado_robot["robot"] = robot
-            estado_robot.setdefault("battery_level", None)
-            estado_robot.setdefault("is_charging", False)
-
-    sensores = []
-    for robot_id, estado_robot in robots_state.items():
-        robot = estado_robot.get("robot")
-        if robot is None:
-            _LOGGER.debug("Omitiendo sensor de batería para robot %s sin datos", robot_id)
-            continue
-        sensores.append(
-            KoboldBatterySensor(hass, robot, estado_robot)
+    hub: KoboldHub = hass.data[DOMAIN][entry.entry_id]
+
+    sensores: list[SensorEntity] = []
+    for estado_robot in hub.states:
+        sensores.append(KoboldBatterySensor(hub, estado_robot))
+        sensores.extend(
+            KoboldCleaningSensor(hub, estado_robot, description)
+            for description in CLEANING_SENSORS
         )
+        sensores.append(KoboldHeartbeatRttSensor(hub, estado_robot))
+
+    sensores.extend(
+        KoboldMetricSensor(hub, description) for description in METRIC_SENSORS
+    )
 
     if sensores:
         async_add_entities(sensores)
 
 
-class KoboldBatterySensor(SensorEntity):
-    """Sensor de batería separado para los robots Kobold."""
+class _KoboldRobotSensor(SensorEntity):
+    """Sensor de un robot que se actualiza con los avisos del estado compartido."""
 
     _attr_has_entity_name = True
     _attr_should_poll = False
+
+    # Tipo de cambio del almacén de estado al que atiende el sensor
+    _update_kind: str
+    # Atributo de RobotState que se publica tal cual; si no, se sobrescribe
+    # ``_actualizar_desde_estado``
+    _state_attr: str | None = None
+    # Escribir aunque el valor no cambie (icono o atributos derivados, series temporales)
+    _write_unchanged = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """Rechaza al definirla una subclase que no sepa de dónde leer su valor."""
+        super().__init_subclass__(**kwargs)
+        if (
+            cls._state_attr is None
+            and cls._actualizar_desde_estado is _KoboldRobotSensor._actualizar_desde_estado
+        ):
+            raise TypeError(
+                f"{cls.__name__} debe definir _state_attr o sobrescribir _actualizar_desde_estado"
+            )
+
+    def __init__(self, hub: KoboldHub, estado_robot: RobotState) -> None:
+        self._hub = hub
+        self._state = estado_robot
+        self._robot = estado_robot.robot
+        self._attr_device_info = _device_info(self._robot)
+        self._actualizar_desde_estado()
+
+    async def async_added_to_hass(self) -> None:
+        """Se suscribe a los cambios del robot al añadirse al sistema."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._hub.states.subscribe(self._robot.id, self._async_robot_updated)
+        )
+
+    @callback
+    def _async_robot_updated(self, kind: str) -> None:
+        """Actualiza el valor solo si ha cambiado para no llenar el registro."""
+        if kind != self._update_kind:
+            return
+        previous = self._attr_native_value
+        self._actualizar_desde_estado()
+        if self._write_unchanged or self._attr_native_value != previous:
+            self.async_write_ha_state()
+
+    def _actualizar_desde_estado(self) -> None:
+        """Copia el valor del sensor desde el estado del robot."""
+        self._attr_native_value = getattr(self._state, self._state_attr)
+
+
+class KoboldBatterySensor(_KoboldRobotSensor):
+    """Sensor de batería separado para los robots Kobold."""
+
     _attr_device_class = SensorDeviceClass.BATTERY
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = PERCENTAGE
     _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _update_kind = UPDATE_BATTERY
+    # Empezar o dejar de cargar sin cambiar de nivel también cambia el icono
+    _write_unchanged = True
 
-    def __init__(self, hass, robot, estado_robot: dict[str, Any]):
+    def __init__(self, hub: KoboldHub, estado_robot: RobotState):
         """Inicializa el sensor de batería."""
-        self.hass = hass
-        self._robot = robot
-        self._robot_state = estado_robot
-        self._is_charging = estado_robot.get("is_charging", False)
-
-        self._attr_unique_id = f"{robot.id}_battery"
+        self._attr_unique_id = f"{estado_robot.robot.id}_battery"
         # Nombre del sensor sin repetir el nombre del robot porque Home Assistant
         # añadirá automáticamente el nombre del dispositivo cuando
         # ``_attr_has_entity_name`` es verdadero.
@@ -88,41 +239,14 @@ class KoboldBatterySensor(SensorEntity):
         # del proyecto, el nombre del sensor se define explícitamente en inglés
         # para que Home Assistant no lo traduzca automáticamente.
         self._attr_name = "Battery"
-        self._attr_native_value = estado_robot.get("battery_level")
+        self._is_charging = False
+        super().__init__(hub, estado_robot)
 
+    def _actualizar_desde_estado(self) -> None:
+        self._attr_native_value = self._state.battery_level
+        self._is_charging = self._state.is_charging
         self._actualizar_icono()
 
-    async def async_added_to_hass(self):
-        """Se suscribe a las actualizaciones del robot al añadirse al sistema."""
-        await super().async_added_to_hass()
-        self.async_on_remove(
-            async_dispatcher_connect(
-                self.hass,
-                f"{SIGNAL_ROBOT_BATTERY}_{self._robot.id}",
-                self._procesar_actualizacion_bateria,
-            )
-        )
-
-    def _procesar_actualizacion_bateria(self, nivel: int | None, cargando: bool):
-        """Programa una actualización segura para el hilo principal."""
-        self.hass.loop.call_soon_threadsafe(
-            self._actualizar_estado_desde_evento,
-            nivel,
-            cargando,
-        )
-
-    @callback
-    def _actualizar_estado_desde_evento(
-        self, nivel: int | None, cargando: bool
-    ) -> None:
-        """Actualiza el estado de la batería en el bucle de eventos."""
-        self._robot_state["battery_level"] = nivel
-        self._robot_state["is_charging"] = cargando
-        self._attr_native_value = nivel
-        self._is_charging = cargando
-        self._actualizar_icono()
-        self.async_write_ha_state()
-
     def _actualizar_icono(self):
         """Establece el icono adecuado según el estado de la batería."""
         nivel = self._attr_native_value
@@ -140,15 +264,86 @@ class KoboldBatterySensor(SensorEntity):
         # implícitas por parte de Home Assistant.
         return {"charging": self._is_charging}
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Enlaza el sensor con el dispositivo principal de la aspiradora."""
-        identificador = self._robot.serial or self._robot.id
-        fabricante = getattr(self._robot, 'vendor', None) or "Kobold"
-        return DeviceInfo(
-            identifiers={(DOMAIN, identificador)},
-            manufacturer=fabricante,
-            model=getattr(self._robot, 'model_name', None),
-            name=self._robot.name,
-            sw_version=getattr(self._robot, 'firmware', None),
+
+class KoboldCleaningSensor(_KoboldRobotSensor):
+    """Sensor de la limpieza en curso alimentado por los mensajes ``cleaning_state``."""
+
+    entity_description: KoboldCleaningSensorDescription
+    _update_kind = UPDATE_CLEANING
+
+    def __init__(
+        self,
+        hub: KoboldHub,
+        estado_robot: RobotState,
+        description: KoboldCleaningSensorDescription,
+    ) -> None:
+        """Inicializa el sensor con la última telemetría conocida."""
+        self.entity_description = description
+        self._attr_unique_id = f"{estado_robot.robot.id}_{description.key}"
+        super().__init__(hub, estado_robot)
+
+    def _actualizar_desde_estado(self) -> None:
+        telemetry: CleaningTelemetry | None = self._state.cleaning
+        self._attr_native_value = (
+            self.entity_description.value_fn(telemetry) if telemetry is not None else None
         )
+
+
+class KoboldHeartbeatRttSensor(_KoboldRobotSensor):
+    """Tiempo de ida y vuelta del heartbeat del WebSocket que atiende al robot."""
+
+    _attr_name = "WebSocket latency"
+    _attr_icon = "mdi:lan-pending"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _update_kind = UPDATE_HEARTBEAT
+    _state_attr = "heartbeat_rtt"
+    # Cada medición se registra aunque repita valor
+    _write_unchanged = True
+
+    def __init__(self, hub: KoboldHub, estado_robot: RobotState) -> None:
+        """Inicializa el sensor con el último RTT medido."""
+        self._attr_unique_id = f"{estado_robot.robot.id}_websocket_rtt"
+        super().__init__(hub, estado_robot)
+
+
+class KoboldMetricSensor(SensorEntity):
+    """Contador del registro de métricas de la cuenta, en un dispositivo de servicio."""
+
+    entity_description: KoboldMetricSensorDescription
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, hub: KoboldHub, description: KoboldMetricSensorDescription) -> None:
+        """Inicializa el sensor con el valor actual del contador."""
+        self.entity_description = description
+        self._metrics = hub.metrics
+        entry_id = hub.entry.entry_id
+        self._attr_unique_id = f"{entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry_id)},
+            name="Kobold cloud",
+            manufacturer="Kobold",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+        self._attr_native_value = description.value_fn(self._metrics)
+
+    async def async_update(self) -> None:
+        """Lee el contador; no hace peticiones de red."""
+        self._attr_native_value = self.entity_description.value_fn(self._metrics)
+
+
+def _device_info(robot) -> DeviceInfo:
+    """Información del dispositivo compartida por todos los sensores del robot."""
+    identificador = robot.serial or robot.id
+    fabricante = getattr(robot, 'vendor', None) or "Kobold"
+    return DeviceInfo(
+        identifiers={(DOMAIN, identificador)},
+        manufacturer=fabricante,
+        model=getattr(robot, 'model_name', None),
+        name=robot.name,
+        sw_version=getattr(robot, 'firmware', None),
+    )
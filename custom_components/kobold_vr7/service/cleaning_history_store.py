@@ -0,0 +1,285 @@
+"""Histórico local de sesiones de limpieza en SQLite.
+
+Cada sesión terminada se guarda una vez (fila en ``sessions``) junto con sus
+ejecuciones por zona (filas en ``runs``). Los índices sobre robot, floorplan,
+zona y fecha permiten consultar meses de histórico sin recorrer los estados
+del recorder. Todo el acceso a disco se hace en el executor de Home Assistant.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+
+from .cleaning_telemetry import CleaningSession, parse_time
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_DB_FILENAME = "kobold_vr7_history.db"
+
+# 2: started_ts de las marcas sin zona horaria se calcula en UTC (antes en hora local)
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    robot_id TEXT NOT NULL,
+    session_start TEXT NOT NULL,
+    started_ts REAL,
+    ended_at TEXT,
+    floorplan_uuid TEXT,
+    cleaning_type TEXT,
+    ability TEXT,
+    started_by TEXT,
+    cleaned_area REAL NOT NULL DEFAULT 0,
+    elapsed_time INTEGER NOT NULL DEFAULT 0,
+    paused_time INTEGER NOT NULL DEFAULT 0,
+    charging_time INTEGER NOT NULL DEFAULT 0,
+    error_time INTEGER NOT NULL DEFAULT 0,
+    errors TEXT,
+    UNIQUE (robot_id, session_start)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_robot_time ON sessions (robot_id, started_ts);
+CREATE INDEX IF NOT EXISTS idx_sessions_floorplan_time ON sessions (floorplan_uuid, started_ts);
+CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions (started_ts);
+CREATE TABLE IF NOT EXISTS runs (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    track_uuid TEXT,
+    track_name TEXT,
+    state TEXT,
+    mode TEXT,
+    navigation_mode TEXT,
+    area REAL NOT NULL DEFAULT 0,
+    pickup_count INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT,
+    ended_at TEXT,
+    paused INTEGER NOT NULL DEFAULT 0,
+    charging INTEGER NOT NULL DEFAULT 0,
+    error INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_runs_track ON runs (track_uuid, session_id);
+CREATE INDEX IF NOT EXISTS idx_runs_track_name ON runs (track_name, session_id);
+"""
+
+_SESSION_COLUMNS = (
+    "id, robot_id, session_start, ended_at, floorplan_uuid, cleaning_type, ability, "
+    "started_by, cleaned_area, elapsed_time, paused_time, charging_time, error_time, errors"
+)
+
+
+class CleaningHistoryStore:
+    """Base de datos SQLite del histórico, compartida por todas las entradas."""
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        self._hass = hass
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        # sqlite3 no admite usos concurrentes de la misma conexión desde varios hilos
+        self._lock = threading.Lock()
+
+    async def async_record(self, robot_id: str, session: CleaningSession) -> None:
+        """Guarda (o sustituye) una sesión terminada."""
+
+        try:
+            await self._hass.async_add_executor_job(self._record, robot_id, session)
+        except sqlite3.Error as error:
+            _LOGGER.warning("No se pudo guardar la limpieza en el histórico: %s", error)
+
+    async def async_query(
+        self,
+        robot_ids: Optional[List[str]] = None,
+        floorplan_uuid: Optional[str] = None,
+        zone: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Consulta sesiones filtradas, de la más reciente a la más antigua."""
+
+        return await self._hass.async_add_executor_job(
+            self._query, robot_ids, floorplan_uuid, zone, start, end, limit, offset
+        )
+
+    async def async_close(self) -> None:
+        await self._hass.async_add_executor_job(self._close)
+
+    # -- acceso bloqueante (executor) ------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                connection.executescript(_SCHEMA)
+                if 0 < version < 2:
+                    connection.executemany(
+                        "UPDATE sessions SET started_ts = ? WHERE id = ?",
+                        [
+                            (_timestamp(row["session_start"]), row["id"])
+                            for row in connection.execute("SELECT id, session_start FROM sessions")
+                        ],
+                    )
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _record(self, robot_id: str, session: CleaningSession) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                values = (
+                    _timestamp(session.session_start),
+                    session.ended_at,
+                    session.floorplan_uuid,
+                    session.cleaning_type,
+                    session.ability,
+                    session.started_by,
+                    session.cleaned_area,
+                    session.elapsed_time,
+                    session.paused_time,
+                    session.charging_time,
+                    session.error_time,
+                    json.dumps(
+                        [{"code": code, "severity": severity} for code, severity in session.errors]
+                    )
+                    if session.errors
+                    else None,
+                )
+                row = connection.execute(
+                    "SELECT id FROM sessions WHERE robot_id = ? AND session_start = ?",
+                    (robot_id, session.session_start),
+                ).fetchone()
+                if row is None:
+                    session_id = connection.execute(
+                        "INSERT INTO sessions (robot_id, session_start, started_ts, ended_at, "
+                        "floorplan_uuid, cleaning_type, ability, started_by, cleaned_area, "
+                        "elapsed_time, paused_time, charging_time, error_time, errors) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (robot_id, session.session_start, *values),
+                    ).lastrowid
+                else:
+                    # Una sesión reenviada tras su fin sustituye a la guardada
+                    session_id = row["id"]
+                    connection.execute(
+                        "UPDATE sessions SET started_ts = ?, ended_at = ?, floorplan_uuid = ?, "
+                        "cleaning_type = ?, ability = ?, started_by = ?, cleaned_area = ?, "
+                        "elapsed_time = ?, paused_time = ?, charging_time = ?, error_time = ?, "
+                        "errors = ? WHERE id = ?",
+                        (*values, session_id),
+                    )
+                    connection.execute("DELETE FROM runs WHERE session_id = ?", (session_id,))
+
+                connection.executemany(
+                    "INSERT INTO runs (session_id, position, track_uuid, track_name, state, "
+                    "mode, navigation_mode, area, pickup_count, started_at, ended_at, paused, "
+                    "charging, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            session_id,
+                            position,
+                            run.track_uuid,
+                            run.track_name,
+                            run.state,
+                            run.settings.mode,
+                            run.settings.navigation_mode,
+                            run.stats.area or 0,
+                            run.stats.pickup_count or 0,
+                            run.timing.start or None,
+                            run.timing.end or None,
+                            run.timing.paused or 0,
+                            run.timing.charging or 0,
+                            run.timing.error or 0,
+                        )
+                        for position, run in enumerate(session.runs)
+                    ],
+                )
+
+    def _query(self, robot_ids, floorplan_uuid, zone, start, end, limit, offset) -> Dict[str, Any]:
+        conditions = []
+        params: List[Any] = []
+        if robot_ids:
+            conditions.append(f"robot_id IN ({', '.join('?' for _ in robot_ids)})")
+            params.extend(robot_ids)
+        if floorplan_uuid:
+            conditions.append("floorplan_uuid = ?")
+            params.append(floorplan_uuid)
+        if zone:
+            # La zona puede indicarse por UUID o por nombre
+            conditions.append(
+                "id IN (SELECT session_id FROM runs WHERE track_uuid = ? "
+                "UNION SELECT session_id FROM runs WHERE track_name = ?)"
+            )
+            params.extend((zone, zone))
+        if start is not None:
+            conditions.append("started_ts >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            conditions.append("started_ts < ?")
+            params.append(end.timestamp())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            connection = self._connect()
+            total = connection.execute(f"SELECT COUNT(*) FROM sessions{where}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT {_SESSION_COLUMNS} FROM sessions{where} "
+                "ORDER BY started_ts DESC, id DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+            runs_by_session: Dict[int, List[Dict[str, Any]]] = {row["id"]: [] for row in rows}
+            if runs_by_session:
+                placeholders = ", ".join("?" for _ in runs_by_session)
+                for run in connection.execute(
+                    "SELECT session_id, track_uuid, track_name, state, mode, navigation_mode, "
+                    "area, pickup_count, started_at, ended_at, paused, charging, error "
+                    f"FROM runs WHERE session_id IN ({placeholders}) "
+                    "ORDER BY session_id, position",
+                    list(runs_by_session),
+                ):
+                    run_data = dict(run)
+                    runs_by_session[run_data.pop("session_id")].append(run_data)
+
+        sessions = []
+        for row in rows:
+            session = dict(row)
+            session_id = session.pop("id")
+            session["errors"] = json.loads(session["errors"]) if session["errors"] else []
+            session["runs"] = runs_by_session[session_id]
+            sessions.append(session)
+
+        next_offset = offset + len(sessions)
+        return {
+            "sessions": sessions,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": next_offset if next_offset < total else None,
+        }
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """Convierte la marca ISO de inicio en epoch para indexar por fecha.
+
+    Las marcas sin zona horaria son UTC, igual que los límites de las consultas.
+    """
+
+    parsed = parse_time(value)
+    return parsed.timestamp() if parsed is not None else None
@@ -0,0 +1,293 @@
+"""Telemetría de limpieza a partir de los mensajes ``cleaning_state``.
+
+Companion reenvía la lista completa de ejecuciones (una por zona) en cada
+mensaje. El agregador guarda la última firma de cada ejecución y solo ajusta
+los totales con la diferencia de las que han cambiado, en lugar de recalcular
+todo en cada mensaje. Cuando una sesión termina se entrega una sola vez como
+``CleaningSession`` para guardarla en el histórico.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from ..api.model.robot_wss_cleaning_state_response import CleaningStateBody, Run
+from ..api.model.robot_wss_last_state_or_phx_reply_response import Error
+
+_LOGGER = logging.getLogger(__name__)
+
+_RUNNING_STATES = {"running", "cleaning", "in_progress"}
+
+# Una ejecución se identifica por su zona y su posición: la misma zona puede limpiarse
+# varias veces en una sesión y cada pasada tiene su propia área
+RunKey = Tuple[Optional[str], int]
+
+
+@dataclass(frozen=True, slots=True)
+class CleaningTelemetry:
+    """Resumen publicado de la limpieza en curso (o de la última)."""
+
+    cleaned_area: float
+    elapsed_time: int
+    paused_time: int
+    charging_time: int
+    current_zone: Optional[str]
+    run_count: int
+    active: bool
+    started_at: Optional[str]
+
+    @property
+    def transition_key(self) -> Tuple:
+        """Campos cuyo cambio se publica sin esperar al límite de frecuencia."""
+        return (self.current_zone, self.run_count, self.active)
+
+
+@dataclass(frozen=True, slots=True)
+class CleaningSession:
+    """Sesión de limpieza terminada, tal y como se guarda en el histórico."""
+
+    session_start: str
+    ended_at: Optional[str]
+    floorplan_uuid: Optional[str]
+    cleaning_type: Optional[str]
+    ability: Optional[str]
+    started_by: Optional[str]
+    cleaned_area: float
+    elapsed_time: int
+    paused_time: int
+    charging_time: int
+    error_time: int
+    errors: Tuple[Tuple[str, Optional[str]], ...]
+    runs: Tuple[Run, ...]
+
+
+@dataclass(slots=True)
+class _RunState:
+    signature: Tuple
+    area: float
+    paused: int
+    charging: int
+    running: bool
+    track_name: Optional[str]
+
+
+class CleaningTelemetryTracker:
+    """Agregador incremental de las ejecuciones de una sesión de limpieza."""
+
+    __slots__ = (
+        "_session",
+        "_started",
+        "_ended",
+        "_session_paused",
+        "_session_charging",
+        "_runs",
+        "_area",
+        "_paused",
+        "_charging",
+        "_current_key",
+        "_last_body",
+        "_errors",
+        "_completed",
+    )
+
+    def __init__(self) -> None:
+        self._completed: Optional[CleaningSession] = None
+        self._reset(None)
+
+    def _reset(self, session: Optional[str]) -> None:
+        self._session = session
+        self._started: Optional[datetime] = parse_time(session)
+        self._ended: Optional[datetime] = None
+        self._session_paused = 0
+        self._session_charging = 0
+        self._runs: Dict[RunKey, _RunState] = {}
+        self._area = 0.0
+        self._paused = 0
+        self._charging = 0
+        self._current_key: Optional[RunKey] = None
+        self._last_body: Optional[CleaningStateBody] = None
+        self._errors: Dict[str, Optional[str]] = {}
+
+    def update(self, body: CleaningStateBody) -> bool:
+        """Incorpora un mensaje y devuelve si ha cambiado algún dato de la sesión."""
+
+        timing = body.timing
+        session = timing.start or None
+        changed = False
+        if session != self._session:
+            # Nueva sesión de limpieza: la anterior se da por terminada si no llegó su fin
+            if self._ended is None and self._runs:
+                self._completed = self._build_session()
+            self._reset(session)
+            changed = True
+
+        self._last_body = body
+        ended = parse_time(timing.end)
+        finished = ended is not None and self._ended is None
+        if (ended, timing.paused or 0, timing.charging or 0) != (
+            self._ended,
+            self._session_paused,
+            self._session_charging,
+        ):
+            self._ended = ended
+            self._session_paused = timing.paused or 0
+            self._session_charging = timing.charging or 0
+            changed = True
+
+        runs = body.runs or ()
+        for index, run in enumerate(runs):
+            key = (run.track_uuid, index)
+            signature = _run_signature(run)
+            previous = self._runs.get(key)
+            if previous is not None and previous.signature == signature:
+                continue
+            self._apply_run(key, run, signature, previous)
+            changed = True
+
+        if len(self._runs) != len(runs):
+            # Solo si Companion ha retirado ejecuciones de la lista se buscan las sobrantes
+            present = {(run.track_uuid, index) for index, run in enumerate(runs)}
+            for key in [key for key in self._runs if key not in present]:
+                self._remove_run(key)
+            changed = True
+
+        if finished and self._session is not None:
+            self._completed = self._build_session()
+
+        return changed
+
+    def note_errors(self, errors: Optional[list[Error]]) -> None:
+        """Anota los errores del robot recibidos durante la sesión en curso."""
+
+        if not errors or self._session is None or self._ended is not None:
+            return
+        for error in errors:
+            self._errors.setdefault(error.code, error.severity)
+
+    def pop_completed(self) -> Optional[CleaningSession]:
+        """Devuelve (una sola vez) la última sesión terminada, si la hay."""
+
+        completed, self._completed = self._completed, None
+        return completed
+
+    def _build_session(self) -> CleaningSession:
+        """Congela la sesión actual a partir del último mensaje recibido."""
+
+        body = self._last_body
+        telemetry = self.snapshot()
+        return CleaningSession(
+            session_start=self._session,
+            ended_at=body.timing.end or None,
+            floorplan_uuid=body.floorplan_uuid,
+            cleaning_type=body.cleaning_type or None,
+            ability=body.ability or None,
+            started_by=body.started_by or None,
+            cleaned_area=telemetry.cleaned_area,
+            elapsed_time=telemetry.elapsed_time,
+            paused_time=telemetry.paused_time,
+            charging_time=telemetry.charging_time,
+            error_time=body.timing.error or 0,
+            errors=tuple(self._errors.items()),
+            runs=tuple(body.runs or ()),
+        )
+
+    def _remove_run(self, key) -> None:
+        """Descuenta de los totales una ejecución que ya no aparece en el mensaje."""
+
+        run = self._runs.pop(key)
+        self._area -= run.area
+        self._paused -= run.paused
+        self._charging -= run.charging
+        if self._current_key == key:
+            self._current_key = None
+
+    def _apply_run(self, key, run: Run, signature: Tuple, previous: Optional[_RunState]) -> None:
+        """Actualiza los totales con la diferencia de una ejecución modificada."""
+
+        area = float(run.stats.area or 0)
+        paused = run.timing.paused or 0
+        charging = run.timing.charging or 0
+        running = run.state in _RUNNING_STATES
+
+        if previous is None:
+            self._area += area
+            self._paused += paused
+            self._charging += charging
+        else:
+            self._area += area - previous.area
+            self._paused += paused - previous.paused
+            self._charging += charging - previous.charging
+
+        self._runs[key] = _RunState(
+            signature=signature,
+            area=area,
+            paused=paused,
+            charging=charging,
+            running=running,
+            track_name=run.track_name,
+        )
+
+        if running:
+            self._current_key = key
+        elif self._current_key == key:
+            self._current_key = None
+
+    def snapshot(self, now: Optional[float] = None) -> CleaningTelemetry:
+        """Construye el resumen publicable; el tiempo transcurrido se calcula al vuelo."""
+
+        active = self._session is not None and self._ended is None
+        elapsed = 0
+        if self._started is not None:
+            if self._ended is not None:
+                elapsed = (self._ended - self._started).total_seconds()
+            else:
+                elapsed = (now if now is not None else time.time()) - self._started.timestamp()
+
+        current = self._runs.get(self._current_key) if active else None
+        return CleaningTelemetry(
+            cleaned_area=round(self._area, 2),
+            elapsed_time=max(0, int(elapsed)),
+            # Companion informa los tiempos por sesión y por ejecución según la versión
+            paused_time=max(self._session_paused, self._paused),
+            charging_time=max(self._session_charging, self._charging),
+            current_zone=current.track_name if current is not None else None,
+            run_count=len(self._runs),
+            active=active,
+            started_at=self._session,
+        )
+
+
+def _run_signature(run: Run) -> Tuple:
+    stats = run.stats
+    timing = run.timing
+    return (
+        run.state,
+        stats.area,
+        stats.pickup_count,
+        timing.paused,
+        timing.charging,
+        timing.error,
+        timing.end,
+        run.track_name,
+    )
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Interpreta las marcas ISO 8601 de Companion (con o sin sufijo Z) siempre en UTC.
+
+    Las marcas sin zona horaria se consideran UTC para poder restarlas con las que sí
+    la traen.
+    """
+
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        _LOGGER.debug("Marca de tiempo no reconocida: %s", value)
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
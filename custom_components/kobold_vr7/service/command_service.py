@@ -0,0 +1,160 @@
+"""Envío de comandos a los robots por WebSocket o por REST.
+
+Con el transporte ``websocket`` cada habilidad se envía por el canal
+``robots:{id}`` ya unido y se espera su ``phx_reply``; si el canal no está
+disponible, el servidor la rechaza o no responde a tiempo, el comando se
+repite por la API REST de Orbital. La latencia de cada transporte se mide por
+separado para poder compararlos. Tras cada comando aceptado se descartan las
+respuestas REST cacheadas del robot que el comando puede haber cambiado.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+from ..api.websocket_client import KoboldWebSocketError
+from ..const import COMMAND_TRANSPORT_REST, COMMAND_TRANSPORT_WEBSOCKET
+from .robot_service import RobotsService, build_cleaning_request
+
+_LOGGER = logging.getLogger(__name__)
+
+# Muestras de latencia que se guardan por transporte para los percentiles
+_LATENCY_SAMPLES = 200
+
+
+@dataclass(slots=True)
+class _TransportStats:
+    sent: int = 0
+    failed: int = 0
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_SAMPLES))
+
+    def record(self, elapsed_ms: float) -> None:
+        self.sent += 1
+        self.samples.append(elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"sent": self.sent, "failed": self.failed}
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "last_ms": round(self.samples[-1], 1),
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+
+
+class CommandService:
+    """Envía las órdenes de la aspiradora por el transporte configurado."""
+
+    def __init__(
+        self,
+        robots_service: RobotsService,
+        websocket_service,
+        transport: str = COMMAND_TRANSPORT_REST,
+    ) -> None:
+        self._robots_service = robots_service
+        self._websocket_service = websocket_service
+        self._transport = transport
+        self._stats = {
+            COMMAND_TRANSPORT_REST: _TransportStats(),
+            COMMAND_TRANSPORT_WEBSOCKET: _TransportStats(),
+        }
+        self._fallbacks = 0
+
+    @property
+    def transport(self) -> str:
+        return self._transport
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Latencias por transporte y número de comandos repetidos por REST."""
+
+        return {
+            "transport": self._transport,
+            "fallbacks": self._fallbacks,
+            **{name: stats.as_dict() for name, stats in self._stats.items()},
+        }
+
+    async def start_cleaning(self, token, robot, fan_speed, map_with_zone):
+        return await self._send(
+            robot,
+            build_cleaning_request(robot.id, fan_speed, map_with_zone),
+            lambda: self._robots_service.start_cleaning(
+                token, robot.id, fan_speed, map_with_zone
+            ),
+        )
+
+    async def pause_cleaning(self, token, robot):
+        return await self._send(
+            robot,
+            {"ability": "cleaning.pause"},
+            lambda: self._robots_service.pause_cleaning(token, robot.serial),
+        )
+
+    async def resume_cleaning(self, token, robot):
+        return await self._send(
+            robot,
+            {"ability": "cleaning.resume"},
+            lambda: self._robots_service.resume_cleaning(token, robot.serial),
+        )
+
+    async def send_to_base(self, token, robot):
+        return await self._send(
+            robot,
+            {"ability": "navigation.return_to_base"},
+            lambda: self._robots_service.send_to_base(token, robot.serial),
+        )
+
+    async def find_me(self, token, robot):
+        return await self._send(
+            robot,
+            {"ability": "utilities.find_me"},
+            lambda: self._robots_service.find_me(token, robot.serial),
+        )
+
+    async def _send(
+        self,
+        robot,
+        command: Dict[str, Any],
+        rest_call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        ability = command["ability"]
+        client = self._websocket_service.client
+        if self._transport == COMMAND_TRANSPORT_WEBSOCKET and client.is_joined(robot.id):
+            stats = self._stats[COMMAND_TRANSPORT_WEBSOCKET]
+            started = time.perf_counter()
+            try:
+                response = await client.send_command(robot.id, command)
+            except KoboldWebSocketError as error:
+                stats.failed += 1
+                self._fallbacks += 1
+                _LOGGER.warning(
+                    "No se pudo enviar %s por WebSocket a %s, se usa REST: %s",
+                    ability,
+                    robot.id,
+                    error,
+                )
+            else:
+                elapsed = (time.perf_counter() - started) * 1000
+                stats.record(elapsed)
+                _LOGGER.debug("%s enviado por WebSocket en %.0f ms", ability, elapsed)
+                self._robots_service.invalidate_robot(robot.id)
+                return response
+
+        stats = self._stats[COMMAND_TRANSPORT_REST]
+        started = time.perf_counter()
+        try:
+            response = await rest_call()
+        except Exception:
+            stats.failed += 1
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        stats.record(elapsed)
+        _LOGGER.debug("%s enviado por REST en %.0f ms", ability, elapsed)
+        self._robots_service.invalidate_robot(robot.id)
+        return response
@@ -0,0 +1,103 @@
+"""Grabación de los últimos frames del WebSocket para reproducir fallos de estado.
+
+Cada robot tiene un búfer circular de tamaño fijo con los frames crudos que
+ha recibido y su instante en reloj monotónico; los frames que no se pueden
+asociar a ningún robot (heartbeats, ``service_status``, JSON inválido) van a
+un búfer propio de la conexión. Como solo hay un búfer por robot registrado
+más el de la conexión, la memoria no crece con el tiempo de funcionamiento.
+
+Los volcados son ficheros JSON Lines comprimidos con gzip: una cabecera y
+después una línea ``[segundos desde el primer frame, robot_id, frame]`` por
+frame, en orden de llegada. ``benchmarks/frame_replayer.py`` los reproduce.
+"""
+
+import gzip
+import heapq
+import json
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+DUMP_FORMAT = "kobold_vr7_frames"
+DUMP_VERSION = 1
+
+# (instante monotónico, robot_id o None, frame crudo)
+RecordedFrame = Tuple[float, Optional[str], str]
+
+
+class FrameRecorder:
+    """Últimos ``max_frames`` frames crudos recibidos por cada robot."""
+
+    def __init__(self, max_frames: int) -> None:
+        self._max_frames = max_frames
+        self._buffers: Dict[Optional[str], Deque[Tuple[float, str]]] = {}
+
+    @property
+    def max_frames(self) -> int:
+        return self._max_frames
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {robot_id or "connection": len(buffer) for robot_id, buffer in self._buffers.items()}
+
+    def record(self, robot_id: Optional[str], frame: str) -> None:
+        buffer = self._buffers.get(robot_id)
+        if buffer is None:
+            buffer = self._buffers[robot_id] = deque(maxlen=self._max_frames)
+        buffer.append((time.monotonic(), frame))
+
+    def discard(self, robot_id: str) -> None:
+        """Olvida los frames de un robot que ya no está registrado."""
+        self._buffers.pop(robot_id, None)
+
+    def frames(self) -> List[RecordedFrame]:
+        """Copia de todos los frames grabados, en orden de llegada."""
+        return list(
+            heapq.merge(
+                *(
+                    [(at, robot_id, frame) for at, frame in buffer]
+                    for robot_id, buffer in self._buffers.items()
+                )
+            )
+        )
+
+
+def dump_records(frames: List[RecordedFrame]) -> List[List[Any]]:
+    """Convierte los frames a ``[segundos desde el primero, robot_id, frame]``."""
+
+    if not frames:
+        return []
+    start = frames[0][0]
+    return [[round(at - start, 3), robot_id, frame] for at, robot_id, frame in frames]
+
+
+def write_dump(path: str, frames: List[RecordedFrame], robots: Iterable[Dict[str, Any]]) -> int:
+    """Escribe el volcado comprimido (bloqueante: usar en el executor) y devuelve los frames."""
+
+    header = {
+        "format": DUMP_FORMAT,
+        "version": DUMP_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "robots": list(robots),
+    }
+    records = dump_records(frames)
+    with gzip.open(path, "wt", encoding="utf-8") as dump:
+        dump.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for record in records:
+            dump.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return len(records)
+
+
+def read_dump(path: str) -> Tuple[Dict[str, Any], List[List[Any]]]:
+    """Lee un volcado (o un corpus de frames crudos, uno por línea, sin tiempos)."""
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as dump:
+        lines = [line.rstrip("\n") for line in dump if line.strip()]
+    if lines:
+        header = json.loads(lines[0])
+        if isinstance(header, dict) and header.get("format") == DUMP_FORMAT:
+            return header, [json.loads(line) for line in lines[1:]]
+    # Corpus sin cabecera: todos los frames sin robot asignado y sin separación temporal
+    return {"format": None, "robots": []}, [[0.0, None, line] for line in lines]
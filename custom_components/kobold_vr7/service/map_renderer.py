@@ -0,0 +1,223 @@
+"""Renderizado de los floorplans de Orbital a PNG.
+
+Los binarios ``processed_real_binary`` y ``processed_rank_binary`` se decodifican
+a rásteres de Pillow (memoria contigua, sin bucles por píxel en Python) y se
+colorean con una tabla de consulta a partir de ``MapColors``. Encima se dibujan
+las zonas de ``CleaningTracksResponse.shapes`` y las posiciones del robot y de
+la base.
+"""
+
+import io
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image, ImageColor, ImageDraw
+
+from ..api.model.robot_map_response import MapBlob, RobotMapResponse
+from .model.map_with_zones import MapWithZones
+
+_LOGGER = logging.getLogger(__name__)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Umbrales de gris del ráster real: oscuro = pared, claro = suelo, resto = incierto
+_WALL_MAX_VALUE = 64
+_FLOOR_MIN_VALUE = 192
+
+# Índices de la paleta del ráster coloreado
+_INDEX_UNKNOWN = 0
+_INDEX_UNCERTAIN = 1
+_INDEX_FLOOR = 2
+_INDEX_WALL = 3
+_INDEX_COVERAGE = 4
+
+_DEFAULT_COLORS = {
+    "uncertain": (200, 200, 200),
+    "floor": (245, 245, 245),
+    "walls": (60, 60, 60),
+    "coverage": (120, 180, 240),
+    "tof": (255, 160, 0),
+}
+_ZONE_COLOR = (40, 120, 200)
+_ROBOT_COLOR = (220, 40, 40)
+_BASE_COLOR = (40, 160, 60)
+
+# Tamaño máximo del lado mayor de la imagen final
+_MAX_OUTPUT_SIZE = 1024
+
+# Tabla de consulta gris -> índice de paleta, calculada una sola vez
+_CLASS_LUT = [
+    _INDEX_UNKNOWN
+    if value == 0
+    else _INDEX_WALL
+    if value <= _WALL_MAX_VALUE
+    else _INDEX_FLOOR
+    if value >= _FLOOR_MIN_VALUE
+    else _INDEX_UNCERTAIN
+    for value in range(256)
+]
+
+
+def map_version(map_with_zones: MapWithZones) -> Tuple:
+    """Clave que identifica una versión concreta de un floorplan y sus zonas."""
+
+    robot_map = map_with_zones.map
+    zones = map_with_zones.zones or []
+    return (
+        robot_map.floorplan_uuid,
+        robot_map.updated_at,
+        robot_map.last_modified_at,
+        robot_map.map_versions_count,
+        tuple((zone.track_uuid, zone.updated_at) for zone in zones),
+    )
+
+
+class MapRenderer:
+    """Renderiza mapas en el executor y guarda el PNG por versión del floorplan."""
+
+    def __init__(self, max_entries: int = 4) -> None:
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._max_entries = max_entries
+
+    async def async_render(self, hass, map_with_zones: MapWithZones) -> Optional[bytes]:
+        """Devuelve el PNG del mapa, renderizándolo solo si la versión es nueva."""
+
+        key = map_version(map_with_zones)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        try:
+            png = await hass.async_add_executor_job(render_map_png, map_with_zones)
+        except Exception as error:
+            _LOGGER.warning(
+                "No se pudo renderizar el mapa %s: %s",
+                map_with_zones.map.floorplan_uuid,
+                error,
+            )
+            return None
+
+        self._cache[key] = png
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+        return png
+
+
+def render_map_png(map_with_zones: MapWithZones) -> bytes:
+    """Dibuja el mapa completo y devuelve los bytes PNG (bloqueante, usar en executor)."""
+
+    robot_map = map_with_zones.map
+    if robot_map.processed_real_binary is None:
+        raise ValueError("El floorplan no incluye ráster real")
+
+    real = _decode_raster(robot_map.processed_real_binary, robot_map)
+    indexed = real.point(_CLASS_LUT)
+
+    if robot_map.processed_rank_binary is not None:
+        try:
+            rank = _decode_raster(robot_map.processed_rank_binary, robot_map)
+            if rank.size == indexed.size:
+                # Las celdas con rango > 0 se pintan como cobertura sobre el suelo
+                coverage_mask = rank.point(lambda value: 255 if value else 0)
+                indexed.paste(_INDEX_COVERAGE, mask=coverage_mask)
+        except ValueError as error:
+            _LOGGER.debug("Ráster de rango no utilizable: %s", error)
+
+    indexed.putpalette(_build_palette(robot_map))
+    image = indexed.convert("RGBA")
+    # Las celdas desconocidas quedan transparentes
+    image.putalpha(real.point(lambda value: 0 if value == 0 else 255))
+
+    draw = ImageDraw.Draw(image)
+    for zone in map_with_zones.zones or []:
+        for shape in zone.shapes or []:
+            points = [tuple(point[:2]) for point in shape.coordinates or []]
+            if len(points) >= 2:
+                draw.line(points + [points[0]], fill=_ZONE_COLOR, width=2)
+
+    if robot_map.robot is not None:
+        _draw_marker(draw, robot_map.robot.base, _BASE_COLOR, square=True)
+        _draw_marker(draw, robot_map.robot.pos, _ROBOT_COLOR, square=False)
+
+    image = _apply_crop(image, robot_map)
+
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+def _decode_raster(blob: MapBlob, robot_map: RobotMapResponse) -> Image.Image:
+    """Convierte un binario del floorplan en un ráster de 8 bits."""
+
+    view = blob.view()
+    if view[:8].tobytes() == _PNG_SIGNATURE:
+        with Image.open(io.BytesIO(view)) as image:
+            return image.convert("L")
+
+    # Ráster sin cabecera: un byte por celda con las dimensiones originales
+    dimensions = robot_map.original
+    if dimensions and dimensions.width * dimensions.height == len(view):
+        return Image.frombuffer(
+            "L", (dimensions.width, dimensions.height), view, "raw", "L", 0, 1
+        ).copy()
+
+    raise ValueError(f"Formato de ráster desconocido ({len(view)} bytes)")
+
+
+def _build_palette(robot_map: RobotMapResponse) -> list:
+    """Construye la paleta a partir de los colores del floorplan."""
+
+    colors = robot_map.map_colors
+    palette = [0, 0, 0]
+    for name in ("uncertain", "floor", "walls", "coverage"):
+        palette.extend(_parse_color(getattr(colors, name, None) if colors else None, name))
+    return palette
+
+
+def _parse_color(value: Optional[str], name: str) -> Tuple[int, int, int]:
+    """Interpreta un color de ``MapColors`` con valor por defecto si no es válido."""
+
+    if value:
+        candidate = value if value.startswith(("#", "rgb", "hsl")) else f"#{value}"
+        try:
+            return ImageColor.getrgb(candidate)[:3]
+        except ValueError:
+            pass
+    return _DEFAULT_COLORS[name]
+
+
+def _draw_marker(draw: ImageDraw.ImageDraw, position, color, square: bool) -> None:
+    """Dibuja la posición del robot o de la base."""
+
+    if position is None:
+        return
+    radius = 5
+    box = (position.x - radius, position.y - radius, position.x + radius, position.y + radius)
+    if square:
+        draw.rectangle(box, fill=color)
+    else:
+        draw.ellipse(box, fill=color)
+
+
+def _apply_crop(image: Image.Image, robot_map: RobotMapResponse) -> Image.Image:
+    """Recorta con ``real_crop`` y escala el resultado sin superar el tamaño máximo."""
+
+    crop = robot_map.real_crop
+    if crop is not None:
+        width, height = image.size
+        if crop.right > crop.left and crop.bottom > crop.top:
+            box = (crop.left, crop.top, crop.right, crop.bottom)
+        else:
+            # Los valores se interpretan como márgenes desde cada borde
+            box = (crop.left, crop.top, width - crop.right, height - crop.bottom)
+        if 0 <= box[0] < box[2] <= width and 0 <= box[1] < box[3] <= height:
+            image = image.crop(box)
+
+    scale = crop.scale if crop is not None and crop.scale else 1.0
+    scale = min(scale, _MAX_OUTPUT_SIZE / max(image.size))
+    if abs(scale - 1.0) > 0.01:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.Resampling.NEAREST)
+    return image
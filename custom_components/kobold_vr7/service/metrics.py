@@ -0,0 +1,163 @@
+"""Métricas internas de la integración para diagnosticar su comportamiento bajo carga.
+
+Cada registro es O(1): incrementa contadores ya existentes y, para la latencia
+REST, un cubo de un histograma de límites fijos. No se guardan muestras ni se
+construyen cadenas o diccionarios al registrar; el resumen legible solo se
+calcula al pedir ``snapshot()`` (diagnósticos y sensores).
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Union
+
+# Límites superiores (ms) de los cubos del histograma de latencia REST
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Máximo de claves distintas por tabla; el resto se agrupa en "other" para que
+# un servidor que envíe eventos inesperados no haga crecer la memoria
+_MAX_KEYS = 64
+_OTHER = "other"
+
+Status = Union[int, str]
+
+
+class _EndpointMetrics:
+    """Peticiones, errores, códigos de estado e histograma de latencia de un endpoint."""
+
+    __slots__ = ("requests", "errors", "total_ms", "max_ms", "buckets", "statuses")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Un cubo por límite más el de desbordamiento
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.statuses: Dict[Status, int] = {}
+
+    def record(self, elapsed_ms: float, status: Status, error: bool) -> None:
+        self.requests += 1
+        if error:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        _increment(self.statuses, status)
+
+    def percentile(self, percent: float) -> float:
+        """Estimación del percentil: el límite superior del cubo que lo contiene."""
+        if not self.requests:
+            return 0.0
+        threshold = self.requests * percent / 100
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold and index < len(LATENCY_BUCKETS_MS):
+                return float(LATENCY_BUCKETS_MS[index])
+            if seen >= threshold:
+                break
+        return round(self.max_ms, 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_ms": round(self.total_ms / self.requests, 1) if self.requests else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 1),
+            "latency_histogram_ms": dict(zip(labels, self.buckets)),
+            "status_codes": {str(status): count for status, count in self.statuses.items()},
+        }
+
+
+def _increment(table: Dict[Any, int], key: Any) -> None:
+    if key in table:
+        table[key] += 1
+    elif len(table) < _MAX_KEYS:
+        table[key] = 1
+    else:
+        table[_OTHER] = table.get(_OTHER, 0) + 1
+
+
+class MetricsRegistry:
+    """Contadores de REST, WebSocket, logins y escrituras de estado de una cuenta."""
+
+    def __init__(self) -> None:
+        self._started = time.monotonic()
+        self._endpoints: Dict[str, _EndpointMetrics] = {}
+        self._ws_messages: Dict[str, int] = {}
+        self._reconnects: Dict[str, int] = {}
+        self._parse_failures: Dict[str, int] = {}
+        # Totales mantenidos al registrar para que los sensores los lean sin recorrer tablas
+        self.rest_requests = 0
+        self.rest_errors = 0
+        self.ws_messages = 0
+        self.reconnects = 0
+        self.parse_failures = 0
+        self.logins = 0
+        self.login_failures = 0
+        self.state_writes = 0
+        self.state_writes_skipped = 0
+
+    def record_request(self, endpoint: str, elapsed_ms: float, status: Status) -> None:
+        """Registra un intento HTTP; ``status`` es el código o la causa del fallo de red."""
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = _EndpointMetrics()
+        error = not (isinstance(status, int) and 200 <= status < 300)
+        metrics.record(elapsed_ms, status, error)
+        self.rest_requests += 1
+        if error:
+            self.rest_errors += 1
+
+    def record_ws_message(self, event: str) -> None:
+        _increment(self._ws_messages, event)
+        self.ws_messages += 1
+
+    def record_reconnect(self, cause: str) -> None:
+        _increment(self._reconnects, cause)
+        self.reconnects += 1
+
+    def record_parse_failure(self, source: str) -> None:
+        _increment(self._parse_failures, source)
+        self.parse_failures += 1
+
+    def record_login(self, ok: bool) -> None:
+        self.logins += 1
+        if not ok:
+            self.login_failures += 1
+
+    def record_state_write(self, emitted: bool) -> None:
+        if emitted:
+            self.state_writes += 1
+        else:
+            self.state_writes_skipped += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Resumen completo para los diagnósticos."""
+        return {
+            "uptime_s": round(time.monotonic() - self._started),
+            "rest": {
+                "requests": self.rest_requests,
+                "errors": self.rest_errors,
+                "endpoints": {
+                    endpoint: metrics.as_dict() for endpoint, metrics in self._endpoints.items()
+                },
+            },
+            "websocket": {
+                "messages": self.ws_messages,
+                "messages_by_event": dict(self._ws_messages),
+                "reconnects": self.reconnects,
+                "reconnects_by_cause": dict(self._reconnects),
+                "parse_failures": self.parse_failures,
+                "parse_failures_by_source": dict(self._parse_failures),
+            },
+            "logins": {"total": self.logins, "failed": self.login_failures},
+            "state_writes": {
+                "emitted": self.state_writes,
+                "skipped": self.state_writes_skipped,
+            },
+        }
@@ -1,25 +1,164 @@
+import asyncio
 import logging
+import time
+from typing import Callable, Optional
 
 from ..api.profile_api_client import ProfileApiClient, ProfileApiClientError
+from ..const import PROFILE_BEARER_DEFAULT_TTL, PROFILE_BEARER_REFRESH_MARGIN
+from .metrics import MetricsRegistry
+from .token_utils import decode_jwt_expiry
 
 
 class ProfileServiceError(Exception):
     """Error personalizado para el servicio de perfil."""
 
+    def __init__(self, message: str, auth_failed: bool = False) -> None:
+        super().__init__(message)
+        # Companion ha rechazado el id_token: hay que renovarlo antes de reintentar
+        self.auth_failed = auth_failed
+
 
 class ProfileService:
-    """Servicio de alto nivel para gestionar la autenticación con Companion."""
+    """Servicio de alto nivel para gestionar la autenticación con Companion.
+
+    Mantiene en caché el bearer devuelto por Companion hasta su expiración,
+    lo renueva en segundo plano antes de que caduque y comparte un único
+    login en curso entre todas las llamadas concurrentes.
+    """
 
-    def __init__(self, profile_api_client: ProfileApiClient) -> None:
+    def __init__(
+        self,
+        profile_api_client: ProfileApiClient,
+        default_ttl: int = PROFILE_BEARER_DEFAULT_TTL,
+        refresh_margin: int = PROFILE_BEARER_REFRESH_MARGIN,
+        metrics: Optional[MetricsRegistry] = None,
+        id_token_provider: Optional[Callable[[], str]] = None,
+    ) -> None:
         self._client = profile_api_client
+        # Devuelve el id_token vigente al renovar en segundo plano: el del último login
+        # puede haber sido sustituido por el gestor de tokens mientras tanto
+        self._id_token_provider = id_token_provider
+        self._metrics = metrics
         self._logger = logging.getLogger(__name__)
+        self._default_ttl = default_ttl
+        self._refresh_margin = refresh_margin
+        self._bearer: Optional[str] = None
+        self._bearer_id_token: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._login_task: Optional[asyncio.Task] = None
+        self._login_task_id_token: Optional[str] = None
+        self._refresh_handle: Optional[asyncio.TimerHandle] = None
 
-    async def login(self, id_token: str) -> str:
+    async def login(self, id_token: str, force_refresh: bool = False) -> str:
         """Obtiene el bearer necesario para conectar con el WebSocket."""
 
+        if not force_refresh and self._has_valid_bearer(id_token):
+            self._logger.debug("Reutilizando bearer en caché para el WebSocket")
+            return self._bearer
+
+        if force_refresh:
+            self.invalidate()
+
+        return await self._login_single_flight(id_token)
+
+    def invalidate(self) -> None:
+        """Descarta el bearer en caché, p. ej. si Companion lo ha rechazado."""
+
+        self._bearer = None
+        self._bearer_id_token = None
+        self._expires_at = None
+        self._cancel_refresh()
+
+    def close(self) -> None:
+        """Cancela las renovaciones pendientes al descargar la integración."""
+
+        self.invalidate()
+        if self._login_task and not self._login_task.done():
+            self._login_task.cancel()
+        self._login_task = None
+
+    def _has_valid_bearer(self, id_token: str) -> bool:
+        """Indica si el bearer en caché sigue siendo utilizable."""
+
+        if not self._bearer or self._bearer_id_token != id_token:
+            return False
+        return self._expires_at is None or time.time() < self._expires_at
+
+    async def _login_single_flight(self, id_token: str) -> str:
+        """Comparte un único login en curso entre las llamadas concurrentes."""
+
+        task = self._login_task
+        if task is None or task.done() or self._login_task_id_token != id_token:
+            task = asyncio.get_running_loop().create_task(self._do_login(id_token))
+            # Evita avisos de excepción no recuperada si todos los llamantes se cancelan
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._login_task = task
+            self._login_task_id_token = id_token
+
+        # shield: cancelar a un llamante no debe cancelar el login compartido
+        return await asyncio.shield(task)
+
+    async def _do_login(self, id_token: str) -> str:
+        """Realiza el login contra Companion y guarda el bearer en caché."""
+
         try:
             self._logger.debug("Solicitando bearer para el WebSocket")
-            return await self._client.login(id_token)
+            bearer = await self._client.login(id_token)
         except ProfileApiClientError as error:
+            if self._metrics is not None:
+                self._metrics.record_login(False)
             self._logger.error("Error en ProfileService al solicitar bearer: %s", error)
-            raise ProfileServiceError("No se pudo obtener el bearer para el WebSocket") from error
+            raise ProfileServiceError(
+                "No se pudo obtener el bearer para el WebSocket",
+                auth_failed=error.status in (401, 403),
+            ) from error
+
+        if self._metrics is not None:
+            self._metrics.record_login(True)
+        now = time.time()
+        expires_at = decode_jwt_expiry(bearer)
+        if expires_at is None or expires_at <= now:
+            expires_at = now + self._default_ttl
+
+        self._bearer = bearer
+        self._bearer_id_token = id_token
+        self._expires_at = expires_at
+        self._schedule_refresh(expires_at - now - self._refresh_margin)
+        self._logger.debug(
+            "Bearer de Companion válido durante %.0f segundos", expires_at - now
+        )
+        return bearer
+
+    def _schedule_refresh(self, delay: float) -> None:
+        """Programa la renovación anticipada del bearer."""
+
+        self._cancel_refresh()
+        if delay <= 0:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._refresh_handle = loop.call_later(
+            delay, lambda: loop.create_task(self._background_refresh())
+        )
+
+    def _cancel_refresh(self) -> None:
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+    async def _background_refresh(self) -> None:
+        """Renueva el bearer en segundo plano antes de que caduque."""
+
+        self._refresh_handle = None
+        # El id_token se lee al disparar el temporizador, no al programarlo
+        if self._id_token_provider is not None:
+            id_token = self._id_token_provider()
+        else:
+            id_token = self._bearer_id_token
+        if not id_token:
+            return
+        try:
+            await self._login_single_flight(id_token)
+        except ProfileServiceError as error:
+            # El bearer actual sigue siendo válido hasta su expiración
+            self._logger.warning("No se pudo renovar el bearer de Companion: %s", error)
@@ -0,0 +1,248 @@
+"""Perfilado bajo demanda de la integración para investigar consumos de CPU y memoria.
+
+Nada de este módulo se ejecuta salvo mientras dura una llamada al servicio
+``kobold_vr7.profile``: no hay ganchos ni contadores permanentes. Durante la
+ventana de perfilado se combinan tres fuentes:
+
+- Un hilo que muestrea periódicamente la pila del hilo del bucle de eventos
+  con ``sys._current_frames()`` y cuenta solo los frames de esta integración.
+  Es un perfilado estadístico: el coste no depende de cuántos mensajes lleguen.
+- ``tracemalloc`` filtrado al directorio de la integración, comparando una
+  instantánea al principio y otra al final.
+- Una tarea que duerme intervalos cortos y mide cuánto se retrasa el bucle en
+  despertarla (lag del bucle de eventos).
+
+El informe se escribe como texto en el directorio de configuración.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+# Directorio del paquete de la integración; solo se cuentan frames de aquí dentro
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Los frames y asignaciones del propio perfilador no forman parte del informe
+_PROFILER_FILE = os.path.abspath(__file__)
+
+# Funciones por las que pasa cada mensaje o petición; se destacan en el informe
+HOT_PATHS = ("_listen", "_handle_message", "update_robot_state", "_send")
+
+# Intervalo con el que se mide el lag del bucle de eventos, en segundos
+_LAG_PROBE_INTERVAL = 0.1
+
+# Profundidad de pila guardada por tracemalloc si lo arranca el perfilador
+_TRACEMALLOC_FRAMES = 5
+
+_TOP = 25
+
+FunctionKey = Tuple[str, int, str]
+
+
+class ProfilerBusyError(Exception):
+    """Ya hay un perfilado en curso."""
+
+
+class _StackSampler(threading.Thread):
+    """Hilo que cuenta los frames de la integración presentes en la pila del bucle."""
+
+    def __init__(self, target_thread_id: int, interval: float) -> None:
+        super().__init__(name="kobold_vr7_profiler", daemon=True)
+        self._target = target_thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.samples = 0
+        # Muestras en las que la integración estaba en la pila
+        self.active_samples = 0
+        # Frame más interno de la integración (tiempo propio) y cualquiera de la pila (acumulado)
+        self.own: Counter = Counter()
+        self.cumulative: Counter = Counter()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._target)
+            self.samples += 1
+            innermost: Optional[FunctionKey] = None
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                if (
+                    code.co_filename.startswith(_PACKAGE_DIR)
+                    and code.co_filename != _PROFILER_FILE
+                ):
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if innermost is None:
+                        innermost = key
+                    seen.add(key)
+                frame = frame.f_back
+            if innermost is not None:
+                self.active_samples += 1
+                self.own[innermost] += 1
+                self.cumulative.update(seen)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class IntegrationProfiler:
+    """Ejecuta perfilados acotados en el tiempo, de uno en uno."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def async_profile(self, duration: float, interval: float, path: str) -> Dict[str, Any]:
+        """Perfila durante ``duration`` segundos, escribe el informe en ``path`` y lo resume."""
+
+        if self._running:
+            raise ProfilerBusyError("Ya hay un perfilado de la integración en curso")
+        self._running = True
+        try:
+            return await self._async_profile(duration, interval, path)
+        finally:
+            self._running = False
+
+    async def _async_profile(self, duration: float, interval: float, path: str) -> Dict[str, Any]:
+        _LOGGER.info("Perfilando la integración durante %s s en %s", duration, path)
+        # Si tracemalloc ya estaba activo (por otra herramienta) no se detiene al terminar
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(_TRACEMALLOC_FRAMES)
+        snapshot_filters = [
+            tracemalloc.Filter(True, os.path.join(_PACKAGE_DIR, "*")),
+            tracemalloc.Filter(False, _PROFILER_FILE),
+        ]
+        sampler = _StackSampler(threading.get_ident(), interval)
+        lags: List[float] = []
+        try:
+            before = await self._hass.async_add_executor_job(tracemalloc.take_snapshot)
+            sampler.start()
+            started = time.monotonic()
+            lag_task = asyncio.create_task(_measure_loop_lag(lags))
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                lag_task.cancel()
+                await self._hass.async_add_executor_job(sampler.stop)
+            elapsed = time.monotonic() - started
+            after = await self._hass.async_add_executor_job(tracemalloc.take_snapshot)
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        allocations = (
+            after.filter_traces(snapshot_filters)
+            .compare_to(before.filter_traces(snapshot_filters), "lineno")
+        )
+        report = _build_report(elapsed, interval, sampler, allocations, lags)
+        await self._hass.async_add_executor_job(_write_report, path, report["text"])
+        _LOGGER.info("Informe de perfilado escrito en %s", path)
+        return {"path": path, **report["summary"]}
+
+
+async def _measure_loop_lag(lags: List[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + _LAG_PROBE_INTERVAL
+        await asyncio.sleep(_LAG_PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+def _relative(filename: str) -> str:
+    return os.path.relpath(filename, os.path.dirname(_PACKAGE_DIR))
+
+
+def _function_label(key: FunctionKey) -> str:
+    filename, lineno, name = key
+    return f"{_relative(filename)}:{lineno} {name}"
+
+
+def _lag_summary(lags: List[float]) -> Dict[str, Optional[float]]:
+    if not lags:
+        return {"mean_ms": None, "p95_ms": None, "max_ms": None}
+    ordered = sorted(lags)
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def _build_report(elapsed, interval, sampler: _StackSampler, allocations, lags) -> Dict[str, Any]:
+    samples = max(sampler.samples, 1)
+    lag = _lag_summary(lags)
+    lines = [
+        "Kobold VR7 profile",
+        f"duration_s: {elapsed:.1f}",
+        f"sample_interval_ms: {interval * 1000:g}",
+        f"samples: {sampler.samples}",
+        f"samples_in_integration: {sampler.active_samples} "
+        f"({100 * sampler.active_samples / samples:.1f}% of the event loop)",
+        "",
+        "Hot paths (cumulative % of samples)",
+    ]
+    hot_paths = {}
+    for name in HOT_PATHS:
+        count = sum(n for key, n in sampler.cumulative.items() if key[2] == name)
+        hot_paths[name] = round(100 * count / samples, 2)
+        lines.append(f"  {name:<24} {hot_paths[name]:6.2f}%")
+
+    lines += ["", f"Top functions by own time (top {_TOP})", "  own%    cum%   function"]
+    for key, count in sampler.own.most_common(_TOP):
+        lines.append(
+            f"  {100 * count / samples:5.2f}  {100 * sampler.cumulative[key] / samples:5.2f}"
+            f"   {_function_label(key)}"
+        )
+    lines += ["", f"Top functions by cumulative time (top {_TOP})", "  cum%    function"]
+    for key, count in sampler.cumulative.most_common(_TOP):
+        lines.append(f"  {100 * count / samples:5.2f}   {_function_label(key)}")
+
+    lines += ["", f"Top allocation sites by growth (top {_TOP})", "  size_kib  count  site"]
+    for stat in allocations[:_TOP]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"  {stat.size_diff / 1024:+8.1f}  {stat.count_diff:+5d}  "
+            f"{_relative(frame.filename)}:{frame.lineno}"
+        )
+    lines += [
+        "",
+        "Event loop lag",
+        f"  probes: {len(lags)}",
+        f"  mean_ms: {lag['mean_ms']}",
+        f"  p95_ms: {lag['p95_ms']}",
+        f"  max_ms: {lag['max_ms']}",
+        "",
+    ]
+
+    summary = {
+        "duration_s": round(elapsed, 1),
+        "samples": sampler.samples,
+        "integration_percent": round(100 * sampler.active_samples / samples, 2),
+        "hot_paths_percent": hot_paths,
+        "top_functions": [
+            {"function": _function_label(key), "own_percent": round(100 * count / samples, 2)}
+            for key, count in sampler.own.most_common(5)
+        ],
+        "allocated_kib": round(sum(stat.size_diff for stat in allocations) / 1024, 1),
+        "loop_lag": lag,
+    }
+    return {"text": "\n".join(lines), "summary": summary}
+
+
+def _write_report(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as report:
+        report.write(text)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entradas máximas en memoria; al superarlo se descarta la usada hace más tiempo
+DEFAULT_MAX_ENTRIES = 256
+
+
+class ResponseCache:
+    """Caché en memoria de respuestas REST con caducidad, LRU y petición única en vuelo.
+
+    Las claves son tuplas ``(endpoint, argumento)``. Las llamadas concurrentes
+    con la misma clave comparten una única petición, y los errores no se
+    guardan: la siguiente llamada vuelve a intentarlo.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        # clave -> (instante de caducidad en reloj monotónico, valor)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "entries": len(self._entries), "inflight": len(self._inflight)}
+
+    async def get(
+        self,
+        endpoint: str,
+        argument: Hashable,
+        ttl: float,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Devuelve la respuesta guardada o la obtiene con ``loader`` y la guarda ``ttl`` segundos."""
+
+        key = (endpoint, argument)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+            self._stats["expired"] += 1
+
+        task = self._inflight.get(key)
+        # Una carga invalidada mientras estaba en vuelo puede traer datos anteriores a la
+        # escritura: las llamadas nuevas lanzan otra en lugar de unirse a ella
+        if task is not None and not getattr(task, "stale", False):
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.get_running_loop().create_task(self._load(key, ttl, loader))
+            # Evita avisos de excepción no recuperada si todos los llamantes se cancelan
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+
+        # shield: cancelar a un llamante no debe cancelar la petición compartida
+        return await asyncio.shield(task)
+
+    def invalidate(self, endpoint: str, argument: Optional[Hashable] = None) -> None:
+        """Descarta las respuestas de un endpoint (de un argumento concreto o todas)."""
+
+        if argument is not None:
+            keys = [(endpoint, argument)] if (endpoint, argument) in self._entries else []
+        else:
+            keys = [key for key in self._entries if key[0] == endpoint]
+        for key in keys:
+            del self._entries[key]
+        # Una respuesta en vuelo pudo pedirse antes de la escritura: no debe guardarse
+        for key, task in self._inflight.items():
+            if key[0] == endpoint and (argument is None or key[1] == argument):
+                task.stale = True
+        if keys:
+            self._stats["invalidations"] += len(keys)
+            _LOGGER.debug("Caché invalidada para %s %s (%s entradas)", endpoint, argument, len(keys))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for task in self._inflight.values():
+            task.stale = True
+
+    async def _load(self, key, ttl: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        finally:
+            # Si se invalidó, la clave puede pertenecer ya a una carga más reciente
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        if ttl > 0 and not getattr(task, "stale", False):
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
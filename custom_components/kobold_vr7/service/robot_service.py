@@ -1,17 +1,42 @@
+import asyncio
 import logging
-from typing import Optional, List
+import zlib
+from dataclasses import asdict
+from typing import Any, Dict, Optional, List, Tuple
 
 from ..api.model.register_device_response import RegisterDeviceResponse
 from ..api.model.robot_map_zones import CleaningTracksResponse
-from ..api.model.cleaning_start_request import RunSettings, MapDetails, Run
-from ..api.model.cleaning_start_request import CleaningStartRequest
 from ..api.model.robot_map_response import RobotMapResponse
+from ..api.model.robot_response import RobotResponse
+from ..api.request_executor import KoboldApiAuthError, KoboldApiError
+from .model.map_with_zones import MapWithZones
+from .response_cache import ResponseCache
 
 _LOGGER = logging.getLogger(__name__)
 
+# Endpoints de lectura cacheados y segundos que se reutiliza cada respuesta.
+# Los modos de limpieza y las zonas apenas cambian; las limpiezas recientes sí.
+_CACHE_ROBOTS = "robots"
+_CACHE_CLEANING_MODES = "cleaning_modes"
+_CACHE_ROBOT_MAPS = "robot_maps"
+_CACHE_RECENT_CLEANING_MAPS = "recent_cleaning_maps"
+_CACHE_ZONES = "zones"
+_CACHE_TTLS = {
+    _CACHE_ROBOTS: 60,
+    _CACHE_CLEANING_MODES: 3600,
+    _CACHE_ROBOT_MAPS: 300,
+    _CACHE_RECENT_CLEANING_MAPS: 30,
+    _CACHE_ZONES: 600,
+}
+
 
 class UserDataServiceException(Exception):
-    pass
+    def __init__(self, message: str, transient: bool = False, auth_failed: bool = False):
+        super().__init__(message)
+        # Fallo pasajero (red, plazo, 5xx, 429): la operación puede repetirse más tarde
+        self.transient = transient
+        # Credenciales rechazadas: repetir no sirve sin volver a autenticarse
+        self.auth_failed = auth_failed
 
 
 async def execute(action_coro, action_description, identifier):
@@ -22,20 +47,113 @@ async def execute(action_coro, action_description, identifier):
             logging.debug(action_description)
         return await action_coro
     except Exception as e:
-        if identifier is not None:
-            logging.error("Failed to %s identifier %s",
-                          action_description, identifier, exc_info=True)
-            raise UserDataServiceException(
-                "Failed to " + action_description % identifier) from e
+        description = (
+            action_description % identifier if identifier is not None else action_description
+        )
+        transient = isinstance(e, KoboldApiError) and e.transient
+        # Los fallos pasajeros no necesitan traza: se reintentan o se recuperan solos
+        logging.error("Failed to %s", description, exc_info=not transient)
+        raise UserDataServiceException(
+            "Failed to " + description,
+            transient=transient,
+            auth_failed=isinstance(e, KoboldApiAuthError),
+        ) from e
+
+
+def _map_signature(robot_map) -> Optional[Tuple]:
+    """Campos que cambian cuando Orbital publica una nueva versión del mapa.
+
+    Si Orbital no envía ninguno se usa la huella del binario del mapa; sin él
+    devuelve None y el mapa se trata siempre como modificado.
+    """
+    signature = (
+        getattr(robot_map, "updated_at", None),
+        getattr(robot_map, "last_modified_at", None),
+        getattr(robot_map, "map_versions_count", None),
+    )
+    if any(value is not None for value in signature):
+        return signature
+    blob = getattr(robot_map, "processed_real_binary", None)
+    if blob is None:
+        return None
+    return ("crc32", len(blob), zlib.crc32(blob.view()))
+
 
-        logging.error("Failed to %s", action_description, exc_info=True)
+def build_cleaning_request(robot_id, fan_speed, map_with_zone) -> Dict[str, Any]:
+    """Construye la petición ``cleaning.start`` (una ejecución por zona)."""
+
+    # Manejo específico para cuando no hay mapas (map_with_zone es None)
+    if map_with_zone is None:
+        # Para robots sin mapa, enviamos la propiedad 'map' como null
+        runs = [
+            {
+                "settings": {
+                    "mode": fan_speed,
+                    "navigation_mode": "normal"
+                },
+                "map": None
+            }
+        ]
+        return {"runs": runs, "ability": "cleaning.start"}
+
+    # Extraemos el floorplan_uuid del mapa
+    floor_plan_uuid = (
+        map_with_zone.map.floorplan_uuid
+        if map_with_zone.map and hasattr(map_with_zone.map, 'floorplan_uuid')
+        else None
+    )
+
+    # Si no hay floorplan_uuid, no podemos continuar
+    if floor_plan_uuid is None:
         raise UserDataServiceException(
-            "Failed to " + action_description) from e
+            f"Cannot start cleaning: no floorplan_uuid available for robot {robot_id}"
+        )
+
+    # Un Run por cada zona; sin zonas, un Run con el mapa pero sin zona específica
+    zones = map_with_zone.zones if getattr(map_with_zone, 'zones', None) else [None]
+    runs = [
+        {
+            "settings": {
+                "mode": fan_speed,
+                "navigation_mode": "normal"
+            },
+            "map": {
+                "floorplan_uuid": floor_plan_uuid,
+                "zone_uuid": zone.track_uuid if zone is not None else None,
+                "nogo_enabled": True
+            }
+        }
+        for zone in zones
+    ]
+    return {"runs": runs, "ability": "cleaning.start"}
 
 
 class RobotsService:
-    def __init__(self, robots_api_client):
+    def __init__(self, robots_api_client, cache_store=None):
         self.robots_api_client = robots_api_client
+        # Caché persistente opcional (RobotsCacheStore) para arrancar sin la API
+        self._cache_store = cache_store
+        # Último descubrimiento (robots, mapas por robot, si viene de caché),
+        # compartido por todas las plataformas
+        self._discovery: Optional[
+            Tuple[List[RobotResponse], Dict[str, List[MapWithZones]], bool]
+        ] = None
+        self._discovery_lock = asyncio.Lock()
+        # Respuestas REST recientes compartidas por todas las plataformas
+        self._cache = ResponseCache()
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Aciertos, fallos y peticiones compartidas de la caché de respuestas."""
+        return self._cache.stats
+
+    def invalidate_robot(self, robot_id) -> None:
+        """Descarta las respuestas de un robot que un comando puede haber cambiado."""
+        self._cache.invalidate(_CACHE_RECENT_CLEANING_MAPS, robot_id)
+        self._cache.invalidate(_CACHE_ROBOT_MAPS, robot_id)
+
+    async def _cached(self, endpoint, argument, loader):
+        return await self._cache.get(endpoint, argument, _CACHE_TTLS[endpoint], loader)
 
     async def register_device(self, token) -> RegisterDeviceResponse:
         return await execute(
@@ -45,125 +163,260 @@ class RobotsService:
         )
 
     async def get_all_robots(self, token):
-        return await execute(
-            self.robots_api_client.get_user_robots(),
-            "get all robots",
-            None
+        return await self._cached(
+            _CACHE_ROBOTS,
+            None,
+            lambda: execute(
+                self.robots_api_client.get_user_robots(),
+                "get all robots",
+                None
+            ),
         )
 
     async def get_cleaning_mode_by_robot_id(self, token, robot_id):
-        return await execute(
-            self.robots_api_client.get_cleaning_modes(robot_id),
-            "get cleaning modes for robot %s",
-            robot_id
+        return await self._cached(
+            _CACHE_CLEANING_MODES,
+            robot_id,
+            lambda: execute(
+                self.robots_api_client.get_cleaning_modes(robot_id),
+                "get cleaning modes for robot %s",
+                robot_id
+            ),
         )
 
     async def get_robot_map(self, token, robot_id) -> Optional[List[RobotMapResponse]]:
-        return await execute(
-            self.robots_api_client.get_robot_maps(robot_id),
-            "get robot map for robot %s",
-            robot_id
+        return await self._cached(
+            _CACHE_ROBOT_MAPS,
+            robot_id,
+            lambda: execute(
+                self.robots_api_client.get_robot_maps(robot_id),
+                "get robot map for robot %s",
+                robot_id
+            ),
         )
 
     async def get_recent_cleaning_maps(self, token, robot_id):
-        return await execute(
-            self.robots_api_client.get_recent_cleaning_maps(robot_id),
-            "get recent cleaning maps for robot %s",
-            robot_id
+        return await self._cached(
+            _CACHE_RECENT_CLEANING_MAPS,
+            robot_id,
+            lambda: execute(
+                self.robots_api_client.get_recent_cleaning_maps(robot_id),
+                "get recent cleaning maps for robot %s",
+                robot_id
+            ),
         )
 
     async def get_zones_by_floor_plan(self, token, floorplan_uuid) -> Optional[List[CleaningTracksResponse]]:
-        return await execute(
-            self.robots_api_client.get_zones_by_floor_plan(floorplan_uuid),
-            "get zones by floorplan %s",
-            floorplan_uuid
+        return await self._cached(
+            _CACHE_ZONES,
+            floorplan_uuid,
+            lambda: execute(
+                self.robots_api_client.get_zones_by_floor_plan(floorplan_uuid),
+                "get zones by floorplan %s",
+                floorplan_uuid
+            ),
         )
 
-    async def start_cleaning(self, token, robot_id, fan_speed, map_with_zone):
-        # Manejo específico para cuando no hay mapas (map_with_zone es None)
-        if map_with_zone is None:
-            # Para robots sin mapa, enviamos la propiedad 'map' como null
-            runs = [
-                {
-                    "settings": {
-                        "mode": fan_speed,
-                        "navigation_mode": "normal"
-                    },
-                    "map": None
-                }
-            ]
-            
-            # Crear la solicitud de limpieza directamente como un diccionario
-            cleaning_request = {"runs": runs, "ability": "cleaning.start"}
-            
-            # Enviar la solicitud
-            return await execute(
-                self.robots_api_client.start_cleaning(
-                    robot_id, cleaning_request),
-                "start cleaning for robot %s",
-                robot_id
-            )
-        
-        # Continúa con el caso original cuando hay mapas
+    async def get_maps_with_zones(
+        self, token, robot_ids: List[str], concurrency: int
+    ) -> Dict[str, List[MapWithZones]]:
+        """Descarga en paralelo los mapas y zonas de varios robots.
 
-        else:
-            # Extraemos el floorplan_uuid del mapa
-            floor_plan_uuid = (
-                map_with_zone.map.floorplan_uuid
-                if map_with_zone.map and hasattr(map_with_zone.map, 'floorplan_uuid')
-                else None
-            )
-
-            # Si no hay floorplan_uuid, no podemos continuar
-            if floor_plan_uuid is None:
-                raise UserDataServiceException(
-                    f"Cannot start cleaning: no floorplan_uuid available for robot {robot_id}"
-                )
-
-            runs = []
-
-            # Si tenemos zonas, creamos un Run por cada zona
-            if hasattr(map_with_zone, 'zones') and map_with_zone.zones:
-                for zone in map_with_zone.zones:
-                    run = {
-                        "settings": {
-                            "mode": fan_speed,
-                            "navigation_mode": "normal"
-                        },
-                        "map": {
-                            "floorplan_uuid": floor_plan_uuid,
-                            "zone_uuid": zone.track_uuid,
-                            "nogo_enabled": True
-                        }
-                    }
-                    runs.append(run)
-            else:
-                # Si no tenemos zonas, creamos un Run con el mapa pero sin zona específica
-                runs = [
+        Todas las peticiones comparten un semáforo que limita cuántas hay en
+        vuelo a la vez. Si fallan las zonas de un mapa, el mapa se conserva
+        sin zonas, igual que en la descarga secuencial.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _zones_for_map(robot_map) -> MapWithZones:
+            try:
+                async with semaphore:
+                    zones = await self.get_zones_by_floor_plan(token, robot_map.floorplan_uuid)
+                return MapWithZones(map=robot_map, zones=zones)
+            except Exception as e:
+                _LOGGER.warning("Error getting zones for map %s: %s", robot_map.floorplan_uuid, e)
+                # Agregar el mapa sin zonas
+                return MapWithZones(map=robot_map, zones=None)
+
+        async def _maps_for_robot(robot_id) -> List[MapWithZones]:
+            async with semaphore:
+                maps = await self.get_robot_map(token, robot_id)
+            if not maps:
+                _LOGGER.info("No maps found for robot %s, continuing without maps", robot_id)
+                return []
+            return list(await asyncio.gather(*(_zones_for_map(m) for m in maps)))
+
+        results = await asyncio.gather(*(_maps_for_robot(r) for r in robot_ids))
+        return dict(zip(robot_ids, results))
+
+    async def load_cached_discovery(
+        self,
+    ) -> Optional[Tuple[List[RobotResponse], Dict[str, List[MapWithZones]]]]:
+        """Reconstruye robots, mapas y zonas desde la caché persistente."""
+        snapshot = await self._load_snapshot()
+        if not snapshot:
+            return None
+
+        try:
+            robots = [RobotResponse(**robot) for robot in snapshot["robots"]]
+            maps_by_robot = {
+                robot_id: [
+                    MapWithZones(
+                        map=RobotMapResponse.from_dict(item["map"]),
+                        zones=(
+                            [CleaningTracksResponse.from_dict(zone) for zone in item["zones"]]
+                            if item["zones"] is not None
+                            else None
+                        ),
+                    )
+                    for item in items
+                ]
+                for robot_id, items in snapshot["maps"].items()
+            }
+        except (KeyError, TypeError, ValueError) as error:
+            # El formato de los modelos ha cambiado: se descarta la caché
+            _LOGGER.warning("Caché de robots incompatible, se descartará: %s", error)
+            return None
+
+        return robots, maps_by_robot
+
+    async def get_discovery(
+        self, token, concurrency: int
+    ) -> Tuple[List[RobotResponse], Dict[str, List[MapWithZones]], bool]:
+        """Devuelve robots y mapas, desde la caché si existe, compartidos entre plataformas.
+
+        El tercer valor indica si el resultado procede de la caché persistente
+        y, por tanto, conviene revalidarlo.
+        """
+        async with self._discovery_lock:
+            if self._discovery is None:
+                cached = await self.load_cached_discovery()
+                if cached:
+                    self._discovery = (cached[0], cached[1], True)
+                else:
+                    robots, maps_by_robot = await self.discover(token, concurrency)
+                    self._discovery = (robots, maps_by_robot, False)
+            return self._discovery
+
+    async def discover(
+        self, token, concurrency: int
+    ) -> Tuple[List[RobotResponse], Dict[str, List[MapWithZones]]]:
+        """Descarga robots, mapas y zonas completos y actualiza la caché."""
+        robots = await self.get_all_robots(token)
+        maps_by_robot = await self.get_maps_with_zones(
+            token, [robot.id for robot in robots], concurrency
+        )
+        await self._save_snapshot(robots, maps_by_robot)
+        return robots, maps_by_robot
+
+    async def revalidate(
+        self,
+        token,
+        concurrency: int,
+        cached_maps: Dict[str, List[MapWithZones]],
+    ) -> Tuple[List[RobotResponse], Dict[str, List[MapWithZones]], List[str]]:
+        """Compara la caché con la API y solo vuelve a pedir las zonas de los mapas modificados.
+
+        Devuelve los robots, los mapas actualizados y los ids de los robots
+        cuyos mapas han cambiado.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        # Revalidar exige respuestas actuales, no las guardadas en memoria
+        self._cache.invalidate(_CACHE_ROBOTS)
+        self._cache.invalidate(_CACHE_ROBOT_MAPS)
+        robots = await self.get_all_robots(token)
+
+        async def _revalidate_robot(robot_id) -> Tuple[List[MapWithZones], bool]:
+            previous = {
+                mwz.map.floorplan_uuid: mwz for mwz in cached_maps.get(robot_id, [])
+            }
+            async with semaphore:
+                maps = await self.get_robot_map(token, robot_id) or []
+
+            changed = len(maps) != len(previous)
+            result: List[MapWithZones] = []
+            for robot_map in maps:
+                cached = previous.get(robot_map.floorplan_uuid)
+                signature = _map_signature(robot_map)
+                if (
+                    cached is not None
+                    and cached.zones is not None
+                    and signature is not None
+                    and _map_signature(cached.map) == signature
+                ):
+                    result.append(MapWithZones(map=robot_map, zones=cached.zones))
+                    continue
+
+                changed = True
+                self._cache.invalidate(_CACHE_ZONES, robot_map.floorplan_uuid)
+                try:
+                    async with semaphore:
+                        zones = await self.get_zones_by_floor_plan(
+                            token, robot_map.floorplan_uuid
+                        )
+                    result.append(MapWithZones(map=robot_map, zones=zones))
+                except Exception as e:
+                    _LOGGER.warning(
+                        "Error getting zones for map %s: %s", robot_map.floorplan_uuid, e
+                    )
+                    result.append(MapWithZones(map=robot_map, zones=None))
+            return result, changed
+
+        robot_ids = [robot.id for robot in robots]
+        results = await asyncio.gather(*(_revalidate_robot(r) for r in robot_ids))
+
+        maps_by_robot = {}
+        changed_robot_ids = []
+        for robot_id, (maps, changed) in zip(robot_ids, results):
+            maps_by_robot[robot_id] = maps
+            if changed:
+                changed_robot_ids.append(robot_id)
+
+        await self._save_snapshot(robots, maps_by_robot)
+        self._discovery = (robots, maps_by_robot, False)
+        return robots, maps_by_robot, changed_robot_ids
+
+    async def _load_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Lee la instantánea del disco; no se retiene para no duplicar los binarios."""
+        if self._cache_store is None:
+            return None
+        return await self._cache_store.async_load()
+
+    async def _save_snapshot(self, robots, maps_by_robot) -> None:
+        if self._cache_store is None:
+            return
+        snapshot = {
+            "robots": [asdict(robot) for robot in robots],
+            "maps": {
+                robot_id: [
                     {
-                        "settings": {
-                            "mode": fan_speed,
-                            "navigation_mode": "normal"
-                        },
-                        "map": {
-                            "floorplan_uuid": floor_plan_uuid,
-                            "zone_uuid": None,
-                            "nogo_enabled": True
-                        }
+                        "map": mwz.map.to_dict(),
+                        "zones": (
+                            [zone.to_dict() for zone in mwz.zones]
+                            if mwz.zones is not None
+                            else None
+                        ),
                     }
+                    for mwz in maps
                 ]
-            
-            # Crear la solicitud de limpieza directamente como un diccionario
-            cleaning_request = {"runs": runs, "ability": "cleaning.start"}
-
-            
-            # Enviar la solicitud
-            return await execute(
-                self.robots_api_client.start_cleaning(
-                    robot_id, cleaning_request),
-                "start cleaning for robot %s",
-                robot_id
-            )
+                for robot_id, maps in maps_by_robot.items()
+            },
+        }
+        try:
+            await self._cache_store.async_save(snapshot)
+        except Exception as error:
+            _LOGGER.warning("No se pudo guardar la caché de robots: %s", error)
+
+    async def start_cleaning(self, token, robot_id, fan_speed, map_with_zone):
+        cleaning_request = build_cleaning_request(robot_id, fan_speed, map_with_zone)
+
+        # Enviar la solicitud
+        return await execute(
+            self.robots_api_client.start_cleaning(
+                robot_id, cleaning_request),
+            "start cleaning for robot %s",
+            robot_id
+        )
 
     async def send_to_base(self, token, robot_id):
         return await execute(
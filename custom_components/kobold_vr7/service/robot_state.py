@@ -0,0 +1,142 @@
+"""Estado en memoria de los robots de una cuenta, compartido por todas las plataformas.
+
+El cliente WebSocket y la revalidación de mapas escriben aquí; las entidades
+se suscriben a su robot y leen el estado al recibir el aviso. Cada escritura
+compara con el valor anterior y solo avisa si ha cambiado, de modo que las
+entidades no tienen que deduplicar ni conocer de dónde llega cada dato.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .cleaning_telemetry import CleaningTelemetry
+from .model.map_with_zones import MapWithZones
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tipo de cambio que se entrega a los suscriptores
+UPDATE_VACUUM = "vacuum"
+UPDATE_BATTERY = "battery"
+UPDATE_CLEANING = "cleaning"
+UPDATE_HEARTBEAT = "heartbeat"
+UPDATE_MAPS = "maps"
+
+RobotStateListener = Callable[[str], None]
+
+
+@dataclass(frozen=True, slots=True)
+class VacuumState:
+    """Estado visible de la aspiradora derivado del último ``state`` del robot."""
+
+    activity: Any
+    status: Optional[str]
+    last_error: Optional[str] = None
+    # Errores activos como (código, descripción, severidad legible)
+    errors: Tuple[Tuple[str, str, Optional[str]], ...] = ()
+    bag_status: Optional[str] = None
+    available_commands: Any = None
+
+
+@dataclass(slots=True)
+class RobotState:
+    """Último estado conocido de un robot."""
+
+    robot: Any
+    maps: List[MapWithZones] = field(default_factory=list)
+    vacuum: Optional[VacuumState] = None
+    battery_level: Optional[int] = None
+    is_charging: bool = False
+    cleaning: Optional[CleaningTelemetry] = None
+    heartbeat_rtt: Optional[float] = None
+
+
+class RobotStateStore:
+    """Estado tipado por robot con suscripciones por robot."""
+
+    def __init__(self) -> None:
+        self._states: Dict[str, RobotState] = {}
+        self._listeners: Dict[str, List[RobotStateListener]] = {}
+
+    def __iter__(self) -> Iterator[RobotState]:
+        return iter(self._states.values())
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def get(self, robot_id: str) -> Optional[RobotState]:
+        return self._states.get(robot_id)
+
+    def add_robot(self, robot, maps: Optional[List[MapWithZones]] = None) -> RobotState:
+        """Registra un robot (o actualiza sus datos) conservando el estado ya recibido."""
+
+        state = self._states.get(robot.id)
+        if state is None:
+            state = self._states[robot.id] = RobotState(robot=robot)
+        else:
+            state.robot = robot
+        if maps is not None:
+            state.maps = maps
+        return state
+
+    def subscribe(self, robot_id: str, listener: RobotStateListener) -> Callable[[], None]:
+        """Llama a ``listener(tipo)`` con cada cambio del robot; devuelve la baja."""
+
+        listeners = self._listeners.setdefault(robot_id, [])
+        listeners.append(listener)
+
+        def _unsubscribe() -> None:
+            if listener in listeners:
+                listeners.remove(listener)
+
+        return _unsubscribe
+
+    def set_vacuum(self, robot_id: str, vacuum: VacuumState) -> bool:
+        state = self._states.get(robot_id)
+        if state is None or state.vacuum == vacuum:
+            return False
+        state.vacuum = vacuum
+        self._notify(robot_id, UPDATE_VACUUM)
+        return True
+
+    def set_battery(self, robot_id: str, level: Optional[int], is_charging: bool) -> bool:
+        state = self._states.get(robot_id)
+        if state is None or (state.battery_level, state.is_charging) == (level, is_charging):
+            return False
+        state.battery_level = level
+        state.is_charging = is_charging
+        self._notify(robot_id, UPDATE_BATTERY)
+        return True
+
+    def set_cleaning(self, robot_id: str, telemetry: CleaningTelemetry) -> bool:
+        state = self._states.get(robot_id)
+        if state is None or state.cleaning == telemetry:
+            return False
+        state.cleaning = telemetry
+        self._notify(robot_id, UPDATE_CLEANING)
+        return True
+
+    def set_heartbeat_rtt(self, robot_id: str, rtt: float) -> bool:
+        state = self._states.get(robot_id)
+        if state is None:
+            return False
+        # Cada medición se publica aunque se repita: es una serie temporal
+        state.heartbeat_rtt = rtt
+        self._notify(robot_id, UPDATE_HEARTBEAT)
+        return True
+
+    def set_maps(self, robot_id: str, maps: List[MapWithZones]) -> bool:
+        state = self._states.get(robot_id)
+        if state is None:
+            return False
+        state.maps = maps
+        self._notify(robot_id, UPDATE_MAPS)
+        return True
+
+    def _notify(self, robot_id: str, kind: str) -> None:
+        for listener in list(self._listeners.get(robot_id, ())):
+            try:
+                listener(kind)
+            except Exception:
+                # Un suscriptor con errores no debe impedir que se avise al resto
+                _LOGGER.exception("Error notificando %s del robot %s", kind, robot_id)
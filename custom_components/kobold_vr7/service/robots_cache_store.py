@@ -0,0 +1,37 @@
+import logging
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from ..const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class RobotsCacheStore:
+    """Persistencia en disco de robots, mapas y zonas por entrada de configuración."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.robots")
+
+    async def async_load(self) -> Optional[Dict[str, Any]]:
+        """Devuelve la instantánea guardada o None si no existe."""
+
+        try:
+            return await self._store.async_load()
+        except Exception as error:
+            _LOGGER.warning("No se pudo leer la caché de robots: %s", error)
+            return None
+
+    async def async_save(self, snapshot: Dict[str, Any]) -> None:
+        """Guarda la instantánea en disco."""
+
+        await self._store.async_save(snapshot)
+
+    async def async_remove(self) -> None:
+        """Elimina la caché del disco."""
+
+        await self._store.async_remove()
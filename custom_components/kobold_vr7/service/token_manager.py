@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+import aiohttp
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from ..api.user_api_client import UserApiClient
+from ..const import (
+    CONF_ID_TOKEN,
+    CONF_REFRESH_TOKEN,
+    DOMAIN,
+    ID_TOKEN_REFRESH_MARGIN,
+    ID_TOKEN_RETRY_DELAY,
+)
+from .token_utils import decode_jwt_expiry
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class IdTokenManager:
+    """Mantiene vigente el id_token de Auth0 de una entrada de configuración.
+
+    Renueva el token con el refresh_token antes de que caduque, guarda el
+    nuevo en la entrada y avisa a los clientes en uso. Si Auth0 rechaza el
+    refresh_token (o no lo hay) inicia el flujo de reautenticación en lugar
+    de seguir reintentando.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        user_api_client: UserApiClient,
+        refresh_margin: int = ID_TOKEN_REFRESH_MARGIN,
+        retry_delay: int = ID_TOKEN_RETRY_DELAY,
+    ) -> None:
+        self._hass = hass
+        self._entry = entry
+        self._client = user_api_client
+        self._refresh_margin = refresh_margin
+        self._retry_delay = retry_delay
+        self._listeners: List[Callable[[str], None]] = []
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._unsub_timer: Optional[CALLBACK_TYPE] = None
+        self.reauth_required = False
+
+    @property
+    def id_token(self) -> str:
+        return self._entry.data[CONF_ID_TOKEN]
+
+    @callback
+    def async_add_listener(self, listener: Callable[[str], None]) -> CALLBACK_TYPE:
+        """Registra una función que recibe cada id_token renovado."""
+
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    async def async_start(self) -> bool:
+        """Renueva ya el token si está caducado o a punto de caducar y programa la siguiente.
+
+        Devuelve False si no hay un token utilizable.
+        """
+
+        expires_at = decode_jwt_expiry(self.id_token)
+        if expires_at is None:
+            # Sin "exp" no se puede anticipar: la renovación la provocará el primer 401
+            return True
+        remaining = expires_at - time.time() - self._refresh_margin
+        if remaining <= 0:
+            return await self.async_refresh()
+        self._schedule(remaining)
+        return True
+
+    async def async_refresh(self) -> bool:
+        """Renueva el id_token; las llamadas concurrentes comparten la misma renovación."""
+
+        if self.reauth_required:
+            return False
+        task = self._refresh_task
+        if task is None or task.done():
+            task = self._hass.async_create_background_task(
+                self._do_refresh(), f"{DOMAIN}_refresh_id_token"
+            )
+            self._refresh_task = task
+        # shield: cancelar a un llamante no debe cancelar la renovación compartida
+        return await asyncio.shield(task)
+
+    async def async_recover(self) -> bool:
+        """Intenta renovar el token tras un rechazo; devuelve False si solo queda reautenticarse."""
+
+        await self.async_refresh()
+        return not self.reauth_required
+
+    @callback
+    def async_stop(self) -> None:
+        self._cancel_timer()
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+
+    async def _do_refresh(self) -> bool:
+        self._cancel_timer()
+        refresh_token = self._entry.data.get(CONF_REFRESH_TOKEN)
+        if not refresh_token:
+            self._request_reauth("la entrada no tiene refresh_token")
+            return False
+
+        try:
+            response = await self._client.refresh_id_token(refresh_token)
+        except aiohttp.ClientResponseError as error:
+            if error.status in (400, 401, 403):
+                # invalid_grant: el refresh_token ha caducado o ha sido revocado
+                self._request_reauth(f"Auth0 rechazó el refresh_token ({error.status})")
+                return False
+            return self._retry_later(error)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return self._retry_later(error)
+        except Exception as error:
+            # Respuesta de Auth0 malformada (KeyError, TypeError, JSON inválido): sin
+            # reintento la renovación quedaría parada hasta el primer 401
+            _LOGGER.debug("Respuesta inesperada al renovar el id_token", exc_info=True)
+            return self._retry_later(error)
+
+        data = {**self._entry.data, CONF_ID_TOKEN: response.id_token}
+        # Auth0 puede rotar el refresh_token en cada uso
+        if response.refresh_token:
+            data[CONF_REFRESH_TOKEN] = response.refresh_token
+        self._hass.config_entries.async_update_entry(self._entry, data=data)
+
+        expires_at = decode_jwt_expiry(response.id_token)
+        if expires_at is None:
+            expires_at = time.time() + (response.expires_in or 0)
+        _LOGGER.debug("id_token renovado, válido durante %.0f s", expires_at - time.time())
+        for listener in list(self._listeners):
+            listener(response.id_token)
+        self._schedule(expires_at - time.time() - self._refresh_margin)
+        return True
+
+    def _retry_later(self, error: Exception) -> bool:
+        _LOGGER.warning(
+            "No se pudo renovar el id_token, se reintentará en %s s: %s", self._retry_delay, error
+        )
+        self._schedule(self._retry_delay)
+        return False
+
+    def _request_reauth(self, reason: str) -> None:
+        if self.reauth_required:
+            return
+        self.reauth_required = True
+        _LOGGER.warning("No se puede renovar el id_token (%s); hay que volver a autenticarse", reason)
+        self._entry.async_start_reauth(self._hass)
+
+    def _schedule(self, delay: float) -> None:
+        self._cancel_timer()
+
+        @callback
+        def _refresh(_now) -> None:
+            self._unsub_timer = None
+            self._hass.async_create_background_task(
+                self.async_refresh(), f"{DOMAIN}_refresh_id_token"
+            )
+
+        self._unsub_timer = async_call_later(self._hass, max(0, delay), _refresh)
+
+    def _cancel_timer(self) -> None:
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
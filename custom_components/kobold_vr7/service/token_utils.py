@@ -0,0 +1,40 @@
+import base64
+import json
+import logging
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def decode_jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """Devuelve el instante de expiración (epoch) de un JWT sin verificar la firma."""
+
+    if not token:
+        return None
+
+    # Aceptar tanto el token puro como la cabecera "Bearer <token>"
+    token = token.split(" ")[-1]
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+
+    payload = parts[1]
+    payload += "=" * (-len(payload) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (ValueError, TypeError) as error:
+        _LOGGER.debug("No se pudo decodificar el JWT: %s", error)
+        return None
+
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    if isinstance(exp, (int, float)):
+        return float(exp)
+    return None
+
+
+def mask_token(token: Optional[str]) -> str:
+    """Deja visibles solo el principio y el final de un token para logs y diagnósticos."""
+
+    if not token or len(token) <= 12:
+        return "**REDACTED**"
+    return f"{token[:6]}...{token[-4:]}"
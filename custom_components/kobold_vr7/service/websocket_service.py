@@ -1,9 +1,42 @@
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
 class WebSocketService:
+    """Gestiona la conexión WebSocket compartida por todos los robots de una cuenta."""
+
     def __init__(self, websocket_client):
         self.client = websocket_client
+        self._connect_task: asyncio.Task | None = None
+
+    async def register_robot(self, robot_id, serial=None):
+        """Añade un robot a la conexión y la abre si es el primero."""
+
+        self.client.add_robot(robot_id, serial)
+        if self._connect_task is None:
+            _LOGGER.debug("Abriendo conexión WebSocket compartida para la cuenta")
+            self._connect_task = self.client.hass.loop.create_task(self.start())
+
+    async def unregister_robot(self, robot_id):
+        """Retira un robot y cierra la conexión cuando ya no queda ninguno."""
+
+        await self.client.remove_robot(robot_id)
+        if not self.client.robot_ids:
+            _LOGGER.debug("No quedan robots registrados, cerrando el WebSocket")
+            await self.stop()
+
+    def expect_command_ack(self, robot_id):
+        """Indica que se ha enviado un comando para no retrasar su confirmación."""
+
+        self.client.expect_command_ack(robot_id)
 
     async def start(self):
         await self.client.connect()
 
     async def stop(self):
+        if self._connect_task and not self._connect_task.done():
+            self._connect_task.cancel()
+        self._connect_task = None
         await self.client.disconnect()
@@ -0,0 +1,167 @@
+"""Servicios de la integración que no dependen de una entidad concreta."""
+
+import logging
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_HISTORY_STORE,
+    DOMAIN,
+    SERVICE_DUMP_FRAMES,
+    SERVICE_GET_CLEANING_HISTORY,
+    SERVICE_PROFILE,
+    SIGNAL_CLEANING_SESSION_FINISHED,
+)
+from .service.cleaning_history_store import HISTORY_DB_FILENAME, CleaningHistoryStore
+from .service.cleaning_telemetry import CleaningSession
+from .service.frame_recorder import write_dump
+from .service.profiler import IntegrationProfiler, ProfilerBusyError
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_ROBOT_ID = "robot_id"
+ATTR_FLOORPLAN_UUID = "floorplan_uuid"
+ATTR_ZONE = "zone"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+ATTR_OFFSET = "offset"
+ATTR_DURATION = "duration"
+ATTR_INTERVAL_MS = "interval_ms"
+
+GET_CLEANING_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_ROBOT_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_FLOORPLAN_UUID): cv.string,
+        vol.Optional(ATTR_ZONE): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LIMIT, default=50): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=500)
+        ),
+        vol.Optional(ATTR_OFFSET, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=30): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=600)
+        ),
+        vol.Optional(ATTR_INTERVAL_MS, default=10): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=1000)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Crea el histórico de limpiezas y registra el servicio de consulta."""
+
+    store = CleaningHistoryStore(hass, hass.config.path(HISTORY_DB_FILENAME))
+    hass.data[DATA_HISTORY_STORE] = store
+
+    @callback
+    def _async_session_finished(robot_id: str, session: CleaningSession) -> None:
+        hass.async_create_task(store.async_record(robot_id, session))
+
+    async_dispatcher_connect(hass, SIGNAL_CLEANING_SESSION_FINISHED, _async_session_finished)
+
+    async def _async_close(_event) -> None:
+        await store.async_close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close)
+
+    async def _async_get_cleaning_history(call: ServiceCall) -> dict:
+        robot_ids = list(call.data.get(ATTR_ROBOT_ID, []))
+        if ATTR_ENTITY_ID in call.data:
+            # La aspiradora usa el id del robot como unique_id
+            registry = er.async_get(hass)
+            for entity_id in call.data[ATTR_ENTITY_ID]:
+                entry = registry.async_get(entity_id)
+                if entry is None or entry.platform != DOMAIN or entry.domain != "vacuum":
+                    raise ServiceValidationError(
+                        f"{entity_id} no es una aspiradora de {DOMAIN}"
+                    )
+                robot_ids.append(entry.unique_id)
+
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        return await store.async_query(
+            robot_ids=robot_ids or None,
+            floorplan_uuid=call.data.get(ATTR_FLOORPLAN_UUID),
+            zone=call.data.get(ATTR_ZONE),
+            start=dt_util.as_utc(start) if start is not None else None,
+            end=dt_util.as_utc(end) if end is not None else None,
+            limit=call.data[ATTR_LIMIT],
+            offset=call.data[ATTR_OFFSET],
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_CLEANING_HISTORY,
+        _async_get_cleaning_history,
+        schema=GET_CLEANING_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    # El perfilador solo existe como objeto; no muestrea nada hasta que se llama al servicio
+    profiler = IntegrationProfiler(hass)
+
+    async def _async_profile(call: ServiceCall) -> dict:
+        path = hass.config.path(
+            f"{DOMAIN}_profile_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+        try:
+            return await profiler.async_profile(
+                call.data[ATTR_DURATION], call.data[ATTR_INTERVAL_MS] / 1000, path
+            )
+        except ProfilerBusyError as error:
+            raise HomeAssistantError(str(error)) from error
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_dump_frames(call: ServiceCall) -> dict:
+        # Un fichero por cuenta con grabación activa; la copia de los búferes es inmediata
+        # y la compresión y escritura se hacen en el executor
+        timestamp = dt_util.now().strftime("%Y%m%d_%H%M%S")
+        dumps = []
+        for entry_id, hub in hass.data.get(DOMAIN, {}).items():
+            recorder = hub.websocket_service.client.frame_recorder
+            if recorder is None:
+                continue
+            robots = [{"id": state.robot.id, "serial": state.robot.serial} for state in hub.states]
+            path = hass.config.path(f"{DOMAIN}_frames_{entry_id}_{timestamp}.jsonl.gz")
+            count = await hass.async_add_executor_job(
+                write_dump, path, recorder.frames(), robots
+            )
+            dumps.append({"entry_id": entry_id, "path": path, "frames": count})
+
+        if not dumps:
+            raise ServiceValidationError(
+                "La grabación de frames está desactivada; configura frame_buffer_size en "
+                "las opciones de la integración"
+            )
+        return {"dumps": dumps}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_DUMP_FRAMES,
+        _async_dump_frames,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
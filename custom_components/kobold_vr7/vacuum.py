@@ -8,27 +8,15 @@ from homeassistant.components.vacuum import (
 )
 
 import voluptuous as vol
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_platform
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity import DeviceInfo
 
 from .service.model.map_with_zones import MapWithZones
-from .service.websocket_service import WebSocketService
-from .const import (
-    DOMAIN,
-    CONF_ID_TOKEN,
-    ORBITAL_HOST,
-    COMPANION_HOST,
-    CONF_MARKET,
-    DEFAULT_MARKET,
-    SUPPORTED_MARKETS,
-)
-from .service.robot_service import RobotsService
-from .api.robots_api_client import RobotsApiClient
-from .api.websocket_client import KoboldWebSocketClient
-from .api.profile_api_client import ProfileApiClient
-from .service.profile_service import ProfileService
+from .const import DOMAIN
+from .hub import KoboldHub
+from .service.robot_state import RobotState, UPDATE_MAPS, UPDATE_VACUUM
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,82 +27,13 @@ SERVICE_CLEAN_MAP = 'clean_map'
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Configura la entidad de aspiradora basada en una entrada de configuración."""
-    entry_data = hass.data[DOMAIN][entry.entry_id]
-    config = entry_data["config"]
-    runtime = entry_data.setdefault("runtime", {})
-
-    id_token = config[CONF_ID_TOKEN]
+    hub: KoboldHub = hass.data[DOMAIN][entry.entry_id]
 
-    market_key = config.get(CONF_MARKET, DEFAULT_MARKET)
-    market_settings = SUPPORTED_MARKETS.get(
-        market_key, SUPPORTED_MARKETS[DEFAULT_MARKET]
+    # Siempre añadimos la entidad, incluso sin mapas o zonas
+    async_add_entities(
+        [KoboldVacuumEntity(hub, robot_state) for robot_state in hub.states],
+        update_before_add=True,
     )
-    accept_language = market_settings["accept_language"]
-
-    session = async_get_clientsession(hass)
-
-    robots_service = runtime.get("robots_service")
-    if not robots_service:
-        robots_api_client = RobotsApiClient(
-            session, token=id_token, host=ORBITAL_HOST
-        )
-        robots_service = RobotsService(robots_api_client)
-        runtime["robots_service"] = robots_service
-
-    profile_service = runtime.get("profile_service")
-    if not profile_service:
-        profile_api_client = ProfileApiClient(
-            session, host=COMPANION_HOST, language=accept_language
-        )
-        profile_service = ProfileService(profile_api_client)
-        runtime["profile_service"] = profile_service
-
-    robots = await robots_service.get_all_robots(id_token)
-    robots_state = runtime.setdefault("robots", {})
-
-    entities = []
-
-    for robot in robots:
-        map_with_zones_list = []  # Lista para almacenar MapWithZones (específica para cada robot)
-        
-        # Intentamos obtener mapas, pero continuamos incluso si no hay ninguno
-        maps = await robots_service.get_robot_map(id_token, robot.id)
-        
-        if maps:
-            for robot_map in maps:
-                # Obtener las zonas para cada mapa
-                try:
-                    zones = await robots_service.get_zones_by_floor_plan(id_token, robot_map.floorplan_uuid)
-                    # Crear el objeto MapWithZones y agregarlo a la lista
-                    map_with_zones = MapWithZones(map=robot_map, zones=zones)
-                    map_with_zones_list.append(map_with_zones)
-                except Exception as e:
-                    _LOGGER.warning(f"Error getting zones for map {robot_map.floorplan_uuid}: {e}")
-                    # Agregar el mapa sin zonas
-                    map_with_zones = MapWithZones(map=robot_map, zones=None)
-                    map_with_zones_list.append(map_with_zones)
-        else:
-            _LOGGER.info(f"No maps found for robot {robot.id}, continuing without maps")
-            
-        # Siempre añadimos la entidad, incluso sin mapas o zonas
-        robot_state = robots_state.setdefault(robot.id, {})
-        robot_state["robot"] = robot
-        robot_state.setdefault("battery_level", None)
-        robot_state.setdefault("is_charging", False)
-
-        entities.append(KoboldVacuumEntity(
-            hass,
-            entry.entry_id,
-            robot,
-            robots_service,
-            profile_service,
-            session,
-            id_token,
-            map_with_zones_list,
-            accept_language,
-        ))
-
-    async_add_entities(entities, update_before_add=True)
 
     # Registrar servicios personalizados después de haber añadido las entidades
     try:
@@ -144,28 +63,17 @@ async def async_setup_entry(hass, entry, async_add_entities):
 class KoboldVacuumEntity(StateVacuumEntity):
     """Representa una aspiradora Kobold."""
 
-    def __init__(
-        self,
-        hass,
-        entry_id,
-        robot,
-        robots_service,
-        profile_service,
-        session,
-        id_token,
-        map_with_zones_list,
-        accept_language,
-    ):
-        self.hass = hass
-        self._entry_id = entry_id
-        # Almacena los mapas y zonas del robot
-        self.map_with_zones_list = map_with_zones_list
-        self._robot = robot
-        self._robots_service = robots_service
-        self._profile_service = profile_service
-        self._id_token = id_token
-        self._attr_name = robot.name
-        self._attr_unique_id = robot.id
+    _attr_should_poll = False
+
+    def __init__(self, hub: KoboldHub, robot_state: RobotState):
+        self._hub = hub
+        # Estado compartido del robot; lo actualizan el WebSocket y la revalidación de mapas
+        self._state = robot_state
+        self._robot = robot_state.robot
+        self.websocket_service = hub.websocket_service
+        self._commands = hub.command_service
+        self._attr_name = self._robot.name
+        self._attr_unique_id = self._robot.id
         self._attr_supported_features = (
             VacuumEntityFeature.START
             | VacuumEntityFeature.PAUSE
@@ -179,60 +87,43 @@ class KoboldVacuumEntity(StateVacuumEntity):
             | VacuumEntityFeature.MAP
         )
 
-        # Por defecto, establecemos la actividad como IDLE
-        self._attr_activity = VacuumActivity.IDLE
-        self._attr_status = None
-
         self._attr_fan_speed_list = ['auto', 'eco', 'turbo']
         self._attr_fan_speed = 'auto'
-        self._ultimo_error: str | None = None
-        self._errores_detallados: list[dict[str, Any]] = []
-        self._accept_language = accept_language
-
-        runtime = hass.data[DOMAIN][entry_id].setdefault("runtime", {})
-        robots_state = runtime.setdefault("robots", {})
-        self._robot_state = robots_state.setdefault(robot.id, {"robot": robot})
-        self._robot_state["robot"] = robot
-        self._is_charging = self._robot_state.get("is_charging", False)
-
-        # Inicializar el servicio WebSocket y pasar self como entidad
-        self.websocket_service = WebSocketService(
-            KoboldWebSocketClient(
-                hass,
-                session,
-                id_token,
-                robot.id,
-                self,
-                profile_service.login,
-                self._accept_language,
-            )
-        )
 
     async def async_added_to_hass(self):
         """Se llama cuando la entidad ha sido agregada a hass."""
         # Llamar al método de la clase base
         await super().async_added_to_hass()
-        # Iniciar el cliente WebSocket
-        self.hass.loop.create_task(self.websocket_service.start())
+        self.async_on_remove(
+            self._hub.states.subscribe(self._robot.id, self._async_robot_updated)
+        )
 
-    async def async_will_remove_from_hass(self):
-        """Se llama cuando la entidad está a punto de ser removida."""
-        await self.websocket_service.stop()
-        await super().async_will_remove_from_hass()
+    @callback
+    def _async_robot_updated(self, kind: str) -> None:
+        """Escribe el estado cuando cambia la aspiradora o sus mapas."""
+        if kind in (UPDATE_VACUUM, UPDATE_MAPS):
+            self.async_write_ha_state()
+
+    @property
+    def map_with_zones_list(self) -> list[MapWithZones]:
+        """Mapas y zonas del robot."""
+        return self._state.maps
 
     @property
     def activity(self):
         """Devuelve la actividad actual de la aspiradora usando VacuumActivity."""
-        return self._attr_activity
+        vacuum = self._state.vacuum
+        return vacuum.activity if vacuum is not None else VacuumActivity.IDLE
 
     @property
     def status(self):
         """Devuelve el estado detallado de la aspiradora."""
-        if self._attr_activity == VacuumActivity.CLEANING and self.available_commands and self.available_commands.pause:
+        if self.activity == VacuumActivity.CLEANING and self.available_commands and self.available_commands.pause:
             return "Pausar"
-        elif self._attr_activity == VacuumActivity.PAUSED and self.available_commands and self.available_commands.return_to_base:
+        elif self.activity == VacuumActivity.PAUSED and self.available_commands and self.available_commands.return_to_base:
             return "Enviar a la Base"
-        return self._attr_status
+        vacuum = self._state.vacuum
+        return vacuum.status if vacuum is not None else None
 
     @property
     def icon(self):
@@ -255,7 +146,8 @@ class KoboldVacuumEntity(StateVacuumEntity):
     @property
     def available_commands(self):
         """Devuelve los comandos disponibles para el robot."""
-        return getattr(self, "_attr_available_commands", None)
+        vacuum = self._state.vacuum
+        return vacuum.available_commands if vacuum is not None else None
 
     @property
     def fan_speed(self):
@@ -265,17 +157,25 @@ class KoboldVacuumEntity(StateVacuumEntity):
     @property
     def bag_status(self):
         """Devuelve el estado de la bolsa de la aspiradora."""
-        return getattr(self, "_attr_bag_status", None)
+        vacuum = self._state.vacuum
+        return vacuum.bag_status if vacuum is not None else None
 
     @property
     def extra_state_attributes(self):
         """Devuelve los atributos de estado adicionales de la aspiradora."""
         attributes: dict[str, Any] = {}
 
-        if self._ultimo_error:
-            attributes['ultimo_error'] = self._ultimo_error
-        if self._errores_detallados:
-            attributes['errores_detallados'] = self._errores_detallados
+        vacuum = self._state.vacuum
+        if vacuum is not None and vacuum.last_error:
+            attributes['ultimo_error'] = vacuum.last_error
+        if vacuum is not None and vacuum.errors:
+            errores_detallados = []
+            for codigo, descripcion, severidad in vacuum.errors:
+                detalle_error = {'codigo': codigo, 'descripcion': descripcion}
+                if severidad:
+                    detalle_error['severidad'] = severidad
+                errores_detallados.append(detalle_error)
+            attributes['errores_detallados'] = errores_detallados
 
         if self.map_with_zones_list:
             # 1) maps: map_id → map_name
@@ -313,19 +213,21 @@ class KoboldVacuumEntity(StateVacuumEntity):
         if self.available_commands:
             if self.available_commands.start:
                 # Iniciar limpieza sin un mapa específico (pasando None)
-                await self._robots_service.start_cleaning(
-                    self._id_token, self._robot.id, self.fan_speed, None
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.start_cleaning(
+                    self._hub.id_token, self._robot, self.fan_speed, None
                 )
             elif self.available_commands.resume:
-                await self._robots_service.resume_cleaning(
-                    self._id_token, self._robot.serial
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.resume_cleaning(
+                    self._hub.id_token, self._robot
                 )
         else:
             _LOGGER.warning("Start command is not available for the robot.")
 
     async def async_locate(self):
         """Buscar el robot."""
-        await self._robots_service.find_me(self._id_token, self._robot.serial)
+        await self._commands.find_me(self._hub.id_token, self._robot)
 
     # async def async_clean_spot(self):
     #  _LOGGER.info("Start command is not available for the robot.")
@@ -336,14 +238,16 @@ class KoboldVacuumEntity(StateVacuumEntity):
     async def async_stop(self):
         """Detiene la limpieza."""
         if self.available_commands and self.available_commands.pause:
-            await self._robots_service.pause_cleaning(self._id_token, self._robot.serial)
+            self.websocket_service.expect_command_ack(self._robot.id)
+            await self._commands.pause_cleaning(self._hub.id_token, self._robot)
         else:
             _LOGGER.warning("Pause command is not available for the robot.")
 
     async def async_pause(self):
         """Pausa la limpieza."""
         if self.available_commands and self.available_commands.pause:
-            await self._robots_service.pause_cleaning(self._id_token, self._robot.serial)
+            self.websocket_service.expect_command_ack(self._robot.id)
+            await self._commands.pause_cleaning(self._hub.id_token, self._robot)
         else:
             _LOGGER.warning("Pause command is not available for the robot.")
 
@@ -351,11 +255,14 @@ class KoboldVacuumEntity(StateVacuumEntity):
         """Envía la aspiradora a la base."""
         if self.available_commands:
             if self.available_commands.return_to_base:
-                await self._robots_service.send_to_base(self._id_token, self._robot.serial)
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.send_to_base(self._hub.id_token, self._robot)
             elif self.available_commands.pause:
-                await self._robots_service.pause_cleaning(self._id_token, self._robot.serial)
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.pause_cleaning(self._hub.id_token, self._robot)
                 await asyncio.sleep(2)
-                await self._robots_service.send_to_base(self._id_token, self._robot.serial)
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.send_to_base(self._hub.id_token, self._robot)
             else:
                 _LOGGER.warning(
                     "Return to base command is not available for the robot.")
@@ -415,8 +322,9 @@ class KoboldVacuumEntity(StateVacuumEntity):
             # Iniciar la limpieza con las zonas encontradas
             if parent_map and found_zones:
                 _LOGGER.info(f"Iniciando limpieza de {len(found_zones)} zonas en el mapa {parent_map.name}")
-                await self._robots_service.start_cleaning(
-                    self._id_token, self._robot.id, self.fan_speed, 
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.start_cleaning(
+                    self._hub.id_token, self._robot, self.fan_speed, 
                     MapWithZones(map=parent_map, zones=found_zones)
                 )
         else:
@@ -437,8 +345,9 @@ class KoboldVacuumEntity(StateVacuumEntity):
             if selected_map_with_zones:
                 _LOGGER.info(f"Iniciando limpieza con mapa específico: {map_uuid}")
                 # Iniciar la limpieza usando el mapa seleccionado
-                await self._robots_service.start_cleaning(
-                    self._id_token, self._robot.id, self.fan_speed, MapWithZones(map=selected_map_with_zones.map, zones=None)
+                self.websocket_service.expect_command_ack(self._robot.id)
+                await self._commands.start_cleaning(
+                    self._hub.id_token, self._robot, self.fan_speed, MapWithZones(map=selected_map_with_zones.map, zones=None)
                 )
             else:
                 _LOGGER.warning(f"Map with UUID {map_uuid} not found.")
@@ -0,0 +1,66 @@
+"""Pruebas del histórico de limpiezas en SQLite."""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from custom_components.kobold_vr7.service.cleaning_history_store import CleaningHistoryStore
+from custom_components.kobold_vr7.service.cleaning_telemetry import CleaningSession
+
+
+class FakeHass:
+    async def async_add_executor_job(self, target, *args):
+        return target(*args)
+
+
+@pytest.fixture
+def non_utc_timezone():
+    # En un host en UTC una marca local y una UTC coinciden y el fallo no se vería
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def _session(session_start):
+    return CleaningSession(
+        session_start=session_start,
+        ended_at=None,
+        floorplan_uuid="map",
+        cleaning_type="house",
+        ability="cleaning.start",
+        started_by="app",
+        cleaned_area=10.0,
+        elapsed_time=600,
+        paused_time=0,
+        charging_time=0,
+        error_time=0,
+        errors=(),
+        runs=(),
+    )
+
+
+def test_naive_session_start_is_queried_as_utc(tmp_path, non_utc_timezone):
+    async def scenario():
+        store = CleaningHistoryStore(FakeHass(), str(tmp_path / "history.db"))
+        await store.async_record("robot", _session("2025-05-01T23:30:00"))
+
+        inside = await store.async_query(
+            start=datetime(2025, 5, 1, 23, tzinfo=timezone.utc),
+            end=datetime(2025, 5, 2, tzinfo=timezone.utc),
+        )
+        before = await store.async_query(end=datetime(2025, 5, 1, 23, tzinfo=timezone.utc))
+        await store.async_close()
+
+        assert [s["session_start"] for s in inside["sessions"]] == ["2025-05-01T23:30:00"]
+        assert before["total"] == 0
+
+    asyncio.run(scenario())
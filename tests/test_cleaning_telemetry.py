@@ -0,0 +1,61 @@
+"""Pruebas del agregador de telemetría de limpieza."""
+
+from custom_components.kobold_vr7.api.model.robot_wss_cleaning_state_response import (
+    CleaningStateBody,
+    Run,
+    RunSettings,
+    RunStats,
+    RunTiming,
+)
+from custom_components.kobold_vr7.service.cleaning_telemetry import CleaningTelemetryTracker
+
+START = "2025-05-01T10:00:00Z"
+
+
+def _timing(start=START, end=""):
+    return RunTiming(charging=0, end=end, error=0, paused=0, start=start)
+
+
+def _run(track_uuid, area, state="finished"):
+    return Run(
+        settings=RunSettings(mode="eco", navigation_mode="normal"),
+        state=state,
+        stats=RunStats(area=area, pickup_count=0),
+        timing=_timing(),
+        track_name="Kitchen",
+        track_uuid=track_uuid,
+    )
+
+
+def _body(runs, timing=None):
+    return CleaningStateBody(
+        ability="cleaning.start",
+        cleaning_type="zone",
+        floorplan_uuid="map",
+        runs=runs,
+        started_by="app",
+        timing=timing or _timing(),
+    )
+
+
+def test_same_zone_cleaned_twice_counts_both_runs():
+    tracker = CleaningTelemetryTracker()
+    body = _body([_run("kitchen", 4.0), _run("kitchen", 3.5, state="running")])
+
+    assert tracker.update(body)
+    # El mismo mensaje repetido no es un cambio
+    assert not tracker.update(body)
+
+    telemetry = tracker.snapshot()
+    assert telemetry.cleaned_area == 7.5
+    assert telemetry.run_count == 2
+
+
+def test_naive_and_aware_timestamps_can_be_combined():
+    tracker = CleaningTelemetryTracker()
+    tracker.update(_body([_run("kitchen", 1.0)], _timing("2025-05-01T10:00:00", "")))
+    tracker.update(
+        _body([_run("kitchen", 1.0)], _timing("2025-05-01T10:00:00", "2025-05-01T10:30:00Z"))
+    )
+
+    assert tracker.snapshot().elapsed_time == 1800
@@ -0,0 +1,58 @@
+"""Pruebas de la caché de respuestas REST."""
+
+import asyncio
+
+from custom_components.kobold_vr7.service.response_cache import ResponseCache
+
+
+def test_get_after_invalidate_does_not_join_stale_inflight_load():
+    async def scenario():
+        cache = ResponseCache()
+        calls = []
+        first_release = asyncio.Event()
+
+        async def loader():
+            calls.append(len(calls))
+            version = len(calls)
+            if version == 1:
+                # La primera lectura sale antes de la escritura y tarda en volver
+                await first_release.wait()
+            return f"v{version}"
+
+        before_write = asyncio.create_task(cache.get("robots", None, 60, loader))
+        await asyncio.sleep(0)
+        cache.invalidate("robots")
+
+        after_write = await cache.get("robots", None, 60, loader)
+        first_release.set()
+
+        assert await before_write == "v1"
+        assert after_write == "v2"
+        assert len(calls) == 2
+        # Se guarda la respuesta posterior a la escritura, no la invalidada
+        assert await cache.get("robots", None, 60, loader) == "v2"
+        assert cache.stats["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_gets_share_one_load():
+    async def scenario():
+        cache = ResponseCache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return calls
+
+        results = await asyncio.gather(
+            *(cache.get("zones", "map", 60, loader) for _ in range(5))
+        )
+
+        assert results == [1] * 5
+        assert calls == 1
+        assert cache.stats["coalesced"] == 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+"""Pruebas de la revalidación de mapas del servicio de robots."""
+
+import asyncio
+import base64
+from types import SimpleNamespace
+
+from custom_components.kobold_vr7.api.model.robot_map_response import RobotMapResponse
+from custom_components.kobold_vr7.service.model.map_with_zones import MapWithZones
+from custom_components.kobold_vr7.service.robot_service import RobotsService
+
+
+def _map(blob=None, **versions):
+    data = {"floorplan_uuid": "floor", "name": "Casa", **versions}
+    if blob is not None:
+        data["processed_real_binary"] = base64.b64encode(blob).decode("ascii")
+    return RobotMapResponse.from_dict(data)
+
+
+def _revalidate(cached_map, fresh_map):
+    service = RobotsService(robots_api_client=None)
+    zone_requests = []
+
+    async def get_all_robots(token):
+        return [SimpleNamespace(id="robot")]
+
+    async def get_robot_map(token, robot_id):
+        return [fresh_map]
+
+    async def get_zones_by_floor_plan(token, floorplan_uuid):
+        zone_requests.append(floorplan_uuid)
+        return "fresh zones"
+
+    async def save_snapshot(robots, maps_by_robot):
+        return None
+
+    service.get_all_robots = get_all_robots
+    service.get_robot_map = get_robot_map
+    service.get_zones_by_floor_plan = get_zones_by_floor_plan
+    service._save_snapshot = save_snapshot
+
+    cached = {"robot": [MapWithZones(map=cached_map, zones="cached zones")]}
+    _robots, maps, changed = asyncio.run(service.revalidate("token", 2, cached))
+    return maps["robot"][0].zones, changed, zone_requests
+
+
+def test_unchanged_version_reuses_cached_zones():
+    zones, changed, requests = _revalidate(_map(updated_at="1"), _map(updated_at="1"))
+
+    assert zones == "cached zones"
+    assert changed == []
+    assert requests == []
+
+
+def test_map_without_version_fields_uses_blob_fingerprint():
+    zones, changed, _ = _revalidate(_map(b"same"), _map(b"same"))
+    assert zones == "cached zones"
+    assert changed == []
+
+    zones, changed, requests = _revalidate(_map(b"before"), _map(b"edited"))
+    assert zones == "fresh zones"
+    assert changed == ["robot"]
+    assert requests == ["floor"]
+
+
+def test_map_without_version_fields_or_blob_is_treated_as_changed():
+    zones, changed, requests = _revalidate(_map(), _map())
+
+    assert zones == "fresh zones"
+    assert changed == ["robot"]
+    assert requests == ["floor"]
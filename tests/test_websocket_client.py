@@ -0,0 +1,126 @@
+"""Pruebas del cliente WebSocket con una conexión simulada."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.kobold_vr7.api.websocket_client import (
+    KoboldWebSocketClient,
+    KoboldWebSocketError,
+)
+
+ROBOT_ID = "a1b2c3d4-0000-4000-8000-000000000001"
+TOPIC = f"robots:{ROBOT_ID}"
+
+
+class FakeWebSocket:
+    """Guarda los mensajes Phoenix enviados por el cliente."""
+
+    closed = False
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_str(self, message):
+        self.sent.append(json.loads(message))
+
+    def pushed(self, event):
+        return [message for message in self.sent if message[3] == event]
+
+
+async def _wait_for_push(websocket, event, count=1):
+    for _ in range(50):
+        if len(websocket.pushed(event)) >= count:
+            return websocket.pushed(event)[count - 1]
+        await asyncio.sleep(0)
+    raise AssertionError(f"No se envió {event}")
+
+
+def _joined_client(loop):
+    client = KoboldWebSocketClient(SimpleNamespace(loop=loop, data={}), None, "token", None)
+    client._rejoin_delays = (0,)
+    client.add_robot(ROBOT_ID)
+    client.websocket = FakeWebSocket()
+    client.connected = True
+    channel = client._channels[TOPIC]
+    channel.join_ref = "1"
+    channel.joined = True
+    return client, channel
+
+
+def test_phx_error_fails_pending_replies_and_rejoins_channel():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        client, channel = _joined_client(loop)
+        websocket = client.websocket
+
+        pending = loop.create_task(client.request_last_state(ROBOT_ID))
+        await _wait_for_push(websocket, "last_state")
+
+        await client._handle_message(json.dumps(["1", "5", TOPIC, "phx_error", {}]))
+
+        with pytest.raises(KoboldWebSocketError):
+            await pending
+        assert not client.is_joined(ROBOT_ID)
+
+        join = await _wait_for_push(websocket, "phx_join")
+        await client._handle_message(
+            json.dumps([join[0], join[1], TOPIC, "phx_reply", {"status": "ok", "response": {}}])
+        )
+        # Tras unirse pide el último estado; se responde para que termine la reunión
+        last_state = await _wait_for_push(websocket, "last_state", count=2)
+        await client._handle_message(
+            json.dumps(
+                [join[0], last_state[1], TOPIC, "phx_reply", {"status": "ok", "response": {}}]
+            )
+        )
+        await channel.rejoin_task
+
+        assert client.is_joined(ROBOT_ID)
+        assert channel.join_ref == join[0]
+        assert client.link_stats["channels_lost"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_phx_close_from_previous_join_is_ignored():
+    async def scenario():
+        client, channel = _joined_client(asyncio.get_running_loop())
+
+        await client._handle_message(json.dumps(["0", "0", TOPIC, "phx_close", {}]))
+
+        assert client.is_joined(ROBOT_ID)
+        assert channel.rejoin_task is None
+
+    asyncio.run(scenario())
+
+
+def test_command_rejected_by_channel_schedules_rejoin():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        client, channel = _joined_client(loop)
+        websocket = client.websocket
+
+        command = loop.create_task(client.send_command(ROBOT_ID, {"ability": "cleaning.stop"}))
+        message = await _wait_for_push(websocket, "message")
+        await client._handle_message(
+            json.dumps(
+                [
+                    "1",
+                    message[1],
+                    TOPIC,
+                    "phx_reply",
+                    {"status": "error", "response": {"reason": "unmatched topic"}},
+                ]
+            )
+        )
+
+        with pytest.raises(KoboldWebSocketError):
+            await command
+        assert not client.is_joined(ROBOT_ID)
+        await _wait_for_push(websocket, "phx_join")
+        channel.rejoin_task.cancel()
+
+    asyncio.run(scenario())